@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify, request, session
+from flask import Flask, Response, render_template, jsonify, request, session
 from flask_cors import CORS
 from src.helper import download_hugging_face_embeddings
 from langchain_pinecone import PineconeVectorStore
@@ -8,17 +8,39 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 from src.voice_handler import voice_handler
 from src.cache_manager import cache_manager  # NEW IMPORT
+from src.shared_cache import shared_cache, question_key
+from src.single_flight import SingleFlight
+from src.question_log import question_log
+from src.cache_telemetry import cache_telemetry
+from src.multilingual import guess_language
+from src.audio_codec import UnsupportedFormat, audio_transcoder, mime_type, resolve_format
+from src.lexical_index import BM25Index, LEXICAL_INDEX_PATH, is_keyword_query
+from src.retrievers import CachingRetriever, HybridRetriever, LexicalRetriever
+from src.categories import GENERAL, CategoryClassifier, read_index_categories
+from src.context_builder import context_builder
+from src.admission import admission, Overloaded
+from src.circuit_breaker import CircuitOpen, breakers, raise_for_upstream
+from src.deadline import DeadlineExceeded, expired, hedge_timeout, remaining, stage_timeout, start_deadline
+from src.metrics import metrics
+from src.logger import get_logger, new_request_id, get_request_id
 from dotenv import load_dotenv
 from src.prompt import *
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import os
+import math
+import asyncio
+import contextvars
+import httpx
 import requests
 import secrets
 import jwt
 import base64
 
 app = Flask(__name__)
+log = get_logger("app")
+pipeline_log = get_logger("pipeline")
 CORS(app, supports_credentials=True, resources={
     r"/*": {
         "origins": ["http://localhost:5173", "http://localhost:3000"],
@@ -34,17 +56,58 @@ load_dotenv()
 NODE_API_URL = os.environ.get('NODE_API_URL', 'http://localhost:8080/api')
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(16))
 ACCESS_TOKEN_SECRET = os.environ.get('ACCESS_TOKEN_SECRET')
+# Shared secret for admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Concurrent mode: speculative retrieval during the cache lookup, and
+# message persistence overlapped with answer generation / TTS
+CONCURRENT_PIPELINE = os.environ.get('CONCURRENT_PIPELINE', '0').lower() in ('1', 'true', 'yes')
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', '32'))
+
+# Minimum fuzzy score (0-100) for an answer cache hit - tune with replay_cache.py
+CACHE_MATCH_THRESHOLD = int(os.environ.get('CACHE_MATCH_THRESHOLD', '85'))
+
+# Load shedding / hedging: when the LLM stage is saturated or too slow for
+# the request deadline, accept a looser cache match before falling back to
+# the retrieved context without the LLM
+SHED_CACHE_THRESHOLD = int(os.environ.get('SHED_CACHE_THRESHOLD', '70'))
+# Retry-After (seconds) on 503s for shed speech-to-text / text-to-speech requests
+BUSY_RETRY_AFTER = os.environ.get('BUSY_RETRY_AFTER', '5')
+# Hard cap on one LLM call; calls made for a request also end with its deadline
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+
+# Batch answering (/batch, batch_answer.py): LLM calls in flight per batch,
+# concurrent vector-store queries, and the largest batch /batch accepts
+BATCH_LLM_CONCURRENCY = int(os.environ.get('BATCH_LLM_CONCURRENCY', '8'))
+BATCH_RETRIEVAL_WORKERS = int(os.environ.get('BATCH_RETRIEVAL_WORKERS', '8'))
+BATCH_MAX_QUESTIONS = int(os.environ.get('BATCH_MAX_QUESTIONS', '200'))
+
+# Retrieval: "vector" (Pinecone only) or "hybrid" (Pinecone + local BM25, RRF-fused).
+# Opt-in LEXICAL_SHORTCUT: short keyword-style queries ("fever headache") with a strong
+# BM25 hit skip embedding and Pinecone entirely. Questions always use dense retrieval.
+RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'vector').lower()
+LEXICAL_SHORTCUT = os.environ.get('LEXICAL_SHORTCUT', '0') == '1'
+LEXICAL_MAX_TERMS = int(os.environ.get('LEXICAL_MAX_TERMS', '4'))
+LEXICAL_MIN_SCORE = float(os.environ.get('LEXICAL_MIN_SCORE', '5.0'))
+
+# Chunks fetched per query; context assembly may keep fewer (see src/context_builder.py)
+RETRIEVAL_K = int(os.environ.get('RETRIEVAL_K', '3'))
+
+# Memoized vector retrieval (exact + near-duplicate queries); 0 entries disables it
+RETRIEVER_CACHE_SIZE = int(os.environ.get('RETRIEVER_CACHE_SIZE', '1024'))
+RETRIEVER_CACHE_TTL = float(os.environ.get('RETRIEVER_CACHE_TTL', '600'))
+RETRIEVER_CACHE_SIMILARITY = float(os.environ.get('RETRIEVER_CACHE_SIMILARITY', '0.95'))
+
+# Scope vector search to the question's medical category (chunk metadata written by store_index.py).
+# Only categories with at least this many indexed chunks are used as filters.
+RETRIEVAL_CATEGORY_FILTER = os.environ.get('RETRIEVAL_CATEGORY_FILTER', '1') == '1'
+RETRIEVAL_CATEGORY_MIN_CHUNKS = int(os.environ.get('RETRIEVAL_CATEGORY_MIN_CHUNKS', '20'))
 
 # Twilio WhatsApp Configuration
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_NUMBER = os.environ.get('TWILIO_WHATSAPP_NUMBER')
 
-# Initialize Twilio Client
-twilio_client = None
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
 # Pinecone and OpenAI setup
 PINECONE_API_KEY = os.environ.get('PINECONE_API_KEY')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
@@ -52,15 +115,9 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
+# Heavy, read-only state: loaded once and shared copy-on-write by pre-forked workers
 embeddings = download_hugging_face_embeddings()
 index_name = "medicalchatbot"
-docsearch = PineconeVectorStore.from_existing_index(
-    index_name=index_name,
-    embedding=embeddings
-)
-
-retriever = docsearch.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-chatModel = ChatOpenAI(model="gpt-3.5-turbo")
 prompt = ChatPromptTemplate.from_messages(
     [
         ("system", system_prompt),
@@ -68,14 +125,107 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-question_answer_chain = create_stuff_documents_chain(chatModel, prompt)
-rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+# Local BM25 index over the ingested chunks (built by store_index.py)
+lexical_index = None
+if os.path.exists(LEXICAL_INDEX_PATH):
+    try:
+        lexical_index = BM25Index.load(LEXICAL_INDEX_PATH)
+        log.info("lexical_index.loaded", chunks=len(lexical_index), terms=len(lexical_index.postings))
+    except Exception as e:
+        log.warning("lexical_index.load_error", path=LEXICAL_INDEX_PATH, error=str(e))
+lexical_retriever = LexicalRetriever(index=lexical_index, k=RETRIEVAL_K) if lexical_index else None
 
+# Query -> category classifier, over the categories the current index actually has chunks for
+category_classifier = None
+if RETRIEVAL_CATEGORY_FILTER:
+    index_categories = {
+        category for category, chunks in read_index_categories().items()
+        if category != GENERAL and chunks >= RETRIEVAL_CATEGORY_MIN_CHUNKS
+    }
+    if index_categories:
+        category_classifier = CategoryClassifier.from_cache_entries(cache_manager.cache_data, allowed=index_categories)
+        # New / edited cache categories and keywords apply on hot reload
+        cache_manager.add_reload_hook(lambda state: category_classifier.rebuild(state.entries))
+        log.info("category_filter.enabled", categories=sorted(category_classifier.categories))
 
-def extract_user_id_from_token():
-    """Extract user ID from Authorization header"""
-    auth_header = request.headers.get('Authorization')
-    
+
+def init_network_clients():
+    """
+    Create the clients that hold sockets / connection pools
+    (Twilio, Pinecone, OpenAI) and the chains built on them.
+
+    Runs at import and again in every worker after fork (see gunicorn.conf.py),
+    so no connection pool is ever shared between processes.
+    """
+    global twilio_client, docsearch, retriever, chatModel, question_answer_chain, rag_chain
+
+    # Initialize Twilio Client
+    twilio_client = None
+    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+    docsearch = PineconeVectorStore.from_existing_index(
+        index_name=index_name,
+        embedding=embeddings
+    )
+
+    retriever = CachingRetriever(
+        vectorstore=docsearch,
+        embeddings=embeddings,
+        k=RETRIEVAL_K,
+        max_entries=RETRIEVER_CACHE_SIZE,
+        ttl_seconds=RETRIEVER_CACHE_TTL,
+        similarity=RETRIEVER_CACHE_SIMILARITY,
+        breaker=breakers.pinecone,
+        classifier=category_classifier
+    )
+    if RETRIEVAL_MODE == "hybrid" and lexical_retriever:
+        retriever = HybridRetriever(vector=retriever, lexical=lexical_retriever, k=RETRIEVAL_K)
+    # Cap on any LLM call; inside a request it is cut to the deadline (see _answer_chain)
+    chatModel = ChatOpenAI(model="gpt-3.5-turbo", timeout=LLM_TIMEOUT_SECONDS)
+
+    question_answer_chain = create_stuff_documents_chain(chatModel, prompt)
+    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+
+
+init_network_clients()
+
+# Multilingual model + cross-lingual cache index: loaded before fork (gunicorn
+# preload) and shared copy-on-write; reloads rebuild it in the watcher thread
+cache_manager.cross_lingual.load()
+
+# Hot-reload data/medical_cache.json on change (restarted per worker in gunicorn post_fork)
+cache_manager.start_watcher()
+
+
+# Deadline channel per endpoint (src/deadline.py budgets); others get the default
+DEADLINE_CHANNELS = {
+    'chat': 'chat',
+    'voice_chat': 'voice',
+    'whatsapp_webhook': 'whatsapp',
+    'speech_to_text_endpoint': 'speech-to-text',
+    'text_to_speech_endpoint': 'text-to-speech',
+    'batch': 'batch',
+}
+
+
+@app.before_request
+def assign_request_id():
+    """Tag every log line of this request with a correlation ID and start its deadline"""
+    new_request_id(request.headers.get('X-Request-ID') or request.values.get('MessageSid'))
+    start_deadline(DEADLINE_CHANNELS.get(request.endpoint))
+
+
+@app.after_request
+def add_request_id_header(response):
+    request_id = get_request_id()
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def decode_user_id(auth_header):
+    """Extract user ID from an Authorization header value"""
     if not auth_header:
         return "anonymous"
     
@@ -99,6 +249,33 @@ def extract_user_id_from_token():
         return "anonymous"
 
 
+def extract_user_id_from_token():
+    """Extract user ID from Authorization header"""
+    return decode_user_id(request.headers.get('Authorization'))
+
+
+def _node_headers(token=None, json_body=False):
+    headers = {'Content-Type': 'application/json'} if json_body else {}
+    
+    if token:
+        token_str = str(token) if not isinstance(token, str) else token
+        headers['Authorization'] = f'Bearer {token_str}'
+    
+    return headers
+
+
+# Client-side timeouts of the Node calls (requests and httpx)
+_NODE_TIMEOUTS = (requests.Timeout, httpx.TimeoutException)
+
+
+def _clamped_timeouts(timeout, cap):
+    """
+    Breaker `ignore` for a call whose timeout the request deadline cut below
+    `cap`: timing out then says the request ran out of budget, not that Node is down
+    """
+    return _NODE_TIMEOUTS if timeout < cap else ()
+
+
 def save_message_to_node(sender, text, audio_data=None, session_id=None, user_id="anonymous", token=None):
     """Save message via Node.js API"""
     try:
@@ -111,13 +288,12 @@ def save_message_to_node(sender, text, audio_data=None, session_id=None, user_id
             "sessionId": session_id or "default-session",
         }
         
-        headers = {'Content-Type': 'application/json'}
-        
-        if token:
-            token_str = str(token) if not isinstance(token, str) else token
-            headers['Authorization'] = f'Bearer {token_str}'
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        timeout = stage_timeout(10, floor=1.0)
+        with metrics.span("node_save"), breakers.node.guard(ignore=_clamped_timeouts(timeout, 10)):
+            response = requests.post(
+                url, json=payload, headers=_node_headers(token, json_body=True), timeout=timeout
+            )
+            raise_for_upstream(response.status_code)
         
         if response.status_code in [200, 201]:
             return response.json()
@@ -137,12 +313,83 @@ def get_chat_history_from_node(session_id=None, limit=100, token=None):
             "sessionId": session_id or "default-session"
         }
         
-        headers = {}
-        if token:
-            token_str = str(token) if not isinstance(token, str) else token
-            headers['Authorization'] = f'Bearer {token_str}'
+        timeout = stage_timeout(10)
+        with metrics.span("node_history"), breakers.node.guard(ignore=_clamped_timeouts(timeout, 10)):
+            response = requests.get(url, params=params, headers=_node_headers(token), timeout=timeout)
+            raise_for_upstream(response.status_code)
+        
+        if response.status_code == 200:
+            return response.json().get('messages', [])
+        return []
+            
+    except Exception:
+        return []
+
+
+# Shared async HTTP client for the ASGI path - created lazily inside the worker's event loop
+_async_http_client = None
+
+
+def get_async_http_client():
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=500, max_keepalive_connections=100)
+        )
+    return _async_http_client
+
+
+async def close_async_http_client():
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
+async def async_save_message_to_node(sender, text, audio_data=None, session_id=None, user_id="anonymous", token=None):
+    """Async counterpart of save_message_to_node"""
+    try:
+        url = f"{NODE_API_URL}/chat/save-message-public"
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        payload = {
+            "sender": sender,
+            "text": text,
+            "audioData": audio_data,
+            "sessionId": session_id or "default-session",
+        }
+        
+        timeout = stage_timeout(10, floor=1.0)
+        with metrics.span("node_save"), breakers.node.guard(ignore=_clamped_timeouts(timeout, 10)):
+            response = await get_async_http_client().post(
+                url, json=payload, headers=_node_headers(token, json_body=True), timeout=timeout
+            )
+            raise_for_upstream(response.status_code)
+        
+        if response.status_code in [200, 201]:
+            return response.json()
+        return None
+            
+    except Exception:
+        return None
+
+
+async def async_get_chat_history_from_node(session_id=None, limit=100, token=None):
+    """Async counterpart of get_chat_history_from_node"""
+    try:
+        url = f"{NODE_API_URL}/chat/chat-history-public"
+        
+        params = {
+            "limit": limit,
+            "sessionId": session_id or "default-session"
+        }
+        
+        timeout = stage_timeout(10)
+        with metrics.span("node_history"), breakers.node.guard(ignore=_clamped_timeouts(timeout, 10)):
+            response = await get_async_http_client().get(
+                url, params=params, headers=_node_headers(token), timeout=timeout
+            )
+            raise_for_upstream(response.status_code)
         
         if response.status_code == 200:
             return response.json().get('messages', [])
@@ -152,120 +399,700 @@ def get_chat_history_from_node(session_id=None, limit=100, token=None):
         return []
 
 
-def get_smart_response(user_message):
+# Worker threads for overlapped stages (created lazily, so never inherited across fork)
+_stage_executor = None
+
+
+def _submit_stage(fn, *args, **kwargs):
+    """Run fn on the stage pool with the caller's contextvars (metrics trace, request ID)"""
+    global _stage_executor
+    if _stage_executor is None:
+        _stage_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+    ctx = contextvars.copy_context()
+    return _stage_executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+def _start_stage(fn, *args, **kwargs):
+    """
+    Start a side stage (e.g. persisting a message) that the caller joins later.
+    In sequential mode it simply runs now, preserving the original order.
+    """
+    if CONCURRENT_PIPELINE:
+        return _submit_stage(fn, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+async def astart_stage(coro):
+    """Async counterpart of _start_stage: returns an awaitable the caller joins later"""
+    if CONCURRENT_PIPELINE:
+        return asyncio.create_task(coro)
+    future = asyncio.get_running_loop().create_future()
+    try:
+        future.set_result(await coro)
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _speculative_result(future):
+    """Result of a speculative stage, or None if it was not started, failed or ran out of time"""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=remaining())
+    except Exception:
+        return None
+
+
+def _probe_connectivity():
+    with metrics.span("connectivity_probe"):
+        return cache_manager.check_internet_connection(timeout=stage_timeout(2))
+
+
+def _retrieve(user_message, stage="retrieval"):
+    with metrics.span(stage):
+        return retriever.invoke(user_message)
+
+
+def _is_keyword_query(user_message):
+    """Short keyword-style queries ("fever headache") can be answered from BM25 alone (LEXICAL_SHORTCUT)"""
+    return (
+        LEXICAL_SHORTCUT and lexical_retriever is not None
+        and is_keyword_query(user_message, LEXICAL_MAX_TERMS)
+    )
+
+
+def _retrieve_lexical(user_message, min_score=LEXICAL_MIN_SCORE):
+    """CPU-only BM25 retrieval - no embedding, no network"""
+    if lexical_retriever is None:
+        return []
+    with metrics.span("retrieval_lexical"):
+        docs = lexical_retriever.invoke(user_message)
+    return [doc for doc in docs if doc.metadata.get("bm25_score", 0) >= min_score]
+
+
+def _retrieval_unavailable(user_message, e):
+    """Vector store breaker open: the local BM25 index stands in for vector search"""
+    pipeline_log.warning("pipeline.retrieval_unavailable", stage=e.stage, retry_after=round(e.retry_after, 1))
+    return _retrieve_lexical(user_message, min_score=0.0)
+
+
+def _assemble_context(docs):
+    """Merge / dedup / score-cut / token-budget the retrieved chunks before prompting"""
+    with metrics.span("context_assembly"):
+        context = context_builder.build(docs)
+    pipeline_log.debug("pipeline.context", retrieved=len(docs or []), kept=len(context))
+    return context
+
+
+# Final answer when neither the cache nor any retrieval source can help
+OFFLINE_FALLBACK_MESSAGE = (
+    "⚠️ **Offline Mode - Limited Information Available**\n\n"
+    "I apologize, but I cannot provide a detailed answer right now because:\n"
+    "- Your question is not in the cached database\n"
+    "- Internet connection is unavailable or unstable\n"
+    "- AI services cannot be reached\n\n"
+    "**What you can do:**\n"
+    "1. Try again when internet connection is restored\n"
+    "2. Rephrase your question - it might match cached answers\n"
+    "3. For urgent medical concerns, please contact a certified doctor immediately\n\n"
+    "**Emergency Numbers:**\n"
+    "- India: 102 (Ambulance), 104 (Medical Helpline)\n"
+    "- International: Your local emergency services"
+)
+
+
+def _cache_lookup(user_message, language=None):
+    """Answer cache lookup in the question's language, recorded in the cache telemetry"""
+    with metrics.span("cache_lookup"):
+        cache_result = cache_manager.find_match(user_message, threshold=CACHE_MATCH_THRESHOLD, language=language)
+    cache_telemetry.record(user_message, cache_result, CACHE_MATCH_THRESHOLD, language)
+    return cache_result
+
+
+def _cache_response(cache_result):
+    pipeline_log.debug("pipeline.cache_hit", confidence=cache_result['confidence'], language=cache_result.get('language'))
+    result = {
+        'answer': cache_result['answer'],
+        'source': 'cache',
+        'confidence': cache_result['confidence'],
+        'online': False,  # Works offline
+        'language': cache_result.get('language')
+    }
+    if cache_result.get('audio_file'):
+        # Pre-rendered answer audio: voice routes skip TTS
+        result['audio'] = cache_manager.read_audio(cache_result['audio_file'])
+    return result
+
+
+def _shared_cache_response(user_message):
+    """Answer generated earlier by any worker on this host, if the shared tier has it"""
+    if shared_cache is None:
+        return None
+    with metrics.span("shared_cache_lookup"):
+        entry = shared_cache.get(user_message)
+    if not entry:
+        return None
+    pipeline_log.debug("pipeline.shared_cache_hit", source=entry.get('source'))
+    return {
+        'answer': entry['answer'],
+        'source': 'shared-cache',
+        'confidence': entry['confidence'],
+        'online': False
+    }
+
+
+def _online_response(answer):
+    answer = str(answer)
+    
+    # Add disclaimer if not already present
+    if "consult a certified doctor" not in answer.lower():
+        answer += "\n\n**Note:** This is general information. Consult a certified doctor for personalized medical advice."
+    
+    pipeline_log.debug("pipeline.rag_online_answer")
+    return {
+        'answer': answer,
+        'source': 'rag-online',
+        'confidence': 0.75,
+        'online': True
+    }
+
+
+# Why an answer was produced without the LLM while online
+DEGRADED_NOTES = {
+    'busy': "the service is very busy right now",
+    'slow': "the AI service is responding slowly right now",
+    'unavailable': "the AI service is temporarily unavailable",
+}
+
+
+def _offline_context_response(docs, degraded=None):
+    """Summarize retrieved context without the LLM; None if nothing was retrieved"""
+    if not docs:
+        return None
+    
+    context_summary = "\n\n".join([doc.page_content[:300] for doc in docs[:2]])
+    
+    answer = f"Based on available medical information:\n\n{context_summary}\n\n"
+    if degraded:
+        answer += f"**Note:** This is limited information because {DEGRADED_NOTES[degraded]}. "
+        answer += "For complete answers and personalized advice, please try again in a few minutes "
+    else:
+        answer += "**Note:** This is limited information due to offline mode. "
+        answer += "For complete answers and personalized advice, please try again when internet is available "
+    answer += "or consult a certified doctor immediately for urgent concerns."
+    
+    pipeline_log.debug("pipeline.rag_offline_answer", docs=len(docs), degraded=degraded)
+    result = {
+        'answer': answer,
+        'source': 'rag-offline',
+        'confidence': 0.5,
+        'online': False
+    }
+    if degraded:
+        result['degraded'] = True
+    return result
+
+
+def _degraded_response(user_message, context, reason):
+    """LLM shed, hedged or its breaker open: a looser cache match, else the assembled context"""
+    cache_result = cache_manager.find_match(user_message, threshold=SHED_CACHE_THRESHOLD)
+    if cache_result['matched']:
+        result = _cache_response(cache_result)
+        result['degraded'] = True
+        return result
+    return _offline_context_response(context, degraded=reason)
+
+
+def _store_late_answer(user_message, answer):
+    """An abandoned LLM call finished after all: keep its answer for the next asker"""
+    if shared_cache is not None:
+        shared_cache.put(user_message, _online_response(answer))
+
+
+def _answer_chain():
+    """
+    The answer chain, its LLM timeout cut to what is left of the request
+    deadline: a call the pipeline hedged past and abandoned ends (and gives
+    back its admission slot) when the request's budget does
+    """
+    timeout = stage_timeout(LLM_TIMEOUT_SECONDS)
+    if timeout >= LLM_TIMEOUT_SECONDS:
+        return question_answer_chain
+    return create_stuff_documents_chain(chatModel.bind(timeout=timeout), prompt)
+
+
+def _generate(user_message, context):
+    # Breaker first: while OpenAI is down, don't even queue for a slot
+    with breakers.openai.guard(ignore=(Overloaded,)):
+        with admission.llm.admit():
+            with metrics.span("llm"):
+                return _answer_chain().invoke({"input": user_message, "context": context})
+
+
+def _generate_hedged(user_message, context):
+    """
+    LLM answer within the hedge budget. Past it, raise DeadlineExceeded and
+    abandon the call: it keeps running until the request deadline (see
+    _answer_chain) and an answer that arrives by then goes to the shared cache.
+    """
+    hedge = hedge_timeout()
+    if hedge is None:
+        return _generate(user_message, context)
+    
+    future = _submit_stage(_generate, user_message, context)
+    try:
+        return future.result(timeout=hedge)
+    except FutureTimeoutError:
+        def store(f):
+            if not f.cancelled() and f.exception() is None:
+                _store_late_answer(user_message, f.result())
+        future.add_done_callback(store)
+        raise DeadlineExceeded(f"LLM did not answer within {hedge:.1f}s")
+
+
+async def _agenerate(user_message, context):
+    with breakers.openai.guard(ignore=(Overloaded,)):
+        async with admission.llm.aadmit():
+            with metrics.span("llm"):
+                return await _answer_chain().ainvoke({"input": user_message, "context": context})
+
+
+async def _agenerate_hedged(user_message, context):
+    """Async counterpart of _generate_hedged"""
+    hedge = hedge_timeout()
+    if hedge is None:
+        return await _agenerate(user_message, context)
+    
+    task = asyncio.create_task(_agenerate(user_message, context))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), hedge)
+    except asyncio.TimeoutError:
+        if task.done():
+            raise
+        def store(t):
+            if not t.cancelled() and t.exception() is None:
+                # SQLite write - keep it off the loop
+                asyncio.get_running_loop().run_in_executor(None, _store_late_answer, user_message, t.result())
+        task.add_done_callback(store)
+        raise DeadlineExceeded(f"LLM did not answer within {hedge:.1f}s")
+
+
+def _offline_fallback_response():
+    pipeline_log.debug("pipeline.offline_fallback")
+    return {
+        'answer': OFFLINE_FALLBACK_MESSAGE,
+        'source': 'offline-fallback',
+        'confidence': 0.0,
+        'online': False
+    }
+
+
+# Identical questions in flight at the same time share one pipeline run
+answer_flight = SingleFlight("answer")
+
+
+def get_smart_response(user_message, language=None):
+    """
+    Run the smart response pipeline inside a metrics trace. `language` is
+    the STT-detected language code; typed questions are guessed from their script.
+    """
+    language = language or guess_language(user_message)
+    key = question_key(user_message)
+    with metrics.trace("pipeline"):
+        result = dict(answer_flight.do((language, key) if key else None, _smart_response_pipeline, user_message, language))
+        metrics.set_source(result['source'])
+        if question_log is not None:
+            question_log.record(user_message, source=result['source'], confidence=result['confidence'], language=language)
+        log.info("pipeline.answer", source=result['source'], confidence=result['confidence'])
+        return result
+
+
+def _smart_response_pipeline(user_message, language=None):
     """
     CACHE-FIRST AI RESPONSE PIPELINE WITH OFFLINE SUPPORT
     Priority Order:
-    1. Cache Check (Works Offline ✅)
+    1. Cache Check (Works Offline ✅), then the host-wide shared tier
     2. Check Internet Connection
-    3. RAG + OpenAI (Online Only)
-    4. RAG Context Summary (Offline Fallback)
+    3. RAG + OpenAI (Online Only; keyword queries retrieve from local BM25)
+    4. RAG Context Summary (Offline Fallback; local BM25 if Pinecone is unreachable)
     5. Offline Message
     """
-    print("\n" + "="*60)
-    print("🧠 SMART RESPONSE PIPELINE")
-    print("="*60)
+    # Keyword-style queries try the local BM25 index before any embedding / Pinecone call
+    keyword_query = _is_keyword_query(user_message)
+    
+    # Concurrent mode: start retrieval (incl. query embedding) and the
+    # connectivity probe while the cache is checked; dropped on a cache hit
+    speculative_docs = speculative_online = None
+    if CONCURRENT_PIPELINE:
+        if not keyword_query:
+            speculative_docs = _submit_stage(_retrieve, user_message)
+        speculative_online = _submit_stage(_probe_connectivity)
     
     # STEP 1: Check Cache First (WORKS OFFLINE)
-    print("1️⃣ Checking cache...")
-    cache_result = cache_manager.find_match(user_message, threshold=85)
+    pipeline_log.debug("pipeline.cache_check")
+    cache_result = _cache_lookup(user_message, language)
     
-    if cache_result['matched']:
-        print("✅ CACHE HIT - Returning verified answer (OFFLINE CAPABLE)")
-        print("="*60 + "\n")
-        return {
-            'answer': cache_result['answer'],
-            'source': 'cache',
-            'confidence': cache_result['confidence'],
-            'online': False  # Works offline
-        }
+    # STEP 1b: Shared tier - answers generated by any worker on this host
+    result = _cache_response(cache_result) if cache_result['matched'] else _shared_cache_response(user_message)
+    if result:
+        for future in (speculative_docs, speculative_online):
+            if future is not None:
+                future.cancel()
+        return result
+    
+    lexical_docs = _retrieve_lexical(user_message) if keyword_query else []
+    if lexical_docs:
+        pipeline_log.debug("pipeline.lexical_hit", docs=len(lexical_docs))
     
     # STEP 2: Check Internet Connection
-    print("2️⃣ Cache miss - Checking internet connection...")
-    is_online = cache_manager.check_internet_connection(timeout=2)
-    print(f"   Internet: {'🟢 Online' if is_online else '🔴 Offline'}")
+    is_online = speculative_online.result() if speculative_online else _probe_connectivity()
+    pipeline_log.debug("pipeline.connectivity", online=is_online)
     
     # STEP 3: Try RAG + OpenAI (If Online)
     if is_online:
-        print("3️⃣ Attempting RAG + OpenAI...")
+        pipeline_log.debug("pipeline.rag_online")
+        context = []
         try:
-            response = rag_chain.invoke({"input": user_message})
-            answer = str(response["answer"])
-            
-            # Add disclaimer if not already present
-            if "consult a certified doctor" not in answer.lower():
-                answer += "\n\n**Note:** This is general information. Consult a certified doctor for personalized medical advice."
-            
-            print("✅ OpenAI response generated")
-            print("="*60 + "\n")
-            return {
-                'answer': answer,
-                'source': 'rag-online',
-                'confidence': 0.75,
-                'online': True
-            }
+            # Retrieval and generation run as separate steps so each gets its own span
+            if lexical_docs:
+                docs = lexical_docs
+            else:
+                try:
+                    docs = speculative_docs.result(timeout=remaining()) if speculative_docs else _retrieve(user_message)
+                except CircuitOpen as e:
+                    docs = _retrieval_unavailable(user_message, e)
+            context = _assemble_context(docs)
+            answer = _generate_hedged(user_message, context)
+            result = _online_response(answer)
+            if shared_cache is not None:
+                shared_cache.put(user_message, result)
+            return result
             
+        except Overloaded as e:
+            # Shed or breaker open: answer from what is already in hand instead of waiting on the LLM
+            pipeline_log.warning("pipeline.llm_shed", reason=e.reason)
+            result = _degraded_response(user_message, context, 'unavailable' if isinstance(e, CircuitOpen) else 'busy')
+            if result:
+                return result
+        except DeadlineExceeded as e:
+            # Hedge: answer now rather than blow the request deadline
+            metrics.inc("chatbot_llm_hedged_total")
+            pipeline_log.warning("pipeline.llm_hedged", error=str(e))
+            result = _degraded_response(user_message, context, 'slow')
+            if result:
+                return result
         except Exception as e:
-            print(f"⚠️  OpenAI Error: {str(e)}")
-            print("   Falling back to offline mode...")
+            pipeline_log.warning("pipeline.openai_error", error=str(e))
     
     # STEP 4: Offline Mode - Use RAG Context Only (No OpenAI API)
-    print("4️⃣ OFFLINE MODE - Using RAG context without OpenAI...")
+    pipeline_log.debug("pipeline.rag_offline")
     try:
-        # Get relevant documents from Pinecone (this works offline if Pinecone is cached)
-        docs = retriever.get_relevant_documents(user_message)
+        # Reuse the lexical or speculative retrieval if it succeeded, otherwise query again
+        docs = lexical_docs or _speculative_result(speculative_docs)
+        if docs is None and not expired():
+            # Get relevant documents from Pinecone (this works offline if Pinecone is cached)
+            docs = _retrieve(user_message, "retrieval_offline")
         
-        if docs and len(docs) > 0:
-            # Summarize context from retrieved documents
-            context_summary = "\n\n".join([doc.page_content[:300] for doc in docs[:2]])
-            
-            answer = f"Based on available medical information:\n\n{context_summary}\n\n"
-            answer += "**Note:** This is limited information due to offline mode. "
-            answer += "For complete answers and personalized advice, please try again when internet is available "
-            answer += "or consult a certified doctor immediately for urgent concerns."
-            
-            print(f"✅ Offline RAG summary generated ({len(docs)} docs)")
-            print("="*60 + "\n")
-            return {
-                'answer': answer,
-                'source': 'rag-offline',
-                'confidence': 0.5,
-                'online': False
-            }
+        result = _offline_context_response(_assemble_context(docs))
+        if result:
+            return result
             
     except Exception as e:
-        print(f"⚠️  RAG Context Error: {str(e)}")
+        pipeline_log.warning("pipeline.rag_context_error", error=str(e))
+    
+    # STEP 4b: Pinecone unreachable - the local BM25 index still works offline
+    if not keyword_query:
+        result = _offline_context_response(_retrieve_lexical(user_message, min_score=0.0))
+        if result:
+            return result
     
     # STEP 5: Final Offline Fallback
-    print("5️⃣ Complete offline fallback")
-    print("="*60 + "\n")
+    return _offline_fallback_response()
+
+
+async def aget_smart_response(user_message, language=None):
+    """Async counterpart of get_smart_response for the ASGI entry point (asgi.py)"""
+    language = language or guess_language(user_message)
+    key = question_key(user_message)
+    with metrics.trace("pipeline"):
+        result = dict(await answer_flight.ado(
+            (language, key) if key else None, _asmart_response_pipeline, user_message, language
+        ))
+        metrics.set_source(result['source'])
+        if question_log is not None:
+            # Only queues the line; the append happens on the log writer thread
+            question_log.record(user_message, source=result['source'], confidence=result['confidence'], language=language)
+        log.info("pipeline.answer", source=result['source'], confidence=result['confidence'])
+        return result
+
+
+async def _asmart_response_pipeline(user_message, language=None):
+    """Same steps as _smart_response_pipeline; network waits yield the event loop"""
+    async def retrieve(stage):
+        with metrics.span(stage):
+            return await retriever.ainvoke(user_message)
     
-    offline_message = (
-        "⚠️ **Offline Mode - Limited Information Available**\n\n"
-        "I apologize, but I cannot provide a detailed answer right now because:\n"
-        "- Your question is not in the cached database\n"
-        "- Internet connection is unavailable or unstable\n"
-        "- AI services cannot be reached\n\n"
-        "**What you can do:**\n"
-        "1. Try again when internet connection is restored\n"
-        "2. Rephrase your question - it might match cached answers\n"
-        "3. For urgent medical concerns, please contact a certified doctor immediately\n\n"
-        "**Emergency Numbers:**\n"
-        "- India: 102 (Ambulance), 104 (Medical Helpline)\n"
-        "- International: Your local emergency services"
-    )
+    async def probe():
+        # Connectivity probe uses blocking sockets - keep it off the loop
+        with metrics.span("connectivity_probe"):
+            return await asyncio.to_thread(cache_manager.check_internet_connection, stage_timeout(2))
     
-    return {
-        'answer': offline_message,
-        'source': 'offline-fallback',
-        'confidence': 0.0,
-        'online': False
-    }
+    keyword_query = _is_keyword_query(user_message)
+    
+    speculative_docs = speculative_online = None
+    if CONCURRENT_PIPELINE:
+        if not keyword_query:
+            speculative_docs = asyncio.create_task(retrieve("retrieval"))
+        speculative_online = asyncio.create_task(probe())
+    
+    try:
+        # STEP 1: Cache (in-memory, CPU only; a non-English miss may embed the
+        # question for the cross-lingual lookup, so that runs off the loop)
+        if language in (None, 'en'):
+            cache_result = _cache_lookup(user_message)
+        else:
+            cache_result = await asyncio.to_thread(_cache_lookup, user_message, language)
+        
+        if cache_result['matched']:
+            return _cache_response(cache_result)
+        
+        # STEP 1b: Shared tier (local SQLite read, no network)
+        result = _shared_cache_response(user_message)
+        if result:
+            return result
+        
+        # BM25 is in-memory and CPU only, like the cache lookup
+        lexical_docs = _retrieve_lexical(user_message) if keyword_query else []
+        
+        # STEP 2: Connectivity
+        is_online = await speculative_online if speculative_online else await probe()
+        pipeline_log.debug("pipeline.connectivity", online=is_online)
+        
+        # STEP 3: RAG + OpenAI
+        if is_online:
+            context = []
+            try:
+                if lexical_docs:
+                    docs = lexical_docs
+                else:
+                    try:
+                        docs = await asyncio.wait_for(speculative_docs, remaining()) if speculative_docs else await retrieve("retrieval")
+                    except CircuitOpen as e:
+                        docs = _retrieval_unavailable(user_message, e)
+                context = _assemble_context(docs)
+                answer = await _agenerate_hedged(user_message, context)
+                result = _online_response(answer)
+                if shared_cache is not None:
+                    # A write may wait on another worker's transaction - keep it off the loop
+                    await asyncio.to_thread(shared_cache.put, user_message, result)
+                return result
+                
+            except Overloaded as e:
+                pipeline_log.warning("pipeline.llm_shed", reason=e.reason)
+                result = _degraded_response(user_message, context, 'unavailable' if isinstance(e, CircuitOpen) else 'busy')
+                if result:
+                    return result
+            except DeadlineExceeded as e:
+                metrics.inc("chatbot_llm_hedged_total")
+                pipeline_log.warning("pipeline.llm_hedged", error=str(e))
+                result = _degraded_response(user_message, context, 'slow')
+                if result:
+                    return result
+            except Exception as e:
+                pipeline_log.warning("pipeline.openai_error", error=str(e))
+        
+        # STEP 4: RAG context only
+        try:
+            docs = lexical_docs or None
+            # (cancelled if waiting on it above ran out of time)
+            if docs is None and speculative_docs is not None and not speculative_docs.cancelled():
+                try:
+                    docs = await speculative_docs
+                except Exception:
+                    docs = None
+            if docs is None and not expired():
+                docs = await retrieve("retrieval_offline")
+            
+            result = _offline_context_response(_assemble_context(docs))
+            if result:
+                return result
+                
+        except Exception as e:
+            pipeline_log.warning("pipeline.rag_context_error", error=str(e))
+        
+        # STEP 4b: Local BM25 index
+        if not keyword_query:
+            result = _offline_context_response(_retrieve_lexical(user_message, min_score=0.0))
+            if result:
+                return result
+        
+        # STEP 5: Final Offline Fallback
+        return _offline_fallback_response()
+    
+    finally:
+        # Cache hit or caller cancelled: drop whatever speculative work is still running
+        for task in (speculative_docs, speculative_online):
+            if task is None:
+                continue
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark a failed speculative stage as handled
+
+
+def transcribe(audio_base64):
+    """Speech-to-text behind the STT limiter; raises Overloaded when shed"""
+    with admission.stt.admit():
+        with metrics.span("stt"):
+            return voice_handler.speech_to_text(audio_base64)
+
+
+def synthesize(text, language='en', audio_format=''):
+    """Text-to-speech (limited in voice_handler); None when shed, so callers answer text-only"""
+    try:
+        with metrics.span("tts"):
+            return voice_handler.text_to_speech(text, language=language or 'en', audio_format=audio_format)
+    except Overloaded as e:
+        pipeline_log.warning("pipeline.tts_shed", reason=e.reason)
+        return None
+
+
+async def atranscribe(audio_base64):
+    async with admission.stt.aadmit():
+        with metrics.span("stt"):
+            return await voice_handler.aspeech_to_text(audio_base64)
+
+
+async def asynthesize(text, language='en', audio_format=''):
+    try:
+        with metrics.span("tts"):
+            return await voice_handler.atext_to_speech(text, language=language or 'en', audio_format=audio_format)
+    except Overloaded as e:
+        pipeline_log.warning("pipeline.tts_shed", reason=e.reason)
+        return None
+
+
+def _busy_response(e):
+    """503 for a shed request, or one whose upstream breaker is open"""
+    if isinstance(e, CircuitOpen):
+        response = jsonify({"error": "Service is temporarily unavailable, please retry shortly", "stage": e.stage})
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    else:
+        response = jsonify({"error": "Service is busy, please retry shortly", "stage": e.stage})
+        response.headers['Retry-After'] = BUSY_RETRY_AFTER
+    return response, 503
+
+
+def _batch_generate(user_message, context):
+    # Batch jobs have their own concurrency cap, so they skip the interactive LLM limiter
+    with breakers.openai.guard():
+        with metrics.span("llm"):
+            return question_answer_chain.invoke({"input": user_message, "context": context})
+
+
+def _answer_batch_misses(pending, answers, llm_concurrency):
+    """Retrieval + generation for the questions the caches could not answer (key -> question)"""
+    # Keyword queries come from BM25; the rest share one embedding pass
+    contexts = {}
+    vector_keys = []
+    for key, question in pending.items():
+        docs = _retrieve_lexical(question) if _is_keyword_query(question) else []
+        if docs:
+            contexts[key] = docs
+        else:
+            vector_keys.append(key)
+    
+    is_online = _probe_connectivity()
+    
+    if vector_keys:
+        try:
+            with metrics.span("retrieval"):
+                retrieved = retriever.retrieve_many(
+                    [pending[key] for key in vector_keys], max_workers=BATCH_RETRIEVAL_WORKERS
+                )
+        except Exception as e:
+            pipeline_log.warning("batch.retrieval_error", error=str(e))
+            retrieved = [e] * len(vector_keys)
+        for key, docs in zip(vector_keys, retrieved):
+            if isinstance(docs, Exception):
+                # Pinecone unreachable - the local BM25 index still works offline
+                docs = _retrieve_lexical(pending[key], min_score=0.0)
+            contexts[key] = docs
+    
+    contexts = {key: _assemble_context(docs) for key, docs in contexts.items()}
+    
+    if is_online:
+        with ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="batch-llm") as pool:
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, _batch_generate, question, contexts[key])
+                for key, question in pending.items()
+            }
+        for key, future in futures.items():
+            try:
+                answers[key] = _online_response(future.result())
+            except Exception as e:
+                pipeline_log.warning("batch.llm_error", error=str(e))
+                continue
+            if shared_cache is not None:
+                shared_cache.put(pending[key], answers[key])
+    
+    # No LLM answer: context summary, else the offline message
+    for key in pending:
+        if key not in answers:
+            answers[key] = _offline_context_response(contexts[key]) or _offline_fallback_response()
 
 
-def get_ai_response(user_message):
+def answer_batch(questions, llm_concurrency=BATCH_LLM_CONCURRENCY):
+    """
+    Answer many questions in one call (evaluation / FAQ-generation jobs).
+    
+    Same sources as get_smart_response, done in bulk: one cache pass, one
+    embedding pass for every miss, concurrent vector-store queries, then
+    LLM calls fanned out at most `llm_concurrency` at a time. Nothing is
+    written to chat history. Returns one result dict per question (with
+    'question', 'answer', 'source', 'confidence'), in input order.
+    """
+    with metrics.trace("batch"):
+        # Repeated questions are answered once
+        unique = {}
+        for question in questions:
+            unique.setdefault(question_key(question) or question, question)
+        
+        answers = {}
+        for key, question in unique.items():
+            cache_result = _cache_lookup(question, guess_language(question))
+            if cache_result['matched']:
+                answers[key] = _cache_response(cache_result)
+        for key, question in unique.items():
+            if key not in answers:
+                result = _shared_cache_response(question)
+                if result:
+                    answers[key] = result
+        
+        pending = {key: question for key, question in unique.items() if key not in answers}
+        if pending:
+            _answer_batch_misses(pending, answers, llm_concurrency)
+        
+        metrics.set_source("batch")
+        log.info("batch.answered", questions=len(questions), unique=len(unique), uncached=len(pending))
+        
+        results = []
+        for question in questions:
+            result = dict(answers[question_key(question) or question])
+            result['question'] = question
+            results.append(result)
+        return results
+
+
+def get_ai_response(user_message, language=None):
     """Legacy function - now calls get_smart_response"""
-    result = get_smart_response(user_message)
+    result = get_smart_response(user_message, language)
     return result['answer']
 
 
@@ -275,13 +1102,10 @@ def index():
 
 
 @app.route("/whatsapp", methods=["POST"])
+@metrics.traced("whatsapp")
 def whatsapp_webhook():
     """WhatsApp webhook - Handles both text and voice messages"""
     try:
-        print("\n" + "="*60)
-        print("📱 WhatsApp Webhook Triggered!")
-        print("="*60)
-        
         # Get incoming message details
         incoming_msg = request.values.get('Body', '').strip()
         from_number = request.values.get('From', '')
@@ -289,47 +1113,44 @@ def whatsapp_webhook():
         media_type = request.values.get('MediaContentType0', '')
         num_media = request.values.get('NumMedia', '0')
         
-        print(f"📞 From Number: {from_number}")
-        print(f"💬 Text Message: {incoming_msg}")
-        print(f"🎵 Media URL: {media_url}")
-        print(f"📎 Media Type: {media_type}")
-        print(f"📊 Num Media: {num_media}")
+        pipeline_log.debug(
+            "whatsapp.received",
+            has_text=bool(incoming_msg), media_type=media_type, num_media=num_media
+        )
         
         # Extract user phone number for session
         user_phone = from_number.replace('whatsapp:', '')
         session_id = f"whatsapp_{user_phone}"
-        print(f"🎫 Session ID: {session_id}")
         
         # Handle Voice Message
         if media_url and media_type and 'audio' in media_type.lower():
-            print("🎤 Voice message detected!")
-            print(f"💾 Downloading audio from: {media_url}")
+            pipeline_log.debug("whatsapp.voice_download")
             
             try:
                 # Download audio file from Twilio with authentication
                 auth = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                audio_response = requests.get(media_url, auth=auth, timeout=30)
+                with metrics.span("media_download"):
+                    audio_response = requests.get(media_url, auth=auth, timeout=stage_timeout(30))
                 
                 if audio_response.status_code != 200:
                     raise Exception(f"Failed to download audio: {audio_response.status_code}")
                 
                 # Convert to base64
                 audio_base64 = base64.b64encode(audio_response.content).decode('utf-8')
-                print(f"✅ Audio downloaded ({len(audio_response.content)} bytes) and converted to base64")
+                pipeline_log.debug("whatsapp.voice_downloaded", bytes=len(audio_response.content))
                 
                 # Transcribe audio to text
-                print("🎯 Transcribing audio...")
-                user_result = voice_handler.speech_to_text(audio_base64)
+                user_result = transcribe(audio_base64)
                 
                 if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
                     raise Exception("Failed to transcribe audio")
                 
                 user_text = user_result.get('text')
-                print(f"📝 Transcribed Text: {user_text}")
+                pipeline_log.debug("whatsapp.transcribed", chars=len(user_text))
                 
                 # Save user voice message
-                print(f"💾 Saving user voice message to database...")
-                save_message_to_node(
+                user_saved = _start_stage(
+                    save_message_to_node,
                     sender="user",
                     text=user_text,
                     audio_data=audio_base64,
@@ -337,13 +1158,11 @@ def whatsapp_webhook():
                     user_id=user_phone
                 )
                 
-                # Get AI response using SMART PIPELINE
-                print(f"🤖 Generating AI response...")
-                answer = get_ai_response(user_text)
-                print(f"✅ AI Response: {answer[:100]}...")
+                # Get AI response using SMART PIPELINE, in the language Whisper detected
+                answer = get_ai_response(user_text, user_result.get('language'))
                 
-                # Save bot response
-                print(f"💾 Saving bot response to database...")
+                # Save bot response (after the user message, so history keeps its order)
+                user_saved.result()
                 save_message_to_node(
                     sender="bot",
                     text=answer,
@@ -356,15 +1175,12 @@ def whatsapp_webhook():
                 msg = resp.message()
                 msg.body(f"🎤 You said: *{user_text}*\n\n{answer}")
                 
-                print(f"📤 Sending response back to WhatsApp")
-                print("="*60 + "\n")
+                pipeline_log.debug("whatsapp.replied", kind="voice")
                 
                 return str(resp), 200, {'Content-Type': 'text/xml'}
                 
             except Exception as voice_error:
-                print(f"❌ Voice processing error: {str(voice_error)}")
-                import traceback
-                traceback.print_exc()
+                log.exception("whatsapp.voice_error", error=str(voice_error))
                 
                 resp = MessagingResponse()
                 resp.message("Sorry, I couldn't process your voice message. Please try sending a text message instead or try recording again.")
@@ -372,11 +1188,9 @@ def whatsapp_webhook():
         
         # Handle Text Message
         elif incoming_msg:
-            print("📝 Text message detected!")
-            print(f"💾 Saving user message to database...")
-            
             # Save user message
-            save_message_to_node(
+            user_saved = _start_stage(
+                save_message_to_node,
                 sender="user",
                 text=incoming_msg,
                 session_id=session_id,
@@ -384,12 +1198,10 @@ def whatsapp_webhook():
             )
             
             # Get AI response using SMART PIPELINE
-            print(f"🤖 Generating AI response...")
             answer = get_ai_response(incoming_msg)
-            print(f"✅ AI Response: {answer[:100]}...")
             
-            # Save bot response
-            print(f"💾 Saving bot response to database...")
+            # Save bot response (after the user message, so history keeps its order)
+            user_saved.result()
             save_message_to_node(
                 sender="bot",
                 text=answer,
@@ -402,22 +1214,17 @@ def whatsapp_webhook():
             msg = resp.message()
             msg.body(answer)
             
-            print(f"📤 Sending response back to WhatsApp")
-            print("="*60 + "\n")
+            pipeline_log.debug("whatsapp.replied", kind="text")
             
             return str(resp), 200, {'Content-Type': 'text/xml'}
         
         # Empty message (ignore)
         else:
-            print("⚠️ Empty message - ignoring")
+            pipeline_log.debug("whatsapp.empty_message")
             return str(MessagingResponse()), 200, {'Content-Type': 'text/xml'}
         
     except Exception as e:
-        print(f"\n❌ ERROR in WhatsApp webhook:")
-        print(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("\n")
+        log.exception("whatsapp.error", error=str(e))
         
         resp = MessagingResponse()
         resp.message("Sorry, something went wrong. Please try again later.")
@@ -470,6 +1277,7 @@ def whatsapp_status():
 
 
 @app.route("/get", methods=["GET", "POST"])
+@metrics.traced("chat")
 def chat():
     """Handle text chat"""
     user_id = extract_user_id_from_token()
@@ -494,7 +1302,8 @@ def chat():
     if not session.get('chat_session_id'):
         session['chat_session_id'] = session_id or str(secrets.token_hex(8))
     
-    save_message_to_node(
+    user_saved = _start_stage(
+        save_message_to_node,
         sender="user",
         text=msg,
         session_id=session.get('chat_session_id'),
@@ -506,6 +1315,8 @@ def chat():
     result = get_smart_response(msg)
     answer = result['answer']
     
+    # Join the user-message save first so history keeps its order
+    user_saved.result()
     save_message_to_node(
         sender="bot",
         text=answer,
@@ -524,6 +1335,7 @@ def chat():
 
 
 @app.route("/voice-chat", methods=["POST"])
+@metrics.traced("voice")
 def voice_chat():
     """Handle voice chat"""
     user_id = extract_user_id_from_token()
@@ -538,17 +1350,22 @@ def voice_chat():
         if not audio_base64:
             return jsonify({"error": "No audio data provided"}), 400
         
+        # Reply audio format, e.g. "opus" (compact, WhatsApp's voice-note codec)
+        audio_format = resolve_format(data.get('format'))
+        
         if not session.get('chat_session_id'):
             session['chat_session_id'] = session_id or str(secrets.token_hex(8))
         
-        user_result = voice_handler.speech_to_text(audio_base64)
+        user_result = transcribe(audio_base64)
         
         if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
             return jsonify({"error": "Failed to transcribe audio"}), 400
 
         user_text = user_result.get('text')
+        language = user_result.get('language')
         
-        save_message_to_node(
+        user_saved = _start_stage(
+            save_message_to_node,
             sender="user",
             text=user_text,
             audio_data=audio_base64,
@@ -558,9 +1375,18 @@ def voice_chat():
         )
         
         # Use SMART RESPONSE PIPELINE
-        answer_text = get_ai_response(user_text)
-        answer_audio = voice_handler.text_to_speech(answer_text)
+        result = get_smart_response(user_text, language)
+        answer_text = result['answer']
+        # Cache answers in the user's language come with pre-rendered audio;
+        # shed TTS degrades to a text-only answer
+        language = result.get('language') or language or 'en'
+        if result.get('audio'):
+            answer_audio = audio_transcoder.transcode(result['audio'], audio_format)
+        else:
+            answer_audio = synthesize(answer_text, language, audio_format)
         
+        # Join the user-message save first so history keeps its order
+        user_saved.result()
         save_message_to_node(
             sender="bot",
             text=answer_text,
@@ -573,10 +1399,16 @@ def voice_chat():
         return jsonify({
             "text": answer_text,
             "audio": answer_audio,
+            "mime_type": mime_type(answer_audio),
             "user_text": user_text,
+            "language": language,
             "session_id": session.get('chat_session_id')
         })
         
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 400
+    except Overloaded as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -599,6 +1431,7 @@ def get_chat_history():
 
 
 @app.route("/speech-to-text", methods=["POST"])
+@metrics.traced("speech-to-text")
 def speech_to_text_endpoint():
     """Transcribe audio to text only"""
     try:
@@ -608,37 +1441,48 @@ def speech_to_text_endpoint():
         if not audio_base64:
             return jsonify({"error": "No audio data provided"}), 400
 
-        user_result = voice_handler.speech_to_text(audio_base64)
+        user_result = transcribe(audio_base64)
         
         if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
             return jsonify({"error": "Failed to transcribe audio"}), 500
 
         return jsonify({
             "text": user_result.get('text'),
+            "language": user_result.get('language'),
             "confidence": user_result.get('confidence')
         })
         
+    except Overloaded as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/text-to-speech", methods=["POST"])
+@metrics.traced("text-to-speech")
 def text_to_speech_endpoint():
     """Convert text response to speech"""
     try:
         data = request.get_json()
         text = data.get('text')
+        language = data.get('language') or 'en'
         
         if not text:
             return jsonify({"error": "No text provided"}), 400
         
-        audio_base64 = voice_handler.text_to_speech(text)
+        audio_format = resolve_format(data.get('format'))
+        with metrics.span("tts"):
+            audio_base64 = voice_handler.text_to_speech(text, language=language, audio_format=audio_format)
         
         if not audio_base64:
             return jsonify({"error": "Failed to convert text to speech"}), 500
         
-        return jsonify({"audio": audio_base64})
+        return jsonify({"audio": audio_base64, "mime_type": mime_type(audio_base64)})
         
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 400
+    except Overloaded as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -653,6 +1497,9 @@ def cache_stats():
         return jsonify({
             "success": True,
             "stats": stats,
+            "shared_cache": shared_cache.stats() if shared_cache is not None else None,
+            "breakers": breakers.status(),
+            "effectiveness": cache_telemetry.stats(),
             "system": {
                 "internet": is_online,
                 "cache_enabled": len(cache_manager.cache_data) > 0,
@@ -663,6 +1510,72 @@ def cache_stats():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/cache/reload", methods=["POST"])
+def cache_reload():
+    """Reload the answer cache now (this worker; others pick it up via the file watcher)"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints disabled (set ADMIN_TOKEN)"}), 403
+    if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    try:
+        reloaded = cache_manager.reload(force=True)
+        return jsonify({
+            "success": reloaded,
+            "stats": cache_manager.get_cache_stats()
+        }), 200 if reloaded else 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Answer a list of questions at once (admin token; nothing goes to chat history)"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints disabled (set ADMIN_TOKEN)"}), 403
+    if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = request.get_json(silent=True) or {}
+    questions = data.get('questions')
+    if not isinstance(questions, list) or not questions or not all(isinstance(q, str) and q.strip() for q in questions):
+        return jsonify({"error": "'questions' must be a non-empty list of strings"}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"At most {BATCH_MAX_QUESTIONS} questions per batch"}), 400
+    
+    try:
+        results = answer_batch([q.strip() for q in questions])
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "results": results
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/status", methods=["GET"])
+def status():
+    """Resilience state of this worker: limiters, circuit breakers and coalesced calls in flight"""
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "admission": admission.status(),
+        "breakers": breakers.status(),
+        "coalescing": {
+            "answer": answer_flight.in_flight(),
+            "tts": voice_handler._tts_flight.in_flight()
+        },
+        "tts_codec": audio_transcoder.stats()
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Per-stage latency histograms in Prometheus text format (all workers with METRICS_MULTIPROC_DIR)"""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 @app.errorhandler(500)
 def internal_error(e):
     return jsonify({
@@ -680,6 +1593,7 @@ if __name__ == '__main__':
     print(f"✅ Web Chat: /get endpoint")
     print(f"✅ Voice Chat: /voice-chat endpoint")
     print(f"✅ WhatsApp Bot: /whatsapp endpoint (Text + Voice)")
+    print(f"✅ Metrics: /metrics endpoint (Prometheus)")
     
     # Display cache stats
     try:
@@ -699,4 +1613,5 @@ if __name__ == '__main__':
     
     print("="*60 + "\n")
     
+    # Development server only - production runs: gunicorn -c gunicorn.conf.py app:app
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,446 @@
+"""
+ASGI entry point - asyncio request path for the I/O-bound chat and voice routes.
+
+/get, /voice-chat, /speech-to-text, /text-to-speech, /api/chat/history and
+/whatsapp are served by async handlers, so a worker holds a coroutine (not
+a thread) while waiting on Node, Groq, Pinecone and OpenAI. Every other
+route falls through to the Flask app. /get and /voice-chat read and write
+Flask's signed session cookie, so browsers keep their conversation on
+either entry point.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import asyncio
+import base64
+import math
+import secrets
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from twilio.twiml.messaging_response import MessagingResponse
+
+import app as chatbot
+from src.admission import Overloaded
+from src.audio_codec import UnsupportedFormat, audio_transcoder, mime_type, resolve_format
+from src.circuit_breaker import CircuitOpen
+from src.deadline import stage_timeout, start_deadline
+from src.logger import get_logger, new_request_id
+from src.metrics import metrics
+from src.voice_handler import voice_handler
+
+log = get_logger("asgi")
+
+# Flask's session cookie signer (same SECRET_KEY and format as the Flask routes)
+_session_interface = chatbot.app.session_interface
+_session_serializer = _session_interface.get_signing_serializer(chatbot.app)
+
+
+def _bearer_token(request):
+    auth_header = request.headers.get('Authorization', '')
+    return auth_header.replace('Bearer ', '').strip() if auth_header else None
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return {}
+
+
+def _load_session(request):
+    """Flask session of the request's cookie, {} when missing or invalid"""
+    cookie = request.cookies.get(_session_interface.get_cookie_name(chatbot.app))
+    if cookie:
+        try:
+            max_age = int(chatbot.app.permanent_session_lifetime.total_seconds())
+            return dict(_session_serializer.loads(cookie, max_age=max_age))
+        except BadSignature:
+            pass
+    return {}
+
+
+def _chat_session(request, requested_id):
+    """
+    (chat_session_id, session to save or None), by the Flask routes' rule:
+    the cookie's id wins; without one, the client's session_id or a new id
+    is stored in the cookie.
+    """
+    session = _load_session(request)
+    if session.get('chat_session_id'):
+        return session['chat_session_id'], None
+    session['chat_session_id'] = requested_id or secrets.token_hex(8)
+    return session['chat_session_id'], session
+
+
+def _with_session(response, session):
+    """Set the session cookie on `response` if the session changed (as Flask would)"""
+    if session is not None:
+        app = chatbot.app
+        samesite = _session_interface.get_cookie_samesite(app)
+        response.set_cookie(
+            _session_interface.get_cookie_name(app), _session_serializer.dumps(session),
+            path=_session_interface.get_cookie_path(app), domain=_session_interface.get_cookie_domain(app),
+            secure=_session_interface.get_cookie_secure(app), httponly=_session_interface.get_cookie_httponly(app),
+            samesite=samesite.lower() if samesite else None,
+        )
+    return response
+
+
+def _busy(e):
+    """503 for a shed request, or one whose upstream breaker is open"""
+    if isinstance(e, CircuitOpen):
+        return JSONResponse(
+            {"error": "Service is temporarily unavailable, please retry shortly", "stage": e.stage},
+            status_code=503, headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    return JSONResponse(
+        {"error": "Service is busy, please retry shortly", "stage": e.stage},
+        status_code=503, headers={"Retry-After": chatbot.BUSY_RETRY_AFTER}
+    )
+
+
+def _twiml(resp):
+    return Response(str(resp), status_code=200, media_type='text/xml')
+
+
+async def chat(request):
+    """Handle text chat"""
+    with metrics.trace("chat"):
+        user_id = chatbot.decode_user_id(request.headers.get('Authorization'))
+        token = _bearer_token(request)
+
+        if request.method == "POST":
+            if request.headers.get('content-type', '').startswith('application/json'):
+                data = await _json_body(request)
+            else:
+                data = await request.form()
+        else:
+            data = request.query_params
+
+        msg = data.get("msg")
+
+        if not msg:
+            return JSONResponse({"error": "No message provided"}, status_code=400)
+
+        session_id, session = _chat_session(request, data.get("session_id"))
+
+        user_saved = await chatbot.astart_stage(chatbot.async_save_message_to_node(
+            sender="user", text=msg, session_id=session_id, user_id=user_id, token=token
+        ))
+
+        result = await chatbot.aget_smart_response(msg)
+        answer = result['answer']
+
+        await user_saved  # keep history order: user message first
+
+        await chatbot.async_save_message_to_node(
+            sender="bot", text=answer, session_id=session_id, user_id=user_id, token=token
+        )
+
+        return _with_session(JSONResponse({
+            "answer": answer,
+            "session_id": session_id,
+            "source": result.get('source', 'unknown'),
+            "confidence": result.get('confidence', 0),
+            "online": result.get('online', True)
+        }), session)
+
+
+async def voice_chat(request):
+    """Handle voice chat"""
+    with metrics.trace("voice"):
+        user_id = chatbot.decode_user_id(request.headers.get('Authorization'))
+        token = _bearer_token(request)
+
+        try:
+            data = await _json_body(request)
+            audio_base64 = data.get('audio')
+
+            if not audio_base64:
+                return JSONResponse({"error": "No audio data provided"}, status_code=400)
+
+            # Reply audio format, e.g. "opus" (compact, WhatsApp's voice-note codec)
+            audio_format = resolve_format(data.get('format'))
+
+            session_id, session = _chat_session(request, data.get('session_id'))
+
+            user_result = await chatbot.atranscribe(audio_base64)
+
+            if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
+                return _with_session(JSONResponse({"error": "Failed to transcribe audio"}, status_code=400), session)
+
+            user_text = user_result.get('text')
+            language = user_result.get('language')
+
+            user_saved = await chatbot.astart_stage(chatbot.async_save_message_to_node(
+                sender="user", text=user_text, audio_data=audio_base64,
+                session_id=session_id, user_id=user_id, token=token
+            ))
+
+            result = await chatbot.aget_smart_response(user_text, language)
+            answer_text = result['answer']
+            # Cache answers in the user's language come with pre-rendered audio;
+            # shed TTS degrades to a text-only answer
+            language = result.get('language') or language or 'en'
+            if result.get('audio'):
+                answer_audio = await asyncio.to_thread(audio_transcoder.transcode, result['audio'], audio_format)
+            else:
+                answer_audio = await chatbot.asynthesize(answer_text, language, audio_format)
+
+            await user_saved  # keep history order: user message first
+
+            await chatbot.async_save_message_to_node(
+                sender="bot", text=answer_text, audio_data=answer_audio,
+                session_id=session_id, user_id=user_id, token=token
+            )
+
+            return _with_session(JSONResponse({
+                "text": answer_text,
+                "audio": answer_audio,
+                "mime_type": mime_type(answer_audio),
+                "user_text": user_text,
+                "language": language,
+                "session_id": session_id
+            }), session)
+
+        except UnsupportedFormat as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except Overloaded as e:
+            return _busy(e)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def speech_to_text_endpoint(request):
+    """Transcribe audio to text only"""
+    with metrics.trace("speech-to-text"):
+        try:
+            data = await _json_body(request)
+            audio_base64 = data.get('audio')
+
+            if not audio_base64:
+                return JSONResponse({"error": "No audio data provided"}, status_code=400)
+
+            user_result = await chatbot.atranscribe(audio_base64)
+
+            if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
+                return JSONResponse({"error": "Failed to transcribe audio"}, status_code=500)
+
+            return JSONResponse({
+                "text": user_result.get('text'),
+                "language": user_result.get('language'),
+                "confidence": user_result.get('confidence')
+            })
+
+        except Overloaded as e:
+            return _busy(e)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def text_to_speech_endpoint(request):
+    """Convert text response to speech"""
+    with metrics.trace("text-to-speech"):
+        try:
+            data = await _json_body(request)
+            text = data.get('text')
+            language = data.get('language') or 'en'
+
+            if not text:
+                return JSONResponse({"error": "No text provided"}, status_code=400)
+
+            audio_format = resolve_format(data.get('format'))
+            with metrics.span("tts"):
+                audio_base64 = await voice_handler.atext_to_speech(text, language=language, audio_format=audio_format)
+
+            if not audio_base64:
+                return JSONResponse({"error": "Failed to convert text to speech"}, status_code=500)
+
+            return JSONResponse({"audio": audio_base64, "mime_type": mime_type(audio_base64)})
+
+        except UnsupportedFormat as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except Overloaded as e:
+            return _busy(e)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def get_chat_history(request):
+    """Get chat history from Node.js backend"""
+    session_id = (
+        request.query_params.get('session_id')
+        or _load_session(request).get('chat_session_id', 'default-session')
+    )
+    limit = request.query_params.get('limit', 100)
+
+    messages = await chatbot.async_get_chat_history_from_node(
+        session_id=session_id, limit=limit, token=_bearer_token(request)
+    )
+
+    return JSONResponse({
+        "success": True,
+        "messages": messages,
+        "session_id": session_id
+    })
+
+
+async def whatsapp_webhook(request):
+    """WhatsApp webhook - Handles both text and voice messages"""
+    with metrics.trace("whatsapp"):
+        try:
+            form = await request.form()
+            incoming_msg = (form.get('Body') or '').strip()
+            from_number = form.get('From', '')
+            media_url = form.get('MediaUrl0', '')
+            media_type = form.get('MediaContentType0', '')
+
+            user_phone = from_number.replace('whatsapp:', '')
+            session_id = f"whatsapp_{user_phone}"
+
+            # Handle Voice Message
+            if media_url and media_type and 'audio' in media_type.lower():
+                try:
+                    auth = (chatbot.TWILIO_ACCOUNT_SID or '', chatbot.TWILIO_AUTH_TOKEN or '')
+                    with metrics.span("media_download"):
+                        audio_response = await chatbot.get_async_http_client().get(
+                            media_url, auth=auth, timeout=stage_timeout(30), follow_redirects=True
+                        )
+
+                    if audio_response.status_code != 200:
+                        raise Exception(f"Failed to download audio: {audio_response.status_code}")
+
+                    audio_base64 = base64.b64encode(audio_response.content).decode('utf-8')
+
+                    user_result = await chatbot.atranscribe(audio_base64)
+
+                    if not user_result or not isinstance(user_result, dict) or not user_result.get('text'):
+                        raise Exception("Failed to transcribe audio")
+
+                    user_text = user_result.get('text')
+
+                    user_saved = await chatbot.astart_stage(chatbot.async_save_message_to_node(
+                        sender="user", text=user_text, audio_data=audio_base64,
+                        session_id=session_id, user_id=user_phone
+                    ))
+
+                    answer = (await chatbot.aget_smart_response(user_text, user_result.get('language')))['answer']
+
+                    await user_saved  # keep history order: user message first
+
+                    await chatbot.async_save_message_to_node(
+                        sender="bot", text=answer, session_id=session_id, user_id=user_phone
+                    )
+
+                    resp = MessagingResponse()
+                    resp.message().body(f"🎤 You said: *{user_text}*\n\n{answer}")
+                    return _twiml(resp)
+
+                except Exception as voice_error:
+                    log.exception("whatsapp.voice_error", error=str(voice_error))
+
+                    resp = MessagingResponse()
+                    resp.message("Sorry, I couldn't process your voice message. Please try sending a text message instead or try recording again.")
+                    return _twiml(resp)
+
+            # Handle Text Message
+            elif incoming_msg:
+                user_saved = await chatbot.astart_stage(chatbot.async_save_message_to_node(
+                    sender="user", text=incoming_msg, session_id=session_id, user_id=user_phone
+                ))
+
+                answer = (await chatbot.aget_smart_response(incoming_msg))['answer']
+
+                await user_saved  # keep history order: user message first
+
+                await chatbot.async_save_message_to_node(
+                    sender="bot", text=answer, session_id=session_id, user_id=user_phone
+                )
+
+                resp = MessagingResponse()
+                resp.message().body(answer)
+                return _twiml(resp)
+
+            # Empty message (ignore)
+            return _twiml(MessagingResponse())
+
+        except Exception as e:
+            log.exception("whatsapp.error", error=str(e))
+
+            resp = MessagingResponse()
+            resp.message("Sorry, something went wrong. Please try again later.")
+            return _twiml(resp)
+
+
+# Deadline channel per async route (src/deadline.py budgets); Flask routes set their own
+DEADLINE_CHANNELS = {
+    "/get": "chat",
+    "/voice-chat": "voice",
+    "/whatsapp": "whatsapp",
+    "/speech-to-text": "speech-to-text",
+    "/text-to-speech": "text-to-speech",
+}
+
+
+class RequestIdMiddleware:
+    """Set the log correlation ID and the deadline for each request; echo the ID back"""
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        request_id = new_request_id((headers.get(b"x-request-id") or b"").decode() or None)
+        start_deadline(DEADLINE_CHANNELS.get(scope["path"]))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                response_headers = list(message.get("headers") or [])
+                if not any(name.lower() == b"x-request-id" for name, _ in response_headers):
+                    response_headers.append((b"x-request-id", request_id.encode()))
+                message["headers"] = response_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+@asynccontextmanager
+async def lifespan(asgi_app):
+    yield
+    await chatbot.close_async_http_client()
+    await voice_handler.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route("/get", chat, methods=["GET", "POST"]),
+        Route("/voice-chat", voice_chat, methods=["POST"]),
+        Route("/speech-to-text", speech_to_text_endpoint, methods=["POST"]),
+        Route("/text-to-speech", text_to_speech_endpoint, methods=["POST"]),
+        Route("/api/chat/history", get_chat_history, methods=["GET"]),
+        Route("/whatsapp", whatsapp_webhook, methods=["POST"]),
+        # Everything else (/, /metrics, /cache/stats, /whatsapp/send, ...) stays on Flask
+        Mount("/", app=WSGIMiddleware(chatbot.app)),
+    ],
+    middleware=[
+        Middleware(RequestIdMiddleware),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost:5173", "http://localhost:3000"],
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization"],
+            allow_credentials=True,
+        ),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,62 @@
+"""
+Answer a file of questions in bulk (evaluation / FAQ-generation jobs).
+
+Runs app.answer_batch in-process: one cache pass, one embedding pass,
+concurrent retrieval and a bounded LLM fan-out per chunk of questions.
+Nothing is written to chat history.
+
+    python batch_answer.py questions.txt                    # one question per line
+    python batch_answer.py questions.json --out answers.jsonl --concurrency 16
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+from app import BATCH_LLM_CONCURRENCY, answer_batch
+
+
+def read_questions(path):
+    """A JSON list (of strings or {"question": ...} objects), else one question per line"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            items = json.load(f)
+            return [item["question"] if isinstance(item, dict) else item for item in items]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer questions in bulk")
+    parser.add_argument("path", help="questions file (.json list or one question per line)")
+    parser.add_argument("--out", help="JSON Lines output (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="LLM calls in flight")
+    parser.add_argument("--chunk-size", type=int, default=200, help="questions per answer_batch call")
+    args = parser.parse_args()
+
+    questions = read_questions(args.path)
+    sources = Counter()
+    started = time.perf_counter()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for start in range(0, len(questions), args.chunk_size):
+            for result in answer_batch(questions[start:start + args.chunk_size], llm_concurrency=args.concurrency):
+                sources[result["source"]] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if args.out:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ {len(questions)} questions in {elapsed:.1f}s "
+        f"({len(questions) / elapsed if elapsed else 0:.1f}/s) - "
+        + ", ".join(f"{source}: {count}" for source, count in sources.most_common()),
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
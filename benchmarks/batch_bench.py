@@ -0,0 +1,92 @@
+"""
+Bulk answering: serial get_smart_response vs app.answer_batch.
+
+Every external dependency is a stand-in (see standins.py), and the answer,
+shared and retrieval caches are bypassed so both sides do the same work.
+
+    python benchmarks/batch_bench.py
+    python benchmarks/batch_bench.py --questions 200 --concurrency 16 --llm-latency-ms 1500
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+from standins import Injector, StandinConfig, install
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+QUESTION_STEMS = [
+    "Can stress cause stomach ulcers?",
+    "How long does a common cold usually last?",
+    "Is it safe to exercise with a mild fever?",
+    "What foods help with iron deficiency?",
+    "When should I see a doctor for back pain?",
+    "What are early signs of kidney disease?",
+]
+
+
+def build_questions(count):
+    """Distinct questions the cache will not match"""
+    return [f"{QUESTION_STEMS[i % len(QUESTION_STEMS)]} (case {i})" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs batch answering throughput")
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--serial", type=int, default=20, help="questions timed on the serial path")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--vector-latency-ms", type=float, default=40)
+    parser.add_argument("--out", help="results path (default: benchmarks/results/batch_bench-<timestamp>.json)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["SHARED_CACHE_BACKEND"] = "none"
+    os.environ["RETRIEVER_CACHE_SIZE"] = "0"
+    install(StandinConfig(
+        llm=Injector(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_latency_ms * 0.2),
+        vector=Injector(latency_ms=args.vector_latency_ms),
+    ))
+    import app  # noqa: E402 - after the stand-ins are installed
+
+    questions = build_questions(args.questions)
+
+    started = time.perf_counter()
+    for question in questions[:args.serial]:
+        app.get_smart_response(question)
+    serial_rate = args.serial / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    results = app.answer_batch(questions, llm_concurrency=args.concurrency)
+    batch_seconds = time.perf_counter() - started
+    batch_rate = len(questions) / batch_seconds
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "questions": len(questions),
+        "llm_concurrency": args.concurrency,
+        "llm_latency_ms": args.llm_latency_ms,
+        "serial_questions_per_sec": round(serial_rate, 2),
+        "batch_questions_per_sec": round(batch_rate, 2),
+        "batch_seconds": round(batch_seconds, 2),
+        "speedup": round(batch_rate / serial_rate, 1) if serial_rate else 0,
+        "batch_sources": {s: sum(1 for r in results if r["source"] == s) for s in {r["source"] for r in results}},
+    }
+    print(
+        f"serial: {report['serial_questions_per_sec']}/s  batch: {report['batch_questions_per_sec']}/s  "
+        f"speedup: {report['speedup']}x  sources: {report['batch_sources']}"
+    )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"batch_bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
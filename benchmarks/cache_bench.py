@@ -0,0 +1,310 @@
+"""
+Microbenchmarks for CacheManager at scale.
+
+Generates synthetic medical FAQ caches (1k .. 1M entries), then measures
+load time, memory footprint, lookup latency (hits and misses), insert cost
+and get_cache_stats for each matching mode: rapidfuzz, fuzzywuzzy, exact.
+
+    python benchmarks/cache_bench.py
+    python benchmarks/cache_bench.py --sizes 1000,10000 --modes rapidfuzz,exact
+    python benchmarks/cache_bench.py --compare benchmarks/results/cache_bench-20260101-120000.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Per-lookup debug logs would dominate the timings
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import src.cache_manager as cache_module  # noqa: E402
+from src.cache_manager import CacheManager  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+CONDITIONS = {
+    "endocrinology": ["diabetes", "type 2 diabetes", "hypothyroidism", "hyperthyroidism", "PCOS", "obesity", "gestational diabetes", "prediabetes"],
+    "cardiology": ["high blood pressure", "low blood pressure", "heart attack", "angina", "arrhythmia", "high cholesterol", "heart failure", "stroke"],
+    "general": ["fever", "common cold", "flu", "fatigue", "dehydration", "insomnia", "headache", "body ache"],
+    "respiratory": ["asthma", "bronchitis", "pneumonia", "COPD", "tuberculosis", "sinusitis", "chronic cough", "sleep apnea"],
+    "gastroenterology": ["acidity", "gastritis", "constipation", "diarrhea", "IBS", "food poisoning", "ulcers", "fatty liver"],
+    "neurology": ["migraine", "epilepsy", "vertigo", "Parkinson's disease", "neuropathy", "memory loss", "tremors", "Bell's palsy"],
+    "dermatology": ["eczema", "psoriasis", "acne", "fungal infection", "hives", "dandruff", "vitiligo", "sunburn"],
+    "infectious": ["dengue", "malaria", "typhoid", "chickenpox", "COVID-19", "jaundice", "cholera", "measles"],
+    "musculoskeletal": ["arthritis", "back pain", "osteoporosis", "gout", "sprained ankle", "frozen shoulder", "sciatica", "neck pain"],
+    "mental_health": ["anxiety", "depression", "panic attacks", "stress", "burnout", "OCD", "PTSD", "bipolar disorder"],
+    "hematology": ["anemia", "iron deficiency", "thalassemia", "low platelets", "vitamin B12 deficiency", "sickle cell disease", "blood clots", "hemophilia"],
+    "nephrology": ["kidney stones", "UTI", "kidney disease", "frequent urination", "protein in urine", "edema", "high creatinine", "dialysis"],
+}
+
+TEMPLATES = [
+    "What are the symptoms of {c}?",
+    "What are the early signs of {c}?",
+    "How is {c} diagnosed?",
+    "How is {c} treated?",
+    "What causes {c}?",
+    "How can I prevent {c}?",
+    "Is {c} contagious?",
+    "What foods should I avoid with {c}?",
+    "What should I eat if I have {c}?",
+    "When should I see a doctor for {c}?",
+    "Can {c} be cured permanently?",
+    "What are the home remedies for {c}?",
+    "Which tests are needed for {c}?",
+    "What medicines are used for {c}?",
+    "Is exercise safe with {c}?",
+    "What are the complications of {c}?",
+    "How long does {c} last?",
+    "Is {c} hereditary?",
+    "What is the difference between {c} and a normal condition?",
+    "How do I manage {c} at home?",
+]
+
+SUBJECTS = ["", "in children", "in adults", "in elderly people", "during pregnancy", "in teenagers", "in women", "in men", "in infants", "in athletes"]
+PREFIXES = ["", "Doctor, ", "Quick question: ", "Please tell me, ", "My mother wants to know: ", "I am worried - "]
+CONTEXTS = ["", "in summer", "in winter", "during monsoon", "after surgery", "while travelling", "at night", "after meals", "with diabetes", "with high blood pressure"]
+
+# Word-level paraphrase rules used to build near-miss hit queries
+PARAPHRASES = [
+    ("What are", "Tell me"), ("symptoms", "signs"), ("How can I", "How do I"), ("treated", "cured"),
+    ("should I", "do I need to"), ("see a doctor", "visit a doctor"), ("medicines", "medications"),
+]
+
+
+def generate_entries(size, seed=7):
+    """Deterministic synthetic cache with `size` unique questions"""
+    rng = random.Random(seed)
+    combos = []
+    for category, conditions in CONDITIONS.items():
+        for condition in conditions:
+            combos.append((category, condition))
+
+    entries = []
+    space = itertools.product(PREFIXES, CONTEXTS, SUBJECTS, TEMPLATES, combos)
+    for idx, (prefix, context, subject, template, (category, condition)) in enumerate(space):
+        if idx >= size:
+            break
+        question = template.format(c=condition)
+        qualifier = " ".join(p for p in (subject, context) if p)
+        if qualifier:
+            question = question[:-1] + f" {qualifier}?"
+        if prefix:
+            question = prefix + question[0].lower() + question[1:]
+        entries.append({
+            "id": idx + 1,
+            "question": question,
+            "answer": f"General information about {condition}. " * rng.randint(3, 6)
+                      + "\n\n**Note:** This is general information. Consult a certified doctor.",
+            "keywords": [condition, category] + ([subject] if subject else []),
+            "category": category,
+        })
+
+    if len(entries) < size:
+        raise ValueError(f"generator only supports {len(entries)} unique entries")
+    return entries
+
+
+def paraphrase(question, rng):
+    """Light rewording plus an occasional typo - should still be a cache hit"""
+    for old, new in PARAPHRASES:
+        if old in question and rng.random() < 0.5:
+            question = question.replace(old, new, 1)
+    if rng.random() < 0.3 and len(question) > 10:
+        i = rng.randrange(1, len(question) - 1)
+        question = question[:i] + question[i + 1] + question[i] + question[i + 2:]
+    return question.lower() if rng.random() < 0.5 else question
+
+
+def build_queries(entries, count, seed=11):
+    rng = random.Random(seed)
+    hits = [paraphrase(rng.choice(entries)["question"], rng) for _ in range(count)]
+    misses = [
+        f"How much {rng.choice(['water', 'sleep', 'protein', 'vitamin D'])} do I need per {rng.choice(['day', 'week'])} at age {rng.randint(5, 90)}?"
+        for _ in range(count)
+    ]
+    return hits, misses
+
+
+def available_modes():
+    modes = {}
+    try:
+        from rapidfuzz import fuzz, process
+        modes["rapidfuzz"] = (fuzz, process)
+    except ImportError:
+        pass
+    try:
+        from fuzzywuzzy import fuzz, process
+        modes["fuzzywuzzy"] = (fuzz, process)
+    except ImportError:
+        pass
+    modes["exact"] = (None, None)
+    return modes
+
+
+def select_mode(manager, mode, libs):
+    """Point the cache module at one matching backend"""
+    fuzz, process = libs[mode]
+    if mode == "exact":
+        manager.fuzzy_available = False
+        return
+    cache_module.FUZZY_LIB = mode
+    cache_module.fuzz = fuzz
+    cache_module.process = process
+    manager.fuzzy_available = True
+
+
+def time_lookups(manager, queries, budget_seconds):
+    """Run lookups until the list or the time budget runs out"""
+    latencies, hits = [], 0
+    deadline = time.perf_counter() + budget_seconds
+    for query in queries:
+        start = time.perf_counter()
+        result = manager.find_match(query, threshold=85)
+        latencies.append(time.perf_counter() - start)
+        hits += 1 if result["matched"] else 0
+        if time.perf_counter() > deadline:
+            break
+    latencies.sort()
+    return {
+        "lookups": len(latencies),
+        "hit_rate": round(hits / len(latencies), 4) if latencies else 0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else 0,
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3) if latencies else 0,
+    }
+
+
+def bench_size(size, modes, libs, args, workdir):
+    entries = generate_entries(size)
+    path = os.path.join(workdir, f"cache_{size}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    file_mb = os.path.getsize(path) / 1e6
+    hit_queries, miss_queries = build_queries(entries, args.queries)
+    del entries
+    gc.collect()
+
+    # Load time and memory, measured once per size
+    tracemalloc.start()
+    start = time.perf_counter()
+    manager = CacheManager(cache_file_path=path)
+    load_seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    manager.get_cache_stats()
+    stats_ms = (time.perf_counter() - start) * 1000
+
+    row = {
+        "size": size,
+        "file_mb": round(file_mb, 2),
+        "load_seconds": round(load_seconds, 4),
+        "memory_mb": round(current / 1e6, 2),
+        "peak_load_memory_mb": round(peak / 1e6, 2),
+        "stats_ms": round(stats_ms, 3),
+        "modes": {},
+    }
+
+    for mode in modes:
+        select_mode(manager, mode, libs)
+        row["modes"][mode] = {
+            "hit": time_lookups(manager, hit_queries, args.budget),
+            "miss": time_lookups(manager, miss_queries, args.budget),
+        }
+
+    # Insert cost: add_to_cache rewrites the whole file, so only a few samples
+    insert_times = []
+    for i in range(args.inserts):
+        start = time.perf_counter()
+        manager.add_to_cache(f"Benchmark insert question {i}?", "Benchmark answer.", ["benchmark"], "general")
+        insert_times.append(time.perf_counter() - start)
+    row["insert_ms"] = round(sum(insert_times) / len(insert_times) * 1000, 3) if insert_times else None
+
+    os.remove(path)
+    return row
+
+
+def print_row(row, previous=None):
+    def delta(new, old):
+        if old in (None, 0) or new is None:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    prev = previous or {}
+    print(f"\n📦 {row['size']:,} entries - file {row['file_mb']} MB")
+    print(f"   load      {row['load_seconds'] * 1000:.1f} ms{delta(row['load_seconds'], prev.get('load_seconds'))}")
+    print(f"   memory    {row['memory_mb']} MB (peak {row['peak_load_memory_mb']} MB){delta(row['memory_mb'], prev.get('memory_mb'))}")
+    print(f"   insert    {row['insert_ms']} ms{delta(row['insert_ms'], prev.get('insert_ms'))}")
+    print(f"   stats     {row['stats_ms']} ms")
+    for mode, data in row["modes"].items():
+        prev_mode = prev.get("modes", {}).get(mode, {})
+        for kind in ("hit", "miss"):
+            r = data[kind]
+            old = prev_mode.get(kind, {}).get("p50_ms")
+            print(
+                f"   {mode:<10} {kind:<4} p50 {r['p50_ms']} ms{delta(r['p50_ms'], old)}  "
+                f"p99 {r['p99_ms']} ms  hit-rate {r['hit_rate']}  (n={r['lookups']})"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CacheManager scaling microbenchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--modes", default="rapidfuzz,fuzzywuzzy,exact")
+    parser.add_argument("--queries", type=int, default=200, help="hit and miss queries per mode")
+    parser.add_argument("--budget", type=float, default=20.0, help="max seconds per lookup series")
+    parser.add_argument("--inserts", type=int, default=3)
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--out", help="results path (default: benchmarks/results/cache_bench-<timestamp>.json)")
+    args = parser.parse_args()
+
+    libs = available_modes()
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    skipped = [m for m in modes if m not in libs]
+    modes = [m for m in modes if m in libs]
+    if skipped:
+        print(f"⚠️  Skipping unavailable modes: {', '.join(skipped)}")
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = {row["size"]: row for row in json.load(f)["results"]}
+
+    workdir = tempfile.mkdtemp(prefix="cache_bench_")
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            row = bench_size(size, modes, libs, args, workdir)
+            print_row(row, previous.get(size))
+            results.append(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"cache_bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "modes": modes,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✅ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Ingestion throughput: embedding worker processes x concurrent upserts.
+
+Runs src/ingestion.py's IngestionEngine over synthetic chunks into a local
+vector sink stand-in, for each worker count / batch size, and reports
+chunks/sec and speedup over the first configuration.
+
+    python benchmarks/ingest_bench.py
+    python benchmarks/ingest_bench.py --workers 1,2,4,8 --chunks 20000 --sink-latency-ms 120
+    python benchmarks/ingest_bench.py --real-embeddings --chunks 2000
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import time
+
+from standins import SAMPLE_CHUNKS, HashEmbeddings, Injector, VectorSinkStandin
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from src.ingestion import IngestionEngine  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def synthetic_chunks(count, seed=13):
+    """~120-token chunks stitched from the sample corpus"""
+    rng = random.Random(seed)
+    return [
+        Document(
+            page_content=" ".join(rng.choice(SAMPLE_CHUNKS) for _ in range(4)),
+            metadata={"source": "synthetic.pdf", "page": i // 8, "start_index": (i % 8) * 600},
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Ingestion engine throughput")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, max(1, cores // 2), cores})))
+    parser.add_argument("--batch-sizes", default="64")
+    parser.add_argument("--max-inflight", type=int, default=8, help="pending upserts before back-pressure")
+    parser.add_argument("--sink-latency-ms", type=float, default=80, help="stand-in latency per upsert call")
+    parser.add_argument("--cpu-ms", type=float, default=2.0, help="stand-in embedding CPU cost per chunk")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the MiniLM model instead of the stand-in")
+    parser.add_argument("--out", help="results path (default: benchmarks/results/ingest_bench-<timestamp>.json)")
+    args = parser.parse_args()
+
+    documents = synthetic_chunks(args.chunks)
+    factory_kwargs = {}
+    if not args.real_embeddings:
+        factory_kwargs["embedder_factory"] = functools.partial(HashEmbeddings, cpu_ms=args.cpu_ms)
+
+    results, baseline = [], None
+    print(f"{'workers':>8}{'batch':>8}{'chunks/s':>12}{'wall s':>10}{'embed s':>10}{'upload s':>10}{'speedup':>10}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",") if b.strip()):
+        for workers in (int(w) for w in args.workers.split(",") if w.strip()):
+            sink = VectorSinkStandin(Injector(latency_ms=args.sink_latency_ms, jitter_ms=args.sink_latency_ms * 0.2))
+            engine = IngestionEngine(
+                workers=workers, batch_size=batch_size, max_inflight_upserts=args.max_inflight, **factory_kwargs
+            )
+            report = engine.run(documents, sink, keep_vectors=False)
+            report.pop("vectors")
+            report["sink_records"] = sink.records
+            baseline = baseline or report["chunks_per_sec"]
+            report["speedup"] = round(report["chunks_per_sec"] / baseline, 2) if baseline else 0
+            results.append(report)
+            print(
+                f"{workers:>8}{batch_size:>8}{report['chunks_per_sec']:>12}{report['wall_seconds']:>10}"
+                f"{report['embed_seconds']:>10}{report['upload_seconds']:>10}{report['speedup']:>9}x"
+            )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"ingest_bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": cores,
+            "embeddings": "minilm" if args.real_embeddings else f"stand-in ({args.cpu_ms} ms/chunk)",
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✅ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Offline end-to-end load test for app.py.
+
+Starts the app on a local port with every external dependency replaced by
+a stand-in (see standins.py) and drives /get, /voice-chat and /whatsapp at
+a fixed concurrency. Reports throughput and p50/p95/p99 per endpoint.
+
+    python benchmarks/load_test.py --concurrency 32 --requests 500
+    python benchmarks/load_test.py --llm-latency-ms 2000 --error-rate 0.05 --json-out bench_output.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from standins import Injector, StandinConfig, fake_audio_base64, install
+
+ENDPOINTS = ("get", "voice-chat", "whatsapp")
+
+# Questions the cache will not match, so they exercise the RAG path
+NOVEL_QUESTIONS = [
+    "Can stress cause stomach ulcers?",
+    "How long does a common cold usually last?",
+    "Is it safe to exercise with a mild fever?",
+    "What foods help with iron deficiency?",
+    "When should I see a doctor for back pain?",
+    "How much water should an adult drink daily?",
+    "What are early signs of kidney disease?",
+    "Can allergies cause a sore throat?",
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def load_cached_questions(path="data/medical_cache.json"):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [item["question"] for item in json.load(f)]
+    except Exception:
+        return []
+
+
+def build_config(args):
+    def injector(latency):
+        return Injector(latency_ms=latency, jitter_ms=latency * args.jitter, error_rate=args.error_rate)
+
+    return StandinConfig(
+        vector=injector(args.vector_latency_ms),
+        llm=injector(args.llm_latency_ms),
+        embeddings=injector(args.embedding_latency_ms),
+        stt=injector(args.stt_latency_ms),
+        tts=injector(args.tts_latency_ms),
+        node=injector(args.node_latency_ms),
+        media=injector(args.media_latency_ms),
+        online=not args.offline,
+    )
+
+
+def start_app(port):
+    """Import app.py (after stand-ins are installed) and serve it on a thread"""
+    from werkzeug.serving import make_server
+
+    import app as chatbot_app
+
+    server = make_server("127.0.0.1", port, chatbot_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_asgi_app(port):
+    """Serve asgi.py with uvicorn on a thread"""
+    import uvicorn
+
+    import asgi
+
+    if not port:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(asgi.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def shutdown():
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return shutdown, f"http://127.0.0.1:{port}"
+
+
+def make_request(session, base_url, standin_url, endpoint, question):
+    if endpoint == "get":
+        return session.post(f"{base_url}/get", json={"msg": question, "session_id": "loadtest"}, timeout=120)
+    if endpoint == "voice-chat":
+        return session.post(
+            f"{base_url}/voice-chat",
+            json={"audio": fake_audio_base64(), "session_id": "loadtest"},
+            timeout=120,
+        )
+    # Twilio webhook form post; half text, half voice notes
+    if random.random() < 0.5:
+        form = {"Body": question, "From": "whatsapp:+910000000000", "NumMedia": "0"}
+    else:
+        form = {
+            "Body": "",
+            "From": "whatsapp:+910000000000",
+            "NumMedia": "1",
+            "MediaUrl0": f"{standin_url}/media/voice.ogg",
+            "MediaContentType0": "audio/ogg",
+        }
+    return session.post(f"{base_url}/whatsapp", data=form, timeout=120)
+
+
+def response_ok(endpoint, response):
+    """HTTP success - and for voice chat, reply audio (TTS failures come back as a 200 without it)"""
+    if response.status_code >= 400:
+        return False
+    if endpoint == "voice-chat":
+        try:
+            return bool(response.json().get("audio"))
+        except ValueError:
+            return False
+    return True
+
+
+def run(args):
+    config = build_config(args)
+    standin_server = install(config)
+    shutdown_app, base_url = (start_asgi_app if args.asgi else start_app)(args.port)
+
+    cached = load_cached_questions()
+    questions = [
+        random.choice(cached) if cached and random.random() < args.cache_hit_ratio else random.choice(NOVEL_QUESTIONS)
+        for _ in range(args.requests)
+    ]
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    plan = [(endpoints[i % len(endpoints)], q) for i, q in enumerate(questions)]
+
+    results = {e: {"latencies": [], "errors": 0} for e in endpoints}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def worker(item):
+        endpoint, question = item
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = make_request(local.session, base_url, standin_server.base_url, endpoint, question)
+            ok = response_ok(endpoint, response)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            results[endpoint]["latencies"].append(elapsed)
+            if not ok:
+                results[endpoint]["errors"] += 1
+
+    # Warm-up pass so imports / first-request costs do not skew the numbers
+    for endpoint in endpoints:
+        worker((endpoint, questions[0] if questions else NOVEL_QUESTIONS[0]))
+    for endpoint in endpoints:
+        results[endpoint] = {"latencies": [], "errors": 0}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, plan))
+    wall = time.perf_counter() - started
+
+    shutdown_app()
+    standin_server.stop()
+
+    report = {
+        "server": "asgi" if args.asgi else "wsgi",
+        "concurrency": args.concurrency,
+        "requests": len(plan),
+        "wall_seconds": round(wall, 3),
+        "endpoints": {},
+    }
+    for endpoint, data in results.items():
+        latencies = sorted(data["latencies"])
+        report["endpoints"][endpoint] = {
+            "requests": len(latencies),
+            "errors": data["errors"],
+            "throughput_rps": round(len(latencies) / wall, 2) if wall else 0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        }
+    report["throughput_rps"] = round(len(plan) / wall, 2) if wall else 0
+    return report
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"📊 LOAD TEST ({report['server']}) - concurrency={report['concurrency']} requests={report['requests']}")
+    print("=" * 60)
+    print(f"{'endpoint':<12}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, row in report["endpoints"].items():
+        print(
+            f"{endpoint:<12}{row['requests']:>7}{row['errors']:>8}{row['throughput_rps']:>9}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+        )
+    print(f"\nTotal throughput: {report['throughput_rps']} req/s over {report['wall_seconds']}s")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the medical chatbot")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of get,voice-chat,whatsapp")
+    parser.add_argument("--cache-hit-ratio", type=float, default=0.5, help="share of questions taken from the cache file")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--asgi", action="store_true", help="drive the async entry point (asgi.py) instead of Flask")
+    parser.add_argument("--offline", action="store_true", help="make the connectivity probe report offline")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="injected failure rate for every stand-in")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of latency")
+    parser.add_argument("--vector-latency-ms", type=float, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--embedding-latency-ms", type=float, default=5)
+    parser.add_argument("--stt-latency-ms", type=float, default=400)
+    parser.add_argument("--tts-latency-ms", type=float, default=300)
+    parser.add_argument("--node-latency-ms", type=float, default=15)
+    parser.add_argument("--media-latency-ms", type=float, default=50)
+    parser.add_argument("--json-out", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    # Keep per-request INFO logs off stdout so they do not compete with the client
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    report = run(args)
+    print_report(report)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.json_out}")
+
+    worst_error_rate = max(
+        (row["errors"] / row["requests"] for row in report["endpoints"].values() if row["requests"]),
+        default=0,
+    )
+    sys.exit(1 if worst_error_rate > args.error_rate + 0.05 else 0)
+
+
+if __name__ == "__main__":
+    main()
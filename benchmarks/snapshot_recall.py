@@ -0,0 +1,147 @@
+"""
+Recall vs memory for the quantized vector snapshot (src/vector_snapshot.py).
+
+Builds a snapshot (synthetic clustered 384-d vectors by default, or an
+exported one via --snapshot), then for binary and int8 stage-one scans and
+several candidate counts measures recall@k against exact float search,
+query latency and the bytes per vector the scan keeps resident.
+
+    python benchmarks/snapshot_recall.py
+    python benchmarks/snapshot_recall.py --count 1000000 --candidates 30,100,300
+    python benchmarks/snapshot_recall.py --snapshot data/vector_snapshot
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from src.vector_snapshot import VectorSnapshot, write_snapshot  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def synthetic_vectors(count, dims, clusters, seed=3):
+    """Clustered vectors with a skewed spectrum, closer to sentence embeddings than iid noise"""
+    rng = np.random.default_rng(seed)
+    spectrum = np.linspace(1.0, 0.1, dims).astype(np.float32)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32) * spectrum
+    labels = rng.integers(0, clusters, size=count)
+    noise = rng.standard_normal((count, dims)).astype(np.float32) * spectrum * 0.6
+    return centers[labels] + noise
+
+
+def make_queries(vectors, count, seed=5):
+    """Perturbed corpus rows: each query has real near neighbours"""
+    rng = np.random.default_rng(seed)
+    rows = vectors[rng.integers(0, len(vectors), size=count)]
+    queries = rows + rng.standard_normal(rows.shape).astype(np.float32) * rows.std() * 0.3
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(floats, queries, k):
+    truth = []
+    for query in queries:
+        scores = floats @ query
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def bench_mode(path, mode, candidates, queries, truth, k):
+    snapshot = VectorSnapshot(path, mode=mode)
+    bytes_per_vector = snapshot.codes.nbytes / max(1, len(snapshot))
+    rows = []
+    for count in candidates:
+        hits, started = 0, time.perf_counter()
+        for query, expected in zip(queries, truth):
+            found = {row for row, _ in snapshot.search(query, k=k, candidates=count)}
+            hits += len(found & expected)
+        elapsed = time.perf_counter() - started
+        rows.append({
+            "mode": mode,
+            "candidates": count,
+            "recall": round(hits / (k * len(queries)), 4),
+            "query_ms": round(elapsed / len(queries) * 1000, 3),
+            "scan_bytes_per_vector": round(bytes_per_vector, 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized snapshot recall vs memory")
+    parser.add_argument("--snapshot", help="existing snapshot directory (default: build a synthetic one)")
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", default="10,30,100,300")
+    parser.add_argument("--out", help="results path (default: benchmarks/results/snapshot_recall-<timestamp>.json)")
+    args = parser.parse_args()
+
+    workdir = None
+    path = args.snapshot
+    if not path:
+        workdir = tempfile.mkdtemp(prefix="snapshot_bench_")
+        path = workdir
+        vectors = synthetic_vectors(args.count, args.dims, args.clusters)
+        started = time.perf_counter()
+        write_snapshot(vectors, [Document(page_content="") for _ in range(len(vectors))], path)
+        print(f"Snapshot of {len(vectors)} x {args.dims} written in {time.perf_counter() - started:.1f}s")
+        del vectors
+
+    try:
+        floats = np.load(os.path.join(path, "vectors.f32.npy"), mmap_mode="r")
+        queries = make_queries(np.asarray(floats), args.queries)
+        truth = exact_top_k(np.asarray(floats), queries, args.k)
+        vector_count = len(floats)
+        float_bytes = floats.nbytes / max(1, vector_count)
+
+        candidates = [int(c) for c in args.candidates.split(",") if c.strip()]
+        results = []
+        for mode in ("binary", "int8"):
+            results.extend(bench_mode(path, mode, candidates, queries, truth, args.k))
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 72)
+    print(f"📊 SNAPSHOT RECALL@{args.k} - {vector_count} vectors, float32 = {float_bytes:.0f} B/vector")
+    print("=" * 72)
+    print(f"{'mode':<8}{'candidates':>12}{'recall':>10}{'query ms':>12}{'scan B/vec':>12}{'vs f32':>10}")
+    for row in results:
+        print(
+            f"{row['mode']:<8}{row['candidates']:>12}{row['recall']:>10}{row['query_ms']:>12}"
+            f"{row['scan_bytes_per_vector']:>12}{float_bytes / row['scan_bytes_per_vector']:>9.0f}x"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"snapshot_recall-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "vectors": int(vector_count),
+            "k": args.k,
+            "float_bytes_per_vector": float_bytes,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✅ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Local stand-ins for every external dependency of app.py.
+
+Pinecone, OpenAI, HuggingFace embeddings and gTTS are replaced in-process;
+the Node API, Groq STT/TTS and Twilio media downloads are served by a
+local HTTP server. Every stand-in has its own latency / error injection.
+
+Call `install(config)` BEFORE importing `app`.
+"""
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+EMBEDDING_DIM = 384
+
+# Small fixed corpus the fake vector store searches over
+SAMPLE_CHUNKS = [
+    "Diabetes mellitus is a group of metabolic diseases characterized by high blood sugar levels over a prolonged period.",
+    "Hypertension, or high blood pressure, is a long-term condition in which blood pressure in the arteries is persistently elevated.",
+    "Fever is a temporary increase in body temperature, often due to an illness such as an infection.",
+    "Asthma is a chronic inflammatory disease of the airways causing wheezing, coughing and shortness of breath.",
+    "Migraine is a primary headache disorder characterized by recurrent headaches that are moderate to severe.",
+    "Anemia is a decrease in the total amount of red blood cells or hemoglobin in the blood.",
+    "Pneumonia is an inflammatory condition of the lung affecting primarily the small air sacs known as alveoli.",
+    "Dehydration occurs when the body loses more fluids than it takes in, leading to thirst, fatigue and dizziness.",
+    "Arthritis is a term often used to mean any disorder that affects joints, with joint pain and stiffness.",
+    "Gastritis is inflammation of the lining of the stomach, which may cause upper abdominal pain and nausea.",
+]
+
+# A few hundred bytes that pass as audio for the STT / media stand-ins
+FAKE_AUDIO = b"RIFF" + b"\x00" * 508
+
+
+@dataclass
+class Injector:
+    """Latency and error injection for one stand-in"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def sleep(self):
+        delay = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def should_fail(self):
+        return bool(self.error_rate) and random.random() < self.error_rate
+
+    def apply(self, name):
+        """Sleep for the configured latency, then maybe raise an injected failure"""
+        self.sleep()
+        if self.should_fail():
+            raise StandinError(f"{name}: injected failure")
+
+
+class StandinError(Exception):
+    pass
+
+
+@dataclass
+class StandinConfig:
+    vector: Injector = field(default_factory=lambda: Injector(latency_ms=40))
+    llm: Injector = field(default_factory=lambda: Injector(latency_ms=800, jitter_ms=200))
+    embeddings: Injector = field(default_factory=lambda: Injector(latency_ms=5))
+    stt: Injector = field(default_factory=lambda: Injector(latency_ms=400, jitter_ms=100))
+    tts: Injector = field(default_factory=lambda: Injector(latency_ms=300, jitter_ms=50))
+    node: Injector = field(default_factory=lambda: Injector(latency_ms=15))
+    media: Injector = field(default_factory=lambda: Injector(latency_ms=50))
+    online: bool = True
+
+
+def _hash_vector(text):
+    """Deterministic unit vector for a text (bag of hashed tokens)"""
+    vec = [0.0] * EMBEDDING_DIM
+    for token in text.lower().split():
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        idx = int.from_bytes(digest[:4], "little") % EMBEDDING_DIM
+        vec[idx] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _build_langchain_standins(config):
+    """Langchain-compatible fakes; imported lazily so the HTTP server works without langchain"""
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_core.vectorstores import VectorStore
+
+    class FakeEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            config.embeddings.apply("embeddings")
+            return [_hash_vector(t) for t in texts]
+
+        def embed_query(self, text):
+            config.embeddings.apply("embeddings")
+            return _hash_vector(text)
+
+    class FakeVectorStore(VectorStore):
+        def __init__(self, embedding, texts=None):
+            self._embedding = embedding
+            self._docs = [
+                Document(page_content=t, metadata={"source": "data/Medical_Data.pdf", "page": i})
+                for i, t in enumerate(texts or SAMPLE_CHUNKS)
+            ]
+            self._vectors = [_hash_vector(d.page_content) for d in self._docs]
+
+        @property
+        def embeddings(self):
+            return self._embedding
+
+        @classmethod
+        def from_existing_index(cls, index_name=None, embedding=None, **kwargs):
+            return cls(embedding)
+
+        @classmethod
+        def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+            return cls(embedding, texts)
+
+        def add_texts(self, texts, metadatas=None, **kwargs):
+            raise NotImplementedError("stand-in vector store is read-only")
+
+        def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+            config.vector.apply("pinecone")
+            scored = [
+                (doc, sum(a * b for a, b in zip(embedding, vec)))
+                for doc, vec in zip(self._docs, self._vectors)
+            ]
+            scored.sort(key=lambda item: item[1], reverse=True)
+            return scored[:k]
+
+        def similarity_search_with_score(self, query, k=4, **kwargs):
+            return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k, **kwargs)
+
+        def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+            return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)]
+
+        def similarity_search(self, query, k=4, **kwargs):
+            return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+        def _select_relevance_score_fn(self):
+            return lambda score: score
+
+    class FakeChatModel(BaseChatModel):
+        model: str = "standin-chat"
+
+        @property
+        def _llm_type(self):
+            return "standin-chat"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            config.llm.apply("openai")
+            prompt_chars = sum(len(str(m.content)) for m in messages)
+            text = (
+                "This is a stand-in answer generated for load testing "
+                f"from {prompt_chars} prompt characters. Consult a certified doctor."
+            )
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    return FakeEmbeddings, FakeVectorStore, FakeChatModel
+
+
+class FakeGTTS:
+    """Drop-in for gtts.gTTS that writes fake MP3 bytes"""
+    config = None
+
+    def __init__(self, text, lang="en", slow=False, timeout=None):
+        self.text = text
+        self.lang = lang
+        self.timeout = timeout
+
+    def write_to_fp(self, fp):
+        self.config.tts.apply("gtts")
+        fp.write(b"ID3" + hashlib.sha1(self.text.encode("utf-8")).digest() * 64)
+
+
+class _StandinRequestHandler(BaseHTTPRequestHandler):
+    """Node API, Groq and Twilio media stand-in"""
+    protocol_version = "HTTP/1.1"
+    config = None
+    node_messages = []
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _inject(self, injector):
+        injector.sleep()
+        if injector.should_fail():
+            self._send(503, {"error": "injected failure"})
+            return False
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+
+        if path.endswith("/chat/save-message-public"):
+            if not self._inject(self.config.node):
+                return
+            message = json.loads(body or b"{}")
+            with self.lock:
+                self.node_messages.append(message)
+                del self.node_messages[:-1000]
+                message_id = len(self.node_messages)
+            return self._send(201, {"success": True, "id": message_id})
+
+        if path.endswith("/audio/transcriptions"):
+            if not self._inject(self.config.stt):
+                return
+            return self._send(200, {
+                "text": "What are the symptoms of diabetes?",
+                "language": "english",
+                "segments": [{"confidence": 0.93}],
+            })
+
+        if path.endswith("/audio/speech"):
+            if not self._inject(self.config.tts):
+                return
+            return self._send(200, FAKE_AUDIO, content_type="audio/wav")
+
+        self._send(404, {"error": "not found"})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if path.endswith("/chat/chat-history-public"):
+            if not self._inject(self.config.node):
+                return
+            with self.lock:
+                messages = list(self.node_messages[-100:])
+            return self._send(200, {"messages": messages})
+
+        if path.startswith("/media/"):
+            if not self._inject(self.config.media):
+                return
+            return self._send(200, FAKE_AUDIO, content_type="audio/ogg")
+
+        self._send(404, {"error": "not found"})
+
+
+class HashEmbeddings:
+    """
+    Picklable embedder for ingestion worker processes: hashed bag-of-words
+    vectors plus `cpu_ms` of busy work per text to stand in for model cost.
+    """
+
+    def __init__(self, cpu_ms=2.0):
+        self.cpu_ms = cpu_ms
+
+    def _burn(self):
+        deadline = time.perf_counter() + self.cpu_ms / 1000.0
+        while time.perf_counter() < deadline:
+            pass
+
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            self._burn()
+            vectors.append(_hash_vector(text))
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class VectorSinkStandin:
+    """Upsert target for IngestionEngine with latency / error injection"""
+
+    def __init__(self, injector=None):
+        self.injector = injector or Injector(latency_ms=80, jitter_ms=20)
+        self.records = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, records):
+        self.injector.apply("vector_sink")
+        with self._lock:
+            self.records += len(records)
+            self.calls += 1
+
+
+class StandinServer:
+    """Threaded local HTTP server for the Node / Groq / Twilio stand-ins"""
+
+    def __init__(self, config, host="127.0.0.1", port=0):
+        handler = type("StandinRequestHandler", (_StandinRequestHandler,), {
+            "config": config,
+            "node_messages": [],
+            "lock": threading.Lock(),
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def node_messages(self):
+        return self.httpd.RequestHandlerClass.node_messages
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def install(config=None):
+    """
+    Point app.py at local stand-ins. Must run before `import app`.
+
+    Returns the running StandinServer.
+    """
+    config = config or StandinConfig()
+    server = StandinServer(config).start()
+
+    os.environ.setdefault("PINECONE_API_KEY", "standin")
+    os.environ.setdefault("OPENAI_API_KEY", "standin")
+    os.environ.setdefault("GROQ_API_KEY", "standin")
+    os.environ["NODE_API_URL"] = f"{server.base_url}/api"
+    os.environ["GROQ_API_URL"] = f"{server.base_url}/groq"
+    os.environ["TWILIO_ACCOUNT_SID"] = "ACstandin"
+    os.environ["TWILIO_AUTH_TOKEN"] = "standin"
+
+    FakeEmbeddings, FakeVectorStore, FakeChatModel = _build_langchain_standins(config)
+
+    import langchain_openai
+    import langchain_pinecone
+    import src.helper
+    langchain_pinecone.PineconeVectorStore = FakeVectorStore
+    langchain_openai.ChatOpenAI = FakeChatModel
+    src.helper.download_hugging_face_embeddings = lambda *args, **kwargs: FakeEmbeddings()
+
+    FakeGTTS.config = config
+    import src.voice_handler
+    src.voice_handler.gTTS = FakeGTTS
+
+    from src.cache_manager import CacheManager
+    CacheManager.check_internet_connection = staticmethod(lambda timeout=3: config.online)
+
+    return server
+
+
+def fake_audio_base64():
+    return base64.b64encode(FAKE_AUDIO).decode("utf-8")
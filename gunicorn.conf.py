@@ -0,0 +1,73 @@
+# Production serving: pre-fork multi-worker gunicorn
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported ONCE in the master (preload_app), so the embedding
+# models (MiniLM, plus the multilingual one for cross-lingual cache lookups),
+# the answer cache and any local vector data are loaded before fork and
+# shared copy-on-write by every worker. Network clients
+# (Pinecone, OpenAI, Twilio) are re-created in each worker after fork.
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Each worker has its own metrics registry: they are shared through files so
+# /metrics reports every worker, whichever one the scrape lands on (src/metrics.py).
+# Set before the app is imported; the previous run's files are removed.
+METRICS_MULTIPROC_DIR = os.environ.setdefault(
+    "METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "chatbot_metrics")
+)
+for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "metrics_*.json")):
+    os.remove(path)
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Requests are mostly network waits, so a few threads per worker keep the cores busy
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")  # off unless set
+errorlog = "-"
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, just before workers fork"""
+    # Move everything allocated so far into the permanent generation so the
+    # collector in each worker never writes to (and un-shares) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Fork-safe re-creation of per-process state"""
+    import app as chatbot_app
+
+    chatbot_app.init_network_clients()
+    # The master's cache-file watcher thread is not inherited
+    chatbot_app.cache_manager.start_watcher()
+
+    # One torch thread pool per worker would oversubscribe the box
+    try:
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
+    except ImportError:
+        pass
+
+
+def worker_exit(server, worker):
+    """Last metrics snapshot of a worker that is shutting down"""
+    from src.metrics import metrics
+
+    metrics.write_snapshot()
+
+
+def child_exit(server, worker):
+    """Runs in the master: an exited worker's counts stay in the totals, its gauges go"""
+    from src.metrics import metrics
+
+    metrics.mark_process_dead(worker.pid)
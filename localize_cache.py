@@ -0,0 +1,107 @@
+"""
+Add per-language variants (translated question + answer, pre-rendered
+answer audio) to medical_cache.json, so non-English voice and WhatsApp
+questions are answered from the cache in the user's language.
+
+    python localize_cache.py --languages hi,ta,bn
+    python localize_cache.py --languages hi --ids 1,2,3 --overwrite
+    python localize_cache.py --languages ta --no-audio
+
+Variants are stored on each entry as
+    "translations": {"hi": {"question": ..., "answer": ..., "audio": "cache_audio/1-hi.mp3"}}
+with audio paths relative to the cache file. The running app picks the
+rewritten cache up through its file watcher.
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from gtts import gTTS
+from langchain_openai import ChatOpenAI
+
+from src.multilingual import SUPPORTED_LANGUAGES
+
+load_dotenv()
+
+AUDIO_DIR = "cache_audio"
+LANGUAGE_NAMES = {code: name.title() for name, code in SUPPORTED_LANGUAGES.items()}
+
+TRANSLATE_PROMPT = (
+    "Translate this medical FAQ entry into {language}. Keep the meaning, tone and "
+    "any safety note exactly; keep markdown formatting. Reply with JSON only: "
+    '{{"question": "...", "answer": "..."}}\n\n'
+    "Question: {question}\n\nAnswer: {answer}"
+)
+
+
+def translate(llm, item, language):
+    reply = llm.invoke(TRANSLATE_PROMPT.format(
+        language=LANGUAGE_NAMES.get(language, language), question=item['question'], answer=item['answer']
+    )).content
+    variant = json.loads(reply[reply.index("{"):reply.rindex("}") + 1])
+    if not variant.get("question") or not variant.get("answer"):
+        raise ValueError("translation is missing the question or answer")
+    return {"question": variant["question"], "answer": variant["answer"]}
+
+
+def render_audio(text, language, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    gTTS(text=text, lang=language, slow=False).save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add translated variants and audio to the answer cache")
+    parser.add_argument("--languages", required=True, help="comma-separated codes, e.g. hi,ta,bn")
+    parser.add_argument("--cache", default="data/medical_cache.json")
+    parser.add_argument("--ids", help="only these entry ids (comma-separated)")
+    parser.add_argument("--overwrite", action="store_true", help="redo variants that already exist")
+    parser.add_argument("--no-audio", action="store_true", help="translate only; TTS runs at request time")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    args = parser.parse_args()
+
+    languages = [code.strip() for code in args.languages.split(",") if code.strip()]
+    ids = {int(i) for i in args.ids.split(",")} if args.ids else None
+
+    with open(args.cache, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    llm = ChatOpenAI(model=args.model, temperature=0)
+    cache_dir = os.path.dirname(args.cache)
+    added = failed = 0
+    started = time.perf_counter()
+
+    for item in entries:
+        if ids is not None and item['id'] not in ids:
+            continue
+        translations = item.setdefault('translations', {})
+        for language in languages:
+            if language in translations and not args.overwrite:
+                continue
+            try:
+                variant = translate(llm, item, language)
+                if not args.no_audio:
+                    audio = os.path.join(AUDIO_DIR, f"{item['id']}-{language}.mp3")
+                    render_audio(variant['answer'], language, os.path.join(cache_dir, audio))
+                    variant['audio'] = audio
+            except Exception as e:
+                failed += 1
+                print(f"⚠️  entry {item['id']} [{language}]: {e}")
+                continue
+            translations[language] = variant
+            added += 1
+            print(f"  entry {item['id']} [{language}]: {variant['question'][:60]}")
+        if not translations:
+            del item['translations']
+
+    # Write-then-rename: the app's file watcher never sees a half-written cache
+    tmp_path = f"{args.cache}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.cache)
+    print(f"✅ {added} variants added ({failed} failed) in {time.perf_counter() - started:.1f}s -> {args.cache}")
+
+
+if __name__ == "__main__":
+    main()
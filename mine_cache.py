@@ -0,0 +1,248 @@
+"""
+Mine logged questions for frequent cache misses and turn them into
+reviewable medical_cache.json entries.
+
+    python mine_cache.py mine                                  # data/question_log.jsonl -> data/medical_cache.candidates.json
+    python mine_cache.py mine logs/*.jsonl --top 100 --similarity 0.85
+    python mine_cache.py promote data/medical_cache.candidates.json   # entries marked "approved": true
+
+`mine` clusters near-duplicate questions with the retrieval embeddings,
+ranks clusters by how often they were asked and the LLM cost a cache hit
+would have saved, drafts an answer for each through the RAG pipeline and
+fills in keywords and category. Nothing reaches the live cache until a
+reviewer sets "approved": true and runs `promote` (picked up by the
+running app's file watcher).
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.cache_manager import cache_manager
+from src.context_builder import CONTEXT_MAX_TOKENS
+from src.helper import download_hugging_face_embeddings
+from src.lexical_index import tokenize
+from src.prompt import system_prompt
+from src.question_log import QUESTION_LOG_PATH, read_questions
+from src.shared_cache import question_key
+from src.tokens import count_tokens
+
+CANDIDATES_PATH = "data/medical_cache.candidates.json"
+
+# gpt-3.5-turbo list prices, USD per 1K tokens (for the savings estimate only)
+PROMPT_PRICE_PER_1K = 0.0005
+COMPLETION_PRICE_PER_1K = 0.0015
+
+# Sources whose answers came from the LLM, so are worth promoting
+LLM_SOURCES = ("rag-online", "shared-cache")
+
+
+def collect(paths, cache_threshold):
+    """Uncached questions: ask counts and phrasings per normalized question"""
+    counts, phrasings = Counter(), {}
+    for question, record in read_questions(paths):
+        if record.get("source") == "cache":
+            continue
+        key = question_key(question)
+        if not key:
+            continue
+        counts[key] += 1
+        phrasings.setdefault(key, Counter())[question] += 1
+
+    # The cache may have grown since these were logged
+    for key in list(counts):
+        if cache_manager.find_match(phrasings[key].most_common(1)[0][0], threshold=cache_threshold)['matched']:
+            del counts[key], phrasings[key]
+    return counts, phrasings
+
+
+def embed(embeddings, texts):
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32) if texts else np.zeros((0, 0), np.float32)
+    if vectors.size:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+    return vectors
+
+
+def cluster(keys, vectors, counts, similarity):
+    """
+    Greedy leader clustering, most-asked question first: each question joins
+    the first cluster whose leader is within `similarity` (cosine), else
+    starts its own. Returns lists of keys, leader first.
+    """
+    order = sorted(range(len(keys)), key=lambda i: -counts[keys[i]])
+    leaders = np.zeros_like(vectors)
+    clusters, members = [], []
+    for i in order:
+        if clusters:
+            scores = leaders[:len(clusters)] @ vectors[i]
+            best = int(np.argmax(scores))
+            if scores[best] >= similarity:
+                members[best].append(keys[i])
+                continue
+        leaders[len(clusters)] = vectors[i]
+        clusters.append(i)
+        members.append([keys[i]])
+    return members
+
+
+def keywords_for(questions, limit=5):
+    terms = Counter()
+    for question in questions:
+        terms.update(set(tokenize(question)))
+    return [term for term, _ in terms.most_common(limit)]
+
+
+def category_for(vector, cache_vectors, cache_categories, k=3, min_similarity=0.3):
+    """Majority category of the nearest existing cache questions"""
+    if not cache_categories:
+        return "general"
+    scores = cache_vectors @ vector
+    votes = Counter(cache_categories[i] for i in np.argsort(-scores)[:k] if scores[i] >= min_similarity)
+    return votes.most_common(1)[0][0] if votes else "general"
+
+
+def estimated_savings(question, answer, asks, prompt_price, completion_price):
+    """LLM spend the logged asks would have avoided as cache hits (USD)"""
+    prompt_tokens = count_tokens(system_prompt) + CONTEXT_MAX_TOKENS + count_tokens(question)
+    completion_tokens = count_tokens(answer or "")
+    return asks * (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def mine(args):
+    counts, phrasings = collect(args.paths, args.cache_threshold)
+    if not counts:
+        print("No uncached questions in the log.")
+        return
+
+    embeddings = download_hugging_face_embeddings()
+    keys = list(counts)
+    vectors = embed(embeddings, [phrasings[key].most_common(1)[0][0] for key in keys])
+    index_of = {key: i for i, key in enumerate(keys)}
+
+    clusters = cluster(keys, vectors, counts, args.similarity)
+    clusters.sort(key=lambda members: -sum(counts[key] for key in members))
+    clusters = [members for members in clusters if sum(counts[key] for key in members) >= args.min_asks][:args.top]
+    print(f"{sum(counts.values())} uncached asks, {len(keys)} distinct questions, {len(clusters)} clusters selected")
+    if not clusters:
+        return
+
+    cache_entries = cache_manager.cache_data
+    cache_vectors = embed(embeddings, [entry['question'] for entry in cache_entries])
+    cache_categories = [entry.get('category', 'general') for entry in cache_entries]
+
+    representatives = [phrasings[members[0]].most_common(1)[0][0] for members in clusters]
+    answers = [None] * len(clusters)
+    if not args.no_answers:
+        from app import answer_batch  # network clients only when drafting answers
+        answers = answer_batch(representatives, llm_concurrency=args.concurrency)
+
+    next_id = max((entry['id'] for entry in cache_entries), default=0) + 1
+    candidates = []
+    for members, question, result in zip(clusters, representatives, answers):
+        variants = Counter()
+        for key in members:
+            variants.update(phrasings[key])
+        asks = sum(variants.values())
+        answer = result['answer'] if result and result['source'] in LLM_SOURCES else None
+        candidates.append({
+            "question": question,
+            "answer": answer,
+            "keywords": keywords_for(variants),
+            "category": category_for(vectors[index_of[members[0]]], cache_vectors, cache_categories),
+            "review": {
+                "approved": False,
+                "asks": asks,
+                "variants": [text for text, _ in variants.most_common(6) if text != question][:5],
+                "answer_source": result['source'] if result else None,
+                "estimated_savings_usd": round(
+                    estimated_savings(question, answer, asks, args.prompt_price, args.completion_price), 4
+                ),
+            },
+        })
+
+    candidates.sort(key=lambda c: -c["review"]["estimated_savings_usd"])
+    candidates = [{"id": next_id + offset, **candidate} for offset, candidate in enumerate(candidates)]
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(candidates, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'asks':>6}{'saved $':>10}  {'category':<16}question")
+    for candidate in candidates[:20]:
+        review = candidate["review"]
+        print(f"{review['asks']:>6}{review['estimated_savings_usd']:>10.4f}  {candidate['category']:<16}{candidate['question'][:70]}")
+    print(f"\n✅ {len(candidates)} candidates written to {args.out} - set \"approved\": true on the good ones, then run promote")
+
+
+def promote(args):
+    with open(args.candidates, encoding="utf-8") as f:
+        candidates = json.load(f)
+    with open(args.cache, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    known = {question_key(entry['question']) for entry in entries}
+    next_id = max((entry['id'] for entry in entries), default=0) + 1
+    promoted = skipped = 0
+    for candidate in candidates:
+        review = candidate.get("review", {})
+        if not review.get("approved"):
+            continue
+        if not candidate.get("answer") or question_key(candidate["question"]) in known:
+            skipped += 1
+            continue
+        entries.append({
+            "id": next_id,
+            "question": candidate["question"],
+            "answer": candidate["answer"],
+            "keywords": candidate.get("keywords", []),
+            "category": candidate.get("category", "general"),
+        })
+        known.add(question_key(candidate["question"]))
+        next_id += 1
+        promoted += 1
+
+    # Write-then-rename: the app's file watcher never sees a half-written cache
+    tmp_path = f"{args.cache}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.cache)
+    print(f"✅ Promoted {promoted} entries into {args.cache} ({skipped} approved but skipped: no answer or duplicate)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Promote frequent uncached questions into the answer cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    mine_parser = commands.add_parser("mine", help="cluster logged questions and draft candidate entries")
+    mine_parser.add_argument("paths", nargs="*", default=[QUESTION_LOG_PATH],
+                             help="question logs / chat-history exports (.jsonl, .json or .txt)")
+    mine_parser.add_argument("--out", default=CANDIDATES_PATH)
+    mine_parser.add_argument("--top", type=int, default=50, help="clusters to draft answers for")
+    mine_parser.add_argument("--min-asks", type=int, default=2, help="ignore clusters asked fewer times")
+    mine_parser.add_argument("--similarity", type=float, default=0.85, help="cosine similarity to join a cluster")
+    mine_parser.add_argument("--cache-threshold", type=int, default=85, help="find_match threshold treated as cached")
+    mine_parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight while drafting")
+    mine_parser.add_argument("--no-answers", action="store_true", help="cluster and rank only; leave answers empty")
+    mine_parser.add_argument("--prompt-price", type=float, default=PROMPT_PRICE_PER_1K, help="USD per 1K prompt tokens")
+    mine_parser.add_argument("--completion-price", type=float, default=COMPLETION_PRICE_PER_1K,
+                             help="USD per 1K completion tokens")
+
+    promote_parser = commands.add_parser("promote", help="append approved candidates to the cache file")
+    promote_parser.add_argument("candidates", nargs="?", default=CANDIDATES_PATH)
+    promote_parser.add_argument("--cache", default=cache_manager.cache_file_path)
+
+    args = parser.parse_args()
+    started = time.perf_counter()
+    if args.command == "mine":
+        mine(args)
+    else:
+        promote(args)
+    print(f"({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
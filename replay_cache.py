@@ -0,0 +1,121 @@
+"""
+Replay logged questions against the answer cache at other thresholds and
+scorers, to tune CACHE_MATCH_THRESHOLD / CACHE_SCORER from real traffic.
+
+    python replay_cache.py                                   # data/cache_telemetry.jsonl
+    python replay_cache.py data/question_log.jsonl --thresholds 70,75,80,85,90 --scorers token_sort_ratio,WRatio
+    python replay_cache.py --unique --samples 20 --out replay.json
+
+Each question is scored once per scorer against the current cache file;
+every threshold is then just a cut of those scores. "gained" are asks a
+setting would answer from the cache that the baseline does not - the
+samples list the most borderline ones, to check for wrong matches.
+"""
+import argparse
+import json
+import sys
+
+from src.cache_manager import CACHE_SCORER, SCORERS, CacheManager
+from src.cache_telemetry import CACHE_TELEMETRY_PATH
+from src.question_log import read_questions
+from src.shared_cache import question_key
+
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def score_all(manager, questions, scorer):
+    """(score 0-100, closest cached question) per question"""
+    results = []
+    for question in questions:
+        # Above any score: always a miss, reported with its nearest entry
+        result = manager.find_match(question, threshold=101, scorer=scorer)
+        results.append((result['confidence'] * 100, result.get('nearest_question')))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged questions against the answer cache")
+    parser.add_argument("paths", nargs="*", default=[CACHE_TELEMETRY_PATH],
+                        help="cache telemetry / question logs (.jsonl, .json or .txt)")
+    parser.add_argument("--cache", default="data/medical_cache.json")
+    parser.add_argument("--thresholds", default="70,75,80,85,90,95", help="comma-separated, 0-100")
+    parser.add_argument("--scorers", default=",".join(SCORERS), help=f"comma-separated, from {', '.join(SCORERS)}")
+    parser.add_argument("--baseline-threshold", type=int, default=85)
+    parser.add_argument("--baseline-scorer", default=CACHE_SCORER)
+    parser.add_argument("--unique", action="store_true", help="count each distinct question once, not every ask")
+    parser.add_argument("--samples", type=int, default=5, help="borderline gained matches shown per setting")
+    parser.add_argument("--out", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    thresholds = parse_list(args.thresholds, int)
+    scorers = parse_list(args.scorers)
+    for scorer in {*scorers, args.baseline_scorer}:
+        if scorer not in SCORERS:
+            parser.error(f"unknown scorer {scorer!r}")
+
+    manager = CacheManager(args.cache)
+    if not manager.fuzzy_available:
+        sys.exit("replay needs rapidfuzz or fuzzywuzzy installed")
+
+    questions = [question for question, _ in read_questions(args.paths)]
+    if args.unique:
+        questions = list({question_key(q) or q: q for q in questions}.values())
+    if not questions:
+        sys.exit("no questions in the given logs")
+
+    scored = {scorer: score_all(manager, questions, scorer) for scorer in {*scorers, args.baseline_scorer}}
+    baseline = [score >= args.baseline_threshold for score, _ in scored[args.baseline_scorer]]
+    baseline_rate = sum(baseline) / len(questions)
+
+    rows = []
+    for scorer in scorers:
+        for threshold in thresholds:
+            hits = [score >= threshold for score, _ in scored[scorer]]
+            gained = [i for i, (hit, base) in enumerate(zip(hits, baseline)) if hit and not base]
+            lost = [i for i, (hit, base) in enumerate(zip(hits, baseline)) if base and not hit]
+            borderline = sorted(gained, key=lambda i: scored[scorer][i][0])[:args.samples]
+            rows.append({
+                "scorer": scorer,
+                "threshold": threshold,
+                "hit_rate": round(sum(hits) / len(questions), 4),
+                "change": round(sum(hits) / len(questions) - baseline_rate, 4),
+                "gained": len(gained),
+                "lost": len(lost),
+                "samples": [
+                    {"question": questions[i], "matched": scored[scorer][i][1], "score": round(scored[scorer][i][0], 1)}
+                    for i in borderline
+                ],
+            })
+
+    print(
+        f"{len(questions)} {'distinct questions' if args.unique else 'asks'}, {len(manager.cache_data)} cache entries - "
+        f"baseline {args.baseline_scorer} >= {args.baseline_threshold}: {baseline_rate:.1%} hit rate\n"
+    )
+    print(f"{'scorer':<18}{'threshold':>10}{'hit rate':>10}{'change':>9}{'gained':>8}{'lost':>6}")
+    for row in rows:
+        print(
+            f"{row['scorer']:<18}{row['threshold']:>10}{row['hit_rate']:>10.1%}"
+            f"{row['change']:>+9.1%}{row['gained']:>8}{row['lost']:>6}"
+        )
+    if args.samples:
+        for row in rows:
+            if row["samples"]:
+                print(f"\n{row['scorer']} >= {row['threshold']}, most borderline gained matches:")
+                for sample in row["samples"]:
+                    print(f"  {sample['score']:>5}  {sample['question'][:60]!r} -> {(sample['matched'] or '')[:60]!r}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "questions": len(questions),
+                "baseline": {"scorer": args.baseline_scorer, "threshold": args.baseline_threshold,
+                             "hit_rate": round(baseline_rate, 4)},
+                "results": rows,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from src.deadline import stage_timeout
+from src.logger import get_logger
+from src.metrics import metrics
+
+log = get_logger("admission")
+
+
+def _env_limit(stage, limit, queue_timeout):
+    prefix = f"ADMISSION_{stage.upper()}"
+    limit = int(os.environ.get(f"{prefix}_LIMIT", limit))
+    return {
+        "limit": limit,
+        "queue_timeout": float(os.environ.get(f"{prefix}_QUEUE_TIMEOUT", queue_timeout)),
+        "max_queue": int(os.environ.get(f"{prefix}_MAX_QUEUE", limit * 4)),
+    }
+
+
+class Overloaded(Exception):
+    """A stage refused work: its queue is full or the queueing deadline passed"""
+
+    def __init__(self, stage, reason):
+        super().__init__(f"{stage} overloaded ({reason})")
+        self.stage = stage
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    Bounded concurrency for one stage, per worker process.
+
+    Up to `limit` callers run at once; up to `max_queue` more wait at most
+    `queue_timeout` seconds for a slot. Anything beyond that is shed
+    immediately with Overloaded, so callers can degrade instead of piling up.
+    The wait is also cut to what is left of the request deadline.
+    """
+
+    def __init__(self, stage, limit, queue_timeout, max_queue):
+        self.stage = stage
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def _publish(self):
+        metrics.set_gauge("chatbot_admission_in_flight", self.in_flight, stage=self.stage)
+        metrics.set_gauge("chatbot_admission_queue_depth", self.waiting, stage=self.stage)
+
+    def _entered(self):
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+            self._publish()
+
+    def _shed(self, reason):
+        with self._lock:
+            self.shed += 1
+        metrics.inc("chatbot_admission_shed_total", stage=self.stage, reason=reason)
+        log.warning("admission.shed", stage=self.stage, reason=reason)
+        raise Overloaded(self.stage, reason)
+
+    def _join_queue(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                full = True
+            else:
+                full = False
+                self.waiting += 1
+                self._publish()
+        if full:
+            self._shed("queue_full")
+
+    def _leave_queue(self):
+        with self._lock:
+            self.waiting -= 1
+            self._publish()
+
+    def _wait_budget(self, timeout):
+        return stage_timeout(self.queue_timeout if timeout is None else max(0.0, timeout), floor=0.0)
+
+    def acquire(self, timeout=None):
+        if self._slots.acquire(blocking=False):
+            return self._entered()
+        self._join_queue()
+        try:
+            admitted = self._slots.acquire(timeout=self._wait_budget(timeout))
+        finally:
+            self._leave_queue()
+        if not admitted:
+            self._shed("queue_timeout")
+        self._entered()
+
+    async def aacquire(self, timeout=None):
+        """Event-loop friendly acquire: polls for a slot, so cancellation never leaks one"""
+        if self._slots.acquire(blocking=False):
+            return self._entered()
+        self._join_queue()
+        deadline = time.monotonic() + self._wait_budget(timeout)
+        delay = 0.005
+        try:
+            while True:
+                if self._slots.acquire(blocking=False):
+                    break
+                if time.monotonic() >= deadline:
+                    self._shed("queue_timeout")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+        finally:
+            self._leave_queue()
+        self._entered()
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._publish()
+        self._slots.release()
+
+    @contextmanager
+    def admit(self, timeout=None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aadmit(self, timeout=None):
+        await self.aacquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self):
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+
+
+class AdmissionController:
+    """Limiters for the expensive upstream stages"""
+
+    def __init__(self):
+        self.llm = AdmissionLimiter("llm", **_env_limit("llm", 16, 2.0))
+        self.stt = AdmissionLimiter("stt", **_env_limit("stt", 8, 3.0))
+        self.tts = AdmissionLimiter("tts", **_env_limit("tts", 8, 3.0))
+
+    def status(self):
+        return {limiter.stage: limiter.status() for limiter in (self.llm, self.stt, self.tts)}
+
+
+# Initialize global admission controller
+admission = AdmissionController()
@@ -0,0 +1,146 @@
+import base64
+import os
+import shutil
+import threading
+from io import BytesIO
+
+from src.logger import get_logger
+from src.metrics import metrics
+
+log = get_logger("audio_codec")
+
+try:
+    from pydub import AudioSegment
+except ImportError:
+    AudioSegment = None
+
+# Format TTS audio is returned in when the client does not ask for one;
+# empty keeps whatever the engine produced (gTTS MP3, Groq WAV)
+TTS_OUTPUT_FORMAT = os.environ.get("TTS_OUTPUT_FORMAT", "").lower()
+# Speech needs far less than music: Opus stays intelligible down to ~16k
+TTS_OPUS_BITRATE = os.environ.get("TTS_OPUS_BITRATE", "24k")
+TTS_MP3_BITRATE = os.environ.get("TTS_MP3_BITRATE", "48k")
+# Mono, resampled to this rate before encoding
+TTS_SAMPLE_RATE = int(os.environ.get("TTS_SAMPLE_RATE", "24000"))
+
+# Requested format -> (ffmpeg container, codec, MIME type)
+FORMATS = {
+    "opus": ("ogg", "libopus", "audio/ogg; codecs=opus"),
+    "ogg": ("ogg", "libopus", "audio/ogg; codecs=opus"),
+    "mp3": ("mp3", "libmp3lame", "audio/mpeg"),
+    "wav": ("wav", None, "audio/wav"),
+}
+
+
+class UnsupportedFormat(ValueError):
+    """Client asked for an audio format we cannot produce"""
+
+
+def sniff_format(audio_bytes):
+    """Container of encoded audio from its magic bytes: 'wav', 'mp3', 'ogg' or None"""
+    if audio_bytes[:4] == b"RIFF":
+        return "wav"
+    if audio_bytes[:4] == b"OggS":
+        return "ogg"
+    if audio_bytes[:3] == b"ID3" or (len(audio_bytes) > 1 and audio_bytes[0] == 0xFF and audio_bytes[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def mime_type(audio_base64):
+    """MIME type for a base64 audio payload (for data: URIs on the client)"""
+    if not audio_base64:
+        return None
+    # 16 base64 chars -> the first 12 bytes, enough for the magic
+    container = sniff_format(base64.b64decode(audio_base64[:16]))
+    return {"wav": "audio/wav", "ogg": "audio/ogg; codecs=opus", "mp3": "audio/mpeg"}.get(container)
+
+
+def resolve_format(requested):
+    """Validated output format for a request: the client's choice, else TTS_OUTPUT_FORMAT ('' = as synthesized)"""
+    audio_format = (requested or TTS_OUTPUT_FORMAT or "").lower()
+    if audio_format and audio_format not in FORMATS:
+        raise UnsupportedFormat(f"unsupported audio format {audio_format!r}, expected one of {', '.join(FORMATS)}")
+    return audio_format
+
+
+class AudioTranscoder:
+    """
+    Re-encodes TTS audio into a compact speech codec (pydub + ffmpeg).
+
+    Optional: without pydub or an ffmpeg binary, audio is passed through
+    unchanged (logged at startup). Byte totals before / after are kept so the
+    savings show up in /status and the metrics.
+    """
+
+    def __init__(self):
+        has_ffmpeg = shutil.which("ffmpeg") is not None
+        self.available = AudioSegment is not None and has_ffmpeg
+        if not self.available:
+            log.warning(
+                "audio_codec.unavailable", pydub=AudioSegment is not None, ffmpeg=has_ffmpeg,
+                hint="TTS audio is returned as synthesized; pip install pydub and install ffmpeg"
+            )
+        self._lock = threading.Lock()
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._transcoded = 0
+
+    def transcode(self, audio_base64, audio_format):
+        """`audio_base64` in `audio_format` (see FORMATS); unchanged if already there or not possible"""
+        if not audio_base64 or not audio_format:
+            return audio_base64
+        container, codec, _ = FORMATS[audio_format]
+
+        audio_bytes = base64.b64decode(audio_base64)
+        source = sniff_format(audio_bytes)
+        if source == container:
+            return audio_base64
+        if not self.available:
+            return audio_base64
+
+        try:
+            with metrics.span("tts_transcode"):
+                segment = AudioSegment.from_file(BytesIO(audio_bytes), format=source)
+                segment = segment.set_channels(1).set_frame_rate(TTS_SAMPLE_RATE)
+                out = BytesIO()
+                if codec == "libopus":
+                    segment.export(out, format=container, codec=codec, bitrate=TTS_OPUS_BITRATE,
+                                   parameters=["-application", "voip"])
+                elif codec:
+                    segment.export(out, format=container, codec=codec, bitrate=TTS_MP3_BITRATE)
+                else:
+                    segment.export(out, format=container)
+        except Exception as e:
+            log.warning("audio_codec.transcode_error", source=source, target=audio_format, error=str(e))
+            return audio_base64
+
+        encoded = out.getvalue()
+        with self._lock:
+            self._bytes_in += len(audio_bytes)
+            self._bytes_out += len(encoded)
+            self._transcoded += 1
+        metrics.inc("chatbot_tts_audio_bytes_total", len(audio_bytes), stage="synthesized", format=source or "unknown")
+        metrics.inc("chatbot_tts_audio_bytes_total", len(encoded), stage="delivered", format=audio_format)
+        log.debug(
+            "audio_codec.transcoded", source=source, target=audio_format,
+            bytes_in=len(audio_bytes), bytes_out=len(encoded)
+        )
+        return base64.b64encode(encoded).decode("utf-8")
+
+    def stats(self):
+        with self._lock:
+            bytes_in, bytes_out, transcoded = self._bytes_in, self._bytes_out, self._transcoded
+        return {
+            "available": self.available,
+            "default_format": TTS_OUTPUT_FORMAT or None,
+            "transcoded": transcoded,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_saved": bytes_in - bytes_out,
+            "ratio": round(bytes_out / bytes_in, 3) if bytes_in else None,
+        }
+
+
+# Initialize global transcoder
+audio_transcoder = AudioTranscoder()
@@ -1,7 +1,25 @@
+import base64
 import json
 import os
 import re
 import socket
+import threading
+import time
+import unicodedata
+
+from src.lexical_index import BM25Index
+from src.logger import get_logger
+from src.multilingual import CrossLingualIndex
+
+log = get_logger("cache")
+
+# Above this many entries, fuzzy matching only scores a BM25 keyword shortlist
+# instead of every cached question (a typo'd word can then miss its entry)
+SHORTLIST_MIN_ENTRIES = int(os.environ.get('CACHE_SHORTLIST_MIN_ENTRIES', '2000'))
+SHORTLIST_SIZE = int(os.environ.get('CACHE_SHORTLIST_SIZE', '200'))
+
+# Seconds between checks of the cache file for hot reload (0 disables the watcher)
+CACHE_WATCH_INTERVAL = float(os.environ.get('CACHE_WATCH_INTERVAL', '5'))
 
 # Try to import fuzzy matching library
 try:
@@ -13,36 +31,189 @@ except ImportError:
         from fuzzywuzzy import process
         FUZZY_LIB = "fuzzywuzzy"
     except ImportError:
-        print("⚠️  WARNING: No fuzzy matching library found!")
-        print("   Install one: pip install rapidfuzz  OR  pip install fuzzywuzzy")
+        log.warning("cache.no_fuzzy_library", hint="pip install rapidfuzz OR pip install fuzzywuzzy")
         FUZZY_LIB = None
 
+# Fuzzy scorers find_match can rank with (same names in rapidfuzz and fuzzywuzzy);
+# replay_cache.py compares them on logged traffic
+SCORERS = ("token_sort_ratio", "token_set_ratio", "ratio", "partial_ratio", "WRatio")
+CACHE_SCORER = os.environ.get('CACHE_SCORER', 'token_sort_ratio')
+
+class CacheState:
+    """
+    One loaded version of the cache with its match indexes.
+
+    Built completely before it is published and never mutated afterwards:
+    readers grab `manager._state` once and keep using that snapshot, so a
+    reload can never show them a half-built cache.
+    """
+    __slots__ = ('entries', 'processed_questions', 'keyword_index', 'translations', 'signature')
+    
+    def __init__(self, entries, processed_questions, keyword_index, translations=None, signature=None):
+        self.entries = entries
+        self.processed_questions = processed_questions
+        self.keyword_index = keyword_index
+        # language -> (entry indices, normalized translated questions)
+        self.translations = translations or {}
+        self.signature = signature
+
+
 class CacheManager:
     def __init__(self, cache_file_path='data/medical_cache.json'):
         self.cache_file_path = cache_file_path
-        self.cache_data = []
+        self._state = CacheState([], [], BM25Index())
+        self._write_lock = threading.Lock()
+        self._failed_signature = None
+        self._watcher_pid = None
+        self._watcher_stop = threading.Event()
+        self._reload_hooks = []
         self.fuzzy_available = FUZZY_LIB is not None
+        # Non-English questions that fuzzy matching misses (other script);
+        # inactive until cross_lingual.load()
+        self.cross_lingual = CrossLingualIndex(self)
+        self.add_reload_hook(self.cross_lingual.rebuild)
         
         if not self.fuzzy_available:
-            print("⚠️  Fuzzy matching disabled - install rapidfuzz or fuzzywuzzy")
+            log.warning("cache.fuzzy_disabled")
         else:
-            print(f"✅ Using {FUZZY_LIB} for fuzzy matching")
+            log.info("cache.fuzzy_enabled", library=FUZZY_LIB)
         
         self.load_cache()
     
+    @property
+    def cache_data(self):
+        return self._state.entries
+    
+    @property
+    def processed_questions(self):
+        return self._state.processed_questions
+    
+    @property
+    def keyword_index(self):
+        return self._state.keyword_index
+    
+    def add_reload_hook(self, hook):
+        """Call `hook(state)` with every newly published state (in the reloading thread)"""
+        self._reload_hooks.append(hook)
+    
+    def _publish(self, state):
+        self._state = state
+        # Derived indexes catch up here - on the watcher thread, not on requests
+        for hook in self._reload_hooks:
+            try:
+                hook(state)
+            except Exception as e:
+                log.error("cache.reload_hook_error", hook=getattr(hook, '__qualname__', repr(hook)), error=str(e))
+    
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.cache_file_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def _build_state(self, entries, signature=None):
+        """Precompute normalized questions and the keyword index (question + keywords)"""
+        keyword_index = BM25Index()
+        for item in entries:
+            keyword_index.add(
+                item['question'],
+                {'id': item.get('id'), 'category': item.get('category', 'general')},
+                index_text=" ".join([item['question'], *item.get('keywords', [])])
+            )
+        processed_questions = [self.preprocess_text(item['question']) for item in entries]
+        
+        # Per-language partitions from the entries' "translations" variants
+        translations = {}
+        for i, item in enumerate(entries):
+            for language, variant in (item.get('translations') or {}).items():
+                if variant.get('question') and variant.get('answer'):
+                    indices, questions = translations.setdefault(language, ([], []))
+                    indices.append(i)
+                    questions.append(self.preprocess_text(variant['question']))
+        return CacheState(entries, processed_questions, keyword_index, translations, signature)
+    
+    def _read_cache_file(self):
+        with open(self.cache_file_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError("cache file must contain a JSON list")
+        return entries
+    
     def load_cache(self):
         """Load cache from JSON file"""
+        signature = self._file_signature()
         try:
             if os.path.exists(self.cache_file_path):
-                with open(self.cache_file_path, 'r', encoding='utf-8') as f:
-                    self.cache_data = json.load(f)
-                print(f"✅ Cache loaded: {len(self.cache_data)} questions")
+                entries = self._read_cache_file()
+                log.info("cache.loaded", questions=len(entries))
             else:
-                print(f"⚠️  Cache file not found: {self.cache_file_path}")
-                self.cache_data = []
+                log.warning("cache.file_not_found", path=self.cache_file_path)
+                entries = []
         except Exception as e:
-            print(f"❌ Error loading cache: {str(e)}")
-            self.cache_data = []
+            log.error("cache.load_error", error=str(e))
+            entries = []
+        
+        self._state = self._build_state(entries, signature)
+    
+    def reload(self, force=False):
+        """
+        Hot reload: rebuild the cache and its indexes off to the side, then
+        swap them in with one reference assignment. In-flight lookups finish
+        on the old state. A missing or invalid file keeps the current state.
+        
+        Returns True if a new state was published.
+        """
+        with self._write_lock:
+            signature = self._file_signature()
+            if signature is None or (not force and signature in (self._state.signature, self._failed_signature)):
+                return False
+            
+            started = time.perf_counter()
+            try:
+                new_state = self._build_state(self._read_cache_file(), signature)
+            except Exception as e:
+                # Not retried until the file changes again
+                self._failed_signature = signature
+                log.error("cache.reload_error", error=str(e))
+                return False
+            
+            self._publish(new_state)
+            log.info(
+                "cache.reloaded",
+                questions=len(new_state.entries),
+                seconds=round(time.perf_counter() - started, 3)
+            )
+            return True
+    
+    def start_watcher(self, interval=CACHE_WATCH_INTERVAL):
+        """
+        Poll the cache file and hot-reload it when it changes.
+        Threads do not survive fork, so pre-forked workers call this again.
+        """
+        if interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        self._watcher_stop = threading.Event()
+        stop = self._watcher_stop
+        
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    log.error("cache.watcher_error", error=str(e))
+        
+        threading.Thread(target=watch, name="cache-watcher", daemon=True).start()
+    
+    def stop_watcher(self):
+        self._watcher_stop.set()
+        self._watcher_pid = None
+    
+    def keyword_candidates(self, user_question, k=SHORTLIST_SIZE, state=None):
+        """Indices of cache entries sharing terms with the question, best BM25 first"""
+        state = state or self._state
+        return [doc_id for doc_id, _ in state.keyword_index.search(user_question, k=k)]
     
     def preprocess_text(self, text):
         """Clean and normalize text for matching"""
@@ -55,18 +226,20 @@ class CacheManager:
         # Remove extra whitespace
         text = re.sub(r'\s+', ' ', text).strip()
         
-        # Remove special characters but keep alphanumeric and spaces
-        text = re.sub(r'[^a-z0-9\s]', '', text)
-        
-        return text
+        # Remove punctuation and symbols; keep letters (any script), vowel signs, digits and spaces
+        return "".join(ch for ch in text if ch.isspace() or unicodedata.category(ch)[0] in "LMN")
     
-    def find_match(self, user_question, threshold=85):
+    def find_match(self, user_question, threshold=85, scorer=None, language=None):
         """
         Find matching cached question using fuzzy matching
         
         Args:
             user_question (str): User's input question
             threshold (int): Minimum similarity score (0-100)
+            scorer (str): One of SCORERS (default CACHE_SCORER)
+            language (str): Detected language code; non-English questions are
+                matched against that language's variants first, then English,
+                then cross-lingually by embedding
         
         Returns:
             dict: {
@@ -75,8 +248,18 @@ class CacheManager:
                 'confidence': float,
                 'question': str or None
             }
+            Hits also carry 'category', 'language' (of the answer) and
+            'audio_file' (pre-rendered answer audio, or None). Misses carry
+            the closest entry as 'nearest_question' / 'nearest_category'.
         """
-        if not user_question or not self.cache_data:
+        scorer = scorer or CACHE_SCORER
+        if scorer not in SCORERS:
+            raise ValueError(f"unknown scorer {scorer!r}, expected one of {SCORERS}")
+        
+        # One snapshot for the whole lookup, even if a reload swaps it meanwhile
+        state = self._state
+        
+        if not user_question or not state.entries:
             return {
                 'matched': False,
                 'answer': None,
@@ -86,72 +269,112 @@ class CacheManager:
         
         # If fuzzy matching not available, try exact match only
         if not self.fuzzy_available:
-            return self._exact_match(user_question)
+            return self._exact_match(user_question, state, language)
         
         # Preprocess user question
         processed_question = self.preprocess_text(user_question)
+        non_english = language not in (None, 'en')
+        
+        # Same-language variants first
+        if non_english and language in state.translations:
+            indices, choices = state.translations[language]
+            index, score = self._best_fuzzy(processed_question, choices, scorer)
+            if index is not None and score >= threshold:
+                return self._hit(state, indices[index], score / 100, language)
+        
+        # Cached questions are normalized once at load; large caches only
+        # score the keyword shortlist
+        candidate_indices = None
+        choices = state.processed_questions
+        if len(state.entries) >= SHORTLIST_MIN_ENTRIES:
+            candidate_indices = self.keyword_candidates(user_question, state=state)
+            choices = [state.processed_questions[i] for i in candidate_indices]
+        
+        index, score = self._best_fuzzy(processed_question, choices, scorer)
+        if index is not None and candidate_indices is not None:
+            index = candidate_indices[index]
+        best_item = state.entries[index] if index is not None else None
+        
+        if best_item is not None and score >= threshold:
+            return self._hit(state, index, score / 100, language)
         
-        # Prepare list of cached questions for matching
-        cached_questions = [item['question'] for item in self.cache_data]
+        if non_english:
+            match = self.cross_lingual.match(user_question, language)
+            if match is not None:
+                xlingual_state, index, similarity = match
+                log.debug("cache.xlingual_hit", language=language, similarity=round(similarity, 3))
+                return self._hit(xlingual_state, index, similarity, language)
         
-        # Find best match using fuzzy matching
+        log.debug("cache.miss", best_score=score, language=language)
+        return {
+            'matched': False,
+            'answer': None,
+            'confidence': score / 100,
+            'question': None,
+            'nearest_question': best_item['question'] if best_item else None,
+            'nearest_category': best_item.get('category', 'general') if best_item else None
+        }
+    
+    @staticmethod
+    def _best_fuzzy(processed_question, choices, scorer):
+        """(index into choices, score 0-100) of the best fuzzy match; (None, 0) if none"""
+        if not choices:
+            return None, 0
         if FUZZY_LIB == "rapidfuzz":
-            # RapidFuzz syntax
-            best_match = process.extractOne(
-                processed_question,
-                [self.preprocess_text(q) for q in cached_questions],
-                scorer=fuzz.token_sort_ratio
-            )
-            score = best_match[1] if best_match else 0
+            # (choice, score, index) - no second pass over the choices
+            best_match = process.extractOne(processed_question, choices, scorer=getattr(fuzz, scorer))
         else:
-            # FuzzyWuzzy syntax
-            best_match = process.extractOne(
-                processed_question,
-                [self.preprocess_text(q) for q in cached_questions],
-                scorer=fuzz.token_sort_ratio
-            )
-            score = best_match[1] if best_match else 0
+            # FuzzyWuzzy only reports a key for mapping choices: (choice, score, key)
+            best_match = process.extractOne(processed_question, dict(enumerate(choices)), scorer=getattr(fuzz, scorer))
+        if not best_match:
+            return None, 0
+        return best_match[2], best_match[1]
+    
+    def _hit(self, state, index, confidence, language=None):
+        """Hit result for entry `index`, in `language` when the entry has that variant"""
+        item = state.entries[index]
+        variant = (item.get('translations') or {}).get(language) if language else None
+        if not (variant and variant.get('answer')):
+            variant, language = item, 'en'
         
-        if best_match and score >= threshold:
-            # Get the original cache item
-            match_index = [self.preprocess_text(q) for q in cached_questions].index(best_match[0])
-            matched_item = self.cache_data[match_index]
-            
-            print(f"🎯 Cache HIT! Confidence: {score}%")
-            print(f"   Matched: {matched_item['question'][:50]}...")
-            
-            return {
-                'matched': True,
-                'answer': matched_item['answer'],
-                'confidence': score / 100,
-                'question': matched_item['question'],
-                'category': matched_item.get('category', 'general')
-            }
-        else:
-            print(f"❌ Cache MISS. Best score: {score}%")
-            return {
-                'matched': False,
-                'answer': None,
-                'confidence': score / 100,
-                'question': None
-            }
+        log.debug("cache.hit", score=round(confidence * 100, 1), matched=item['question'][:50], language=language)
+        audio = variant.get('audio')
+        return {
+            'matched': True,
+            'answer': variant['answer'],
+            'confidence': confidence,
+            'question': variant['question'],
+            'category': item.get('category', 'general'),
+            'language': language,
+            'audio_file': os.path.join(os.path.dirname(self.cache_file_path), audio) if audio else None
+        }
+    
+    @staticmethod
+    def read_audio(audio_file):
+        """Pre-rendered answer audio as base64, or None if it cannot be read"""
+        try:
+            with open(audio_file, 'rb') as f:
+                return base64.b64encode(f.read()).decode('utf-8')
+        except OSError as e:
+            log.warning("cache.audio_missing", path=audio_file, error=str(e))
+            return None
     
-    def _exact_match(self, user_question):
+    def _exact_match(self, user_question, state=None, language=None):
         """Fallback exact match when fuzzy matching unavailable"""
+        state = state or self._state
         processed_question = self.preprocess_text(user_question)
         
-        for item in self.cache_data:
-            if self.preprocess_text(item['question']) == processed_question:
-                print(f"🎯 Cache HIT (Exact Match)!")
-                return {
-                    'matched': True,
-                    'answer': item['answer'],
-                    'confidence': 1.0,
-                    'question': item['question'],
-                    'category': item.get('category', 'general')
-                }
+        if language in state.translations:
+            indices, questions = state.translations[language]
+            for index, cached_question in zip(indices, questions):
+                if cached_question == processed_question:
+                    return self._hit(state, index, 1.0, language)
+        
+        for index, cached_question in enumerate(state.processed_questions):
+            if cached_question == processed_question:
+                return self._hit(state, index, 1.0, language)
         
-        print(f"❌ Cache MISS (No exact match)")
+        log.debug("cache.miss", exact=True)
         return {
             'matched': False,
             'answer': None,
@@ -162,38 +385,44 @@ class CacheManager:
     def add_to_cache(self, question, answer, keywords=None, category='general'):
         """Add new entry to cache (for future expansion)"""
         try:
-            new_id = max([item['id'] for item in self.cache_data], default=0) + 1
-            
-            new_entry = {
-                'id': new_id,
-                'question': question,
-                'answer': answer,
-                'keywords': keywords or [],
-                'category': category
-            }
-            
-            self.cache_data.append(new_entry)
-            
-            # Save to file
-            with open(self.cache_file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
+            with self._write_lock:
+                entries = self._state.entries
+                new_id = max([item['id'] for item in entries], default=0) + 1
+                
+                new_entry = {
+                    'id': new_id,
+                    'question': question,
+                    'answer': answer,
+                    'keywords': keywords or [],
+                    'category': category
+                }
+                
+                # Copy-on-write: readers keep the old list until the swap
+                entries = entries + [new_entry]
+                
+                # Save to file
+                with open(self.cache_file_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, indent=2, ensure_ascii=False)
+                
+                self._publish(self._build_state(entries, self._file_signature()))
             
-            print(f"✅ Added to cache: {question[:50]}...")
+            log.info("cache.added", question=question[:50])
             return True
             
         except Exception as e:
-            print(f"❌ Error adding to cache: {str(e)}")
+            log.error("cache.add_error", error=str(e))
             return False
     
     def get_cache_stats(self):
         """Get cache statistics"""
+        entries = self._state.entries
         categories = {}
-        for item in self.cache_data:
+        for item in entries:
             cat = item.get('category', 'general')
             categories[cat] = categories.get(cat, 0) + 1
         
         return {
-            'total_questions': len(self.cache_data),
+            'total_questions': len(entries),
             'categories': categories
         }
     
@@ -202,19 +431,23 @@ class CacheManager:
         """
         Check if internet connection is available
         
+        Args:
+            timeout (float): Total seconds for the check, shared by both probes
+        
         Returns:
             bool: True if connected, False otherwise
         """
+        expires_at = time.monotonic() + timeout
         try:
             # Try to connect to Google DNS
-            socket.create_connection(("8.8.8.8", 53), timeout=timeout)
+            socket.create_connection(("8.8.8.8", 53), timeout=timeout).close()
             return True
         except OSError:
             pass
         
         try:
-            # Fallback: Try to connect to Cloudflare DNS
-            socket.create_connection(("1.1.1.1", 53), timeout=timeout)
+            # Fallback: Try to connect to Cloudflare DNS, within what is left
+            socket.create_connection(("1.1.1.1", 53), timeout=max(0.05, expires_at - time.monotonic())).close()
             return True
         except OSError:
             return False
@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import deque
+
+from src.metrics import metrics
+from src.question_log import create_question_log
+
+# Compact JSON Lines log of answer-cache lookups, replayed by replay_cache.py. Empty disables it.
+CACHE_TELEMETRY_PATH = os.environ.get("CACHE_TELEMETRY_PATH", "data/cache_telemetry.jsonl")
+# Matched pairs kept in memory for /cache/stats
+CACHE_TELEMETRY_RECENT = int(os.environ.get("CACHE_TELEMETRY_RECENT", "50"))
+
+# Width of the miss best-score bands in stats() ("80" = scores 80-84)
+SCORE_BAND = 5
+
+
+class CacheTelemetry:
+    """
+    How well the answer cache is doing, for tuning its threshold and scorer.
+
+    Per worker: hit / miss counts per category (a miss counts against the
+    category of its nearest entry) and per question language, how close the misses came, and the
+    most recent matched pairs to eyeball for false positives. Every lookup
+    also goes to the shared lookup log that replay_cache.py re-scores.
+
+    record() runs on every request (on the event loop under asgi.py): it
+    only touches memory and queues the log line - the file append and
+    rotation happen on the lookup log's background writer.
+    """
+
+    def __init__(self, lookup_log=None, recent=CACHE_TELEMETRY_RECENT):
+        self.lookup_log = lookup_log
+        self._lock = threading.Lock()
+        self._categories = {}
+        self._languages = {}
+        self._miss_bands = {}
+        self._recent = deque(maxlen=recent)
+
+    def record(self, question, result, threshold, language=None):
+        """Account one find_match result for a question in `language` (None: English / unknown)"""
+        hit = result['matched']
+        score = round(result['confidence'] * 100, 1)
+        cached_question = result['question'] if hit else result.get('nearest_question')
+        category = (result.get('category') if hit else result.get('nearest_category')) or "none"
+
+        metrics.inc(
+            "chatbot_answer_cache_total",
+            result="hit" if hit else "miss", category=category, language=language or "en"
+        )
+        if not hit:
+            metrics.observe("chatbot_answer_cache_miss_score", score)
+
+        with self._lock:
+            counts = self._categories.setdefault(category, [0, 0])
+            counts[0 if hit else 1] += 1
+            counts = self._languages.setdefault(language or "en", [0, 0])
+            counts[0 if hit else 1] += 1
+            if hit:
+                self._recent.append({"question": question, "matched": cached_question, "score": score})
+            else:
+                band = int(score // SCORE_BAND * SCORE_BAND)
+                self._miss_bands[band] = self._miss_bands.get(band, 0) + 1
+
+        if self.lookup_log is not None:
+            self.lookup_log.record(
+                question, score=score, hit=hit, threshold=threshold,
+                cached_question=cached_question, category=category, language=language
+            )
+
+    def stats(self):
+        with self._lock:
+            categories = {cat: list(counts) for cat, counts in self._categories.items()}
+            languages = {lang: list(counts) for lang, counts in self._languages.items()}
+            miss_bands = dict(self._miss_bands)
+            recent = list(self._recent)
+
+        hits = sum(h for h, _ in categories.values())
+        lookups = hits + sum(m for _, m in categories.values())
+        return {
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "categories": {
+                cat: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 3)}
+                for cat, (h, m) in sorted(categories.items())
+            },
+            "languages": {
+                lang: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 3)}
+                for lang, (h, m) in sorted(languages.items())
+            },
+            "miss_scores": {str(band): miss_bands[band] for band in sorted(miss_bands)},
+            "recent_matches": recent,
+        }
+
+
+# Initialize global cache telemetry
+cache_telemetry = CacheTelemetry(create_question_log(CACHE_TELEMETRY_PATH))
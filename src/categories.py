@@ -0,0 +1,159 @@
+import json
+import os
+from collections import Counter, defaultdict
+
+from src.lexical_index import tokenize
+
+# Chunk count per category in the vector index, written by store_index.py.
+# Queries are only scoped to categories listed here.
+INDEX_CATEGORIES_PATH = os.environ.get("INDEX_CATEGORIES_PATH", "data/index_categories.json")
+
+# Catch-all category: never used as a search filter
+GENERAL = "general"
+
+# Seed vocabulary per cache category (tokenized like the BM25 index, so
+# plurals are already stripped); the cache's own keywords and questions
+# are added on top. Only categories present in the cache are used.
+CATEGORY_TERMS = {
+    "cardiology": """
+        heart cardiac cardiovascular coronary artery arteries arrhythmia angina blood pressure hypertension
+        hypotension cholesterol atherosclerosis stroke palpitation pulse valve aorta aortic myocardial
+        infarction ecg electrocardiogram murmur bypass
+    """,
+    "endocrinology": """
+        diabetes diabetic insulin glucose blood sugar thyroid hypothyroidism hyperthyroidism hormone
+        hormonal pancreas adrenal pituitary gland metabolic endocrine cortisol estrogen testosterone goiter
+    """,
+    "neurology": """
+        brain nerve nervous neurological headache migraine seizure epilepsy dementia alzheimer parkinson
+        paralysis numbness tingling spinal cord multiple sclerosis neuropathy concussion memory dizziness
+    """,
+    "nutrition": """
+        diet dietary nutrition nutrient vitamin mineral protein carbohydrate fat fiber calorie weight
+        obesity bmi food eating hydration water deficiency iron calcium supplement malnutrition appetite
+    """,
+    "infectious disease": """
+        infection infectious virus viral bacteria bacterial fungal parasite antibiotic vaccine vaccination
+        covid coronavirus influenza flu hiv tuberculosis malaria hepatitis contagious fever pandemic epidemic
+        transmission pathogen sepsis
+    """,
+}
+
+
+def _terms(text):
+    """Unigrams plus adjacent bigrams ("blood pressure"), after tokenizing"""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class CategoryClassifier:
+    """
+    Keyword classifier onto the cache's medical categories.
+
+    Each category has a weighted vocabulary (seed terms plus the keywords
+    and questions of its cache entries); a text scores the summed weights
+    of the terms it contains. Ambiguous or off-topic text gets None.
+    Pure Python and microseconds per query, so it can run on every request.
+    rebuild() swaps in the vocabulary of a reloaded cache.
+    """
+
+    def __init__(self, vocabulary, min_score=2.0, margin=1.5, allowed=None):
+        self.vocabulary = vocabulary  # term -> {category: weight}
+        self.min_score = min_score
+        self.margin = margin
+        self.allowed = allowed
+
+    @property
+    def categories(self):
+        return sorted({cat for weights in self.vocabulary.values() for cat in weights})
+
+    @classmethod
+    def from_cache_entries(cls, entries, allowed=None, **kwargs):
+        """Vocabulary from cache entries + CATEGORY_TERMS, limited to `allowed` categories if given"""
+        return cls(cls.build_vocabulary(entries, allowed), allowed=allowed, **kwargs)
+
+    @staticmethod
+    def build_vocabulary(entries, allowed=None):
+        weights = defaultdict(Counter)
+        cache_categories = {item.get("category", GENERAL) for item in entries}
+        for category, text in CATEGORY_TERMS.items():
+            if category in cache_categories:
+                for term in _terms(text):
+                    weights[term][category] = max(weights[term][category], 1.0)
+        for item in entries:
+            category = item.get("category", GENERAL)
+            if category == GENERAL:
+                continue
+            for keyword in item.get("keywords", []):
+                for term in _terms(keyword):
+                    weights[term][category] += 1.0
+            for term in _terms(item["question"]):
+                weights[term][category] += 0.5
+
+        vocabulary = {}
+        for term, by_category in weights.items():
+            by_category = {cat: w for cat, w in by_category.items() if allowed is None or cat in allowed}
+            # Bigrams are more specific than single words
+            boost = 2.0 if " " in term else 1.0
+            if by_category:
+                vocabulary[term] = {cat: w * boost / len(by_category) for cat, w in by_category.items()}
+        return vocabulary
+
+    def rebuild(self, entries):
+        """New vocabulary from (reloaded) cache entries, published with one assignment"""
+        self.vocabulary = self.build_vocabulary(entries, self.allowed)
+
+    @classmethod
+    def from_cache_file(cls, path, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_cache_entries(json.load(f), **kwargs)
+
+    def scores(self, text):
+        vocabulary = self.vocabulary  # one snapshot, even if a rebuild swaps it meanwhile
+        totals = Counter()
+        for term in _terms(text):
+            for category, weight in vocabulary.get(term, {}).items():
+                totals[category] += weight
+        return totals
+
+    def classify(self, text, min_score=None):
+        """Best category, or None when nothing scores `min_score` or the runner-up is too close"""
+        ranked = self.scores(text).most_common(2)
+        if not ranked or ranked[0][1] < (self.min_score if min_score is None else min_score):
+            return None
+        if len(ranked) > 1 and ranked[0][1] < self.margin * ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+
+def categorize_chunks(chunks, classifier, heading_weight=3):
+    """
+    Set metadata["category"] on every chunk (GENERAL when unclear).
+    The section heading counts `heading_weight` times - it names the topic
+    more reliably than any one passage. Returns the category counts.
+    """
+    counts = Counter()
+    for chunk in chunks:
+        section = chunk.metadata.get("section") or ""
+        text = " ".join([section] * heading_weight + [chunk.page_content])
+        category = classifier.classify(text) or GENERAL
+        chunk.metadata["category"] = category
+        counts[category] += 1
+    return counts
+
+
+def write_index_categories(counts, path=INDEX_CATEGORIES_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(counts.most_common()), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_index_categories(path=INDEX_CATEGORIES_PATH):
+    """Category -> chunk count of the current index, or {} before the first categorized ingest"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+from typing import List
+
+from langchain.schema import Document
+
+from src.tokens import count_tokens, truncate_to_tokens
+
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "20"))
+
+# Sentence end (with trailing quotes / brackets) followed by whitespace, or a blank line
+_SENTENCE_BOUNDARY_RE = re.compile(r"([.!?][\"')\]]*)\s+|\n\s*\n")
+_PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?[-–]?\s*\d+\s*[-–]?\s*(of\s*\d+)?\s*$", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+# Heading-like line: starts with a capital, no sentence punctuation at the end
+_HEADING_RE = re.compile(r"^[A-Z][^.!?,;:]*[A-Za-z)]$")
+HEADING_MAX_WORDS = 8
+
+
+def _line_key(line):
+    """Normalize a line so running headers differing only by page number compare equal"""
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+
+def _edge_lines(lines, edge_lines):
+    """Indices of the first / last non-empty lines of a page"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return set(filled[:edge_lines] + filled[-edge_lines:])
+
+
+def strip_boilerplate(docs: List[Document], edge_lines=2, min_share=0.5, min_pages=3, max_line_chars=80):
+    """
+    Remove repeated per-page headers / footers and bare page numbers.
+
+    A short line near the top or bottom of a page is boilerplate when the
+    same line (digits ignored) sits at a page edge on at least `min_share`
+    of the pages of that source. Returns (cleaned docs, lines removed).
+    """
+    pages_by_source = defaultdict(list)
+    for doc in docs:
+        pages_by_source[doc.metadata.get("source")].append(doc)
+
+    repeated = {}
+    for source, pages in pages_by_source.items():
+        counts = Counter()
+        for page in pages:
+            lines = page.page_content.splitlines()
+            counts.update({
+                _line_key(lines[i]) for i in _edge_lines(lines, edge_lines)
+                if len(lines[i].strip()) <= max_line_chars
+            })
+        needed = max(min_pages, min_share * len(pages))
+        repeated[source] = {key for key, count in counts.items() if count >= needed}
+
+    cleaned, removed = [], 0
+    for doc in docs:
+        lines = doc.page_content.splitlines()
+        boilerplate = repeated.get(doc.metadata.get("source"), set())
+        kept = []
+        edges = _edge_lines(lines, edge_lines)
+        for i, line in enumerate(lines):
+            if i in edges and (_PAGE_NUMBER_RE.match(line) or _line_key(line) in boilerplate):
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append(Document(page_content="\n".join(kept), metadata=dict(doc.metadata)))
+    return cleaned, removed
+
+
+def section_headings(text, max_words=HEADING_MAX_WORDS):
+    """
+    (offset, heading) for heading-like lines: short, capitalized, not ending
+    in punctuation, and followed by more text (PDF text has no markup, so
+    this is a heuristic - e.g. "Causes and symptoms", "DIABETES MELLITUS").
+    """
+    headings, offset = [], 0
+    lines = text.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if (stripped and len(stripped.split()) <= max_words and _HEADING_RE.match(stripped)
+                and any(rest.strip() for rest in lines[i + 1:i + 3])):
+            headings.append((offset, stripped))
+        offset += len(line)
+    return headings
+
+
+def sentence_spans(text):
+    """(start, end) character spans of the sentences in text"""
+    spans, start = [], 0
+    for match in _SENTENCE_BOUNDARY_RE.finditer(text):
+        end = match.end(1) if match.group(1) else match.start()
+        spans.append((start, end))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    trimmed = []
+    for start, end in spans:
+        piece = text[start:end]
+        if piece.strip():
+            lead = len(piece) - len(piece.lstrip())
+            trimmed.append((start + lead, start + len(piece.rstrip())))
+    return trimmed
+
+
+def _split_long_span(text, start, end, max_tokens):
+    """Hard-split a single over-long sentence at word boundaries"""
+    while start < end and count_tokens(text[start:end]) > max_tokens:
+        piece = truncate_to_tokens(text[start:end], max_tokens)
+        cut = piece.rfind(" ")
+        cut_at = start + (cut if cut > 0 else len(piece))
+        yield start, cut_at
+        start = cut_at
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+
+def split_text(text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Token-bounded chunks that end on sentence boundaries.
+
+    Consecutive chunks share up to `overlap_tokens` of whole trailing
+    sentences. Returns (start, end) character spans into text.
+    """
+    units = []
+    for start, end in sentence_spans(text):
+        for span in _split_long_span(text, start, end, max_tokens):
+            units.append((span, count_tokens(text[span[0]:span[1]])))
+
+    chunks, current, current_tokens = [], [], 0
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append((current[0][0][0], current[-1][0][1]))
+            # Carry whole trailing sentences as overlap
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                if carried_tokens + previous[1] > overlap_tokens or carried_tokens + previous[1] + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous[1]
+            current, current_tokens = carried, carried_tokens
+        current.append((unit, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append((current[0][0][0], current[-1][0][1]))
+    return chunks
+
+
+def content_hash(text):
+    return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+def chunk_documents(docs: List[Document], max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Boilerplate-stripped, sentence-aligned, token-bounded, de-duplicated chunks.
+
+    Each chunk keeps its page's metadata plus `page` and `start_index`
+    (offset into the cleaned page text), which context assembly uses to
+    merge neighbours, and `section`: the last heading before the chunk,
+    carried over from earlier pages of the same source.
+    Returns (chunks, boilerplate lines removed, duplicate chunks dropped).
+    """
+    cleaned, removed = strip_boilerplate(docs)
+
+    chunks, seen, duplicates = [], set(), 0
+    page_ordinals = Counter()
+    current_section = {}
+    for doc in cleaned:
+        text = doc.page_content
+        # start_index is relative to the page, so chunks also carry which page
+        source = doc.metadata.get("source")
+        page = doc.metadata.get("page", page_ordinals[source])
+        page_ordinals[source] += 1
+        headings = section_headings(text)
+        for start, end in split_text(text, max_tokens, overlap_tokens):
+            # A chunk opening on a heading belongs to that section
+            while headings and headings[0][0] <= start + 1:
+                current_section[source] = headings.pop(0)[1]
+            chunk_text = text[start:end]
+            digest = content_hash(chunk_text)
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            chunks.append(Document(
+                page_content=chunk_text,
+                # Vector store metadata cannot hold None
+                metadata={**doc.metadata, "page": page, "start_index": start,
+                          "section": current_section.get(source, "")}
+            ))
+    return chunks, removed, duplicates
+
+
+def chunk_stats(chunks: List[Document]):
+    tokens = [count_tokens(chunk.page_content) for chunk in chunks]
+    return {
+        "chunks": len(chunks),
+        "tokens": sum(tokens),
+        "avg_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        "max_tokens": max(tokens, default=0),
+        "chars": sum(len(chunk.page_content) for chunk in chunks),
+    }
+
+
+def print_chunk_report(before, after, removed=0, duplicates=0):
+    print(f"{'':<12}{'chunks':>10}{'tokens':>12}{'avg tok':>10}{'max tok':>10}{'chars':>12}")
+    for label, stats in (("before", before), ("after", after)):
+        print(
+            f"{label:<12}{stats['chunks']:>10}{stats['tokens']:>12}{stats['avg_tokens']:>10}"
+            f"{stats['max_tokens']:>10}{stats['chars']:>12}"
+        )
+    print(f"Boilerplate lines removed: {removed}, duplicate chunks dropped: {duplicates}")
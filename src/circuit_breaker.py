@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.admission import Overloaded
+from src.logger import get_logger
+from src.metrics import metrics
+
+log = get_logger("circuit_breaker")
+
+# Open when at least BREAKER_MIN_CALLS calls in the last BREAKER_WINDOW_SECONDS
+# failed at BREAKER_FAILURE_RATE or worse; probe again after the cool-down
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", "5"))
+BREAKER_WINDOW_SECONDS = float(os.environ.get("BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("BREAKER_COOLDOWN_SECONDS", "15"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Overloaded):
+    """The dependency's breaker is open: skip straight to the fallback"""
+
+    def __init__(self, dependency, retry_after):
+        super().__init__(dependency, "circuit_open")
+        self.retry_after = retry_after
+
+
+class UpstreamError(Exception):
+    """An HTTP response that counts against the dependency (5xx, 429)"""
+
+
+def raise_for_upstream(status_code):
+    if status_code >= 500 or status_code == 429:
+        raise UpstreamError(f"upstream returned {status_code}")
+
+
+class CircuitBreaker:
+    """
+    Failure-rate breaker for one dependency, per worker process.
+
+    closed: calls pass; outcomes go into a sliding time window.
+    open: calls fail fast with CircuitOpen until the cool-down ends.
+    half_open: one probe call at a time; success closes, failure re-opens.
+
+    Exceptions listed in `ignore` (e.g. our own load shedding) say nothing
+    about the dependency and are not recorded.
+    """
+
+    def __init__(self, name, failure_rate=BREAKER_FAILURE_RATE, min_calls=BREAKER_MIN_CALLS,
+                 window_seconds=BREAKER_WINDOW_SECONDS, cooldown_seconds=BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        log.warning("breaker.state", dependency=self.name, state=state, previous=self._state)
+        self._state = state
+        self._probing = False
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != OPEN:
+            self._outcomes.clear()
+        metrics.set_gauge("chatbot_breaker_state", _STATE_VALUES[state], dependency=self.name)
+
+    def allow(self):
+        """Reserve a call; False means fail fast. Every True must be followed by record()/release()"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+        metrics.inc("chatbot_breaker_rejected_total", dependency=self.name)
+        return False
+
+    def release(self):
+        """Give back a reserved call without recording an outcome"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED if ok else OPEN)
+                return
+            if self._state == OPEN:
+                return  # a call that started before the breaker opened
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._outcomes.popleft()
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._transition(OPEN)
+
+    def retry_after(self):
+        with self._lock:
+            return max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at))
+
+    @contextmanager
+    def guard(self, ignore=()):
+        """Run the block as one call: CircuitOpen if rejected, exceptions count as failures"""
+        if not self.allow():
+            raise CircuitOpen(self.name, self.retry_after())
+        try:
+            yield
+        except ignore:
+            self.release()
+            raise
+        except Exception:
+            self.record(False)
+            raise
+        except BaseException:
+            self.release()  # cancelled / shutting down: no verdict on the dependency
+            raise
+        self.record(True)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            failures = sum(1 for t, ok in self._outcomes if not ok and now - t <= self.window_seconds)
+            calls = sum(1 for t, _ in self._outcomes if now - t <= self.window_seconds)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "rejected": self.rejected,
+                "retry_after": round(max(0.0, self.cooldown_seconds - (now - self._opened_at)), 1)
+                if state == OPEN else 0.0,
+            }
+
+
+class BreakerRegistry:
+    """One breaker per upstream dependency"""
+
+    def __init__(self):
+        self.openai = CircuitBreaker("openai")
+        self.pinecone = CircuitBreaker("pinecone")
+        self.groq = CircuitBreaker("groq")
+        self.node = CircuitBreaker("node")
+
+    def status(self):
+        return {breaker.name: breaker.status() for breaker in (self.openai, self.pinecone, self.groq, self.node)}
+
+
+# Initialize global circuit breakers
+breakers = BreakerRegistry()
@@ -0,0 +1,151 @@
+import os
+import re
+
+from langchain_core.documents import Document
+
+from src.tokens import count_tokens, truncate_to_tokens
+
+# Prompt context limits for rag-online / rag-offline answers
+CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", "600"))
+# Vector hits scoring below this (cosine) are dropped; the best hit is always kept
+CONTEXT_MIN_SCORE = float(os.environ.get("CONTEXT_MIN_SCORE", "0.35"))
+# ...as are hits trailing the best one by more than this
+CONTEXT_MAX_SCORE_GAP = float(os.environ.get("CONTEXT_MAX_SCORE_GAP", "0.15"))
+CONTEXT_DEDUP_SIMILARITY = float(os.environ.get("CONTEXT_DEDUP_SIMILARITY", "0.8"))
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)")
+
+
+def _shingles(text, size=3):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(a, b):
+    """Share of the smaller shingle set found in the other (catches chunks inside merged ones)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _text_overlap(left, right, min_overlap=15, max_overlap=200):
+    """Length of the longest suffix of left that is a prefix of right"""
+    for size in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextBuilder:
+    """
+    Turns retrieved chunks into the context handed to the LLM.
+
+    Steps: score cutoff (adaptive k), merge of overlapping / adjacent chunks
+    of the same source, near-duplicate removal, then a token budget - the
+    last chunk that does not fit is cut at a sentence boundary.
+    """
+
+    def __init__(self, max_tokens=CONTEXT_MAX_TOKENS, min_score=CONTEXT_MIN_SCORE,
+                 max_score_gap=CONTEXT_MAX_SCORE_GAP, dedup_similarity=CONTEXT_DEDUP_SIMILARITY):
+        self.max_tokens = max_tokens
+        self.min_score = min_score
+        self.max_score_gap = max_score_gap
+        self.dedup_similarity = dedup_similarity
+
+    def select(self, docs):
+        """Adaptive k: drop weak vector hits (docs without a 'score' are kept)"""
+        scores = [doc.metadata.get("score") for doc in docs if doc.metadata.get("score") is not None]
+        if not scores:
+            return list(docs)
+        best = max(scores)
+        kept = []
+        for doc in docs:
+            score = doc.metadata.get("score")
+            if score is None or score == best or (
+                score >= self.min_score and best - score <= self.max_score_gap
+            ):
+                kept.append(doc)
+        return kept
+
+    @staticmethod
+    def _merge_pair(first, second):
+        """Merged text if the two chunks overlap or touch in the source, else None"""
+        if first.metadata.get("source") != second.metadata.get("source"):
+            return None
+
+        start_a, start_b = first.metadata.get("start_index"), second.metadata.get("start_index")
+        if start_a is not None and start_b is not None:
+            # Offsets are per page
+            if first.metadata.get("page") != second.metadata.get("page"):
+                return None
+            if start_b < start_a:
+                first, second, start_a, start_b = second, first, start_b, start_a
+            end_a = start_a + len(first.page_content)
+            if start_b > end_a:
+                return None
+            return first.page_content + second.page_content[end_a - start_b:]
+
+        for left, right in ((first, second), (second, first)):
+            overlap = _text_overlap(left.page_content, right.page_content)
+            if overlap:
+                return left.page_content + right.page_content[overlap:]
+        return None
+
+    def merge(self, docs):
+        """Merge chunks that overlap each other; the merged chunk keeps the better rank"""
+        merged = []
+        for doc in docs:
+            for i, existing in enumerate(merged):
+                text = self._merge_pair(existing, doc)
+                if text is not None:
+                    metadata = dict(existing.metadata)
+                    starts = [d.metadata.get("start_index") for d in (existing, doc)]
+                    if None not in starts:
+                        metadata["start_index"] = min(starts)
+                    merged[i] = Document(page_content=text, metadata=metadata)
+                    break
+            else:
+                merged.append(doc)
+        return merged
+
+    def dedup(self, docs):
+        kept, kept_shingles = [], []
+        for doc in docs:
+            shingles = _shingles(doc.page_content)
+            if any(_containment(shingles, other) >= self.dedup_similarity for other in kept_shingles):
+                continue
+            kept.append(doc)
+            kept_shingles.append(shingles)
+        return kept
+
+    def fit(self, docs):
+        """Keep docs in rank order within the token budget"""
+        fitted, used = [], 0
+        for doc in docs:
+            tokens = count_tokens(doc.page_content)
+            if used + tokens <= self.max_tokens:
+                fitted.append(doc)
+                used += tokens
+                continue
+
+            remaining = self.max_tokens - used
+            # Only worth a partial chunk if a useful amount of room is left
+            if remaining >= 50:
+                text = truncate_to_tokens(doc.page_content, remaining)
+                sentence_ends = [m.end() for m in _SENTENCE_END_RE.finditer(text)]
+                if sentence_ends and sentence_ends[-1] >= len(text) // 2:
+                    text = text[:sentence_ends[-1]]
+                fitted.append(Document(page_content=text, metadata=dict(doc.metadata)))
+            break
+        return fitted
+
+    def build(self, docs):
+        if not docs:
+            return []
+        return self.fit(self.dedup(self.merge(self.select(docs))))
+
+
+# Initialize global context builder
+context_builder = ContextBuilder()
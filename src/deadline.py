@@ -0,0 +1,90 @@
+import contextvars
+import os
+import time
+
+
+def _env_seconds(name, default):
+    return float(os.environ.get(name, default))
+
+
+# End-to-end budget per channel (seconds). Twilio gives up on a webhook
+# after 15s, so WhatsApp gets less than the browser channels.
+DEADLINE_BUDGETS = {
+    "chat": _env_seconds("DEADLINE_CHAT_SECONDS", 20),
+    "voice": _env_seconds("DEADLINE_VOICE_SECONDS", 30),
+    "whatsapp": _env_seconds("DEADLINE_WHATSAPP_SECONDS", 12),
+    "speech-to-text": _env_seconds("DEADLINE_STT_SECONDS", 20),
+    "text-to-speech": _env_seconds("DEADLINE_TTS_SECONDS", 20),
+    "batch": _env_seconds("DEADLINE_BATCH_SECONDS", 600),
+}
+DEADLINE_DEFAULT_SECONDS = _env_seconds("DEADLINE_DEFAULT_SECONDS", 30)
+
+# Kept back from the answer stages for what runs after them (TTS, saving the reply)
+DEADLINE_RESERVE = {
+    "voice": _env_seconds("DEADLINE_VOICE_RESERVE_SECONDS", 8),
+}
+DEADLINE_DEFAULT_RESERVE = _env_seconds("DEADLINE_DEFAULT_RESERVE_SECONDS", 1)
+
+# The pipeline stops waiting for the LLM after this long (or sooner, if
+# the budget runs out first) and answers from the cache / retrieved context
+LLM_HEDGE_SECONDS = _env_seconds("LLM_HEDGE_SECONDS", 8)
+
+# Smallest timeout handed to a network call once the budget is spent
+MIN_STAGE_TIMEOUT = 0.25
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """A stage gave up because the request's budget ran out"""
+
+
+class Deadline:
+    def __init__(self, channel, seconds, reserve):
+        self.channel = channel
+        self.seconds = seconds
+        self.reserve = reserve
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+def start_deadline(channel, seconds=None):
+    """Start this request's deadline (visible to threads / tasks started from it)"""
+    if seconds is None:
+        seconds = DEADLINE_BUDGETS.get(channel, DEADLINE_DEFAULT_SECONDS)
+    deadline = Deadline(channel, seconds, DEADLINE_RESERVE.get(channel, DEADLINE_DEFAULT_RESERVE))
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def get_deadline():
+    return _current_deadline.get()
+
+
+def remaining():
+    """Seconds left in the request budget, or None outside a request"""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def expired():
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.remaining() <= 0
+
+
+def stage_timeout(cap, floor=MIN_STAGE_TIMEOUT):
+    """Timeout for one call: its own cap, cut to what is left of the budget"""
+    left = remaining()
+    if left is None:
+        return cap
+    return max(floor, min(cap, left))
+
+
+def hedge_timeout():
+    """How long the LLM may take before the pipeline answers without it; None outside a request"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, min(LLM_HEDGE_SECONDS, deadline.remaining() - deadline.reserve))
@@ -1,6 +1,6 @@
 from langchain.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
 from typing import List
 from langchain.schema import Document
 
@@ -20,15 +20,18 @@ def load_pdf_file(data):
 def filter_to_minimal_docs(docs: List[Document]) -> List[Document]:
     """
     Given a list of Document objects, return a new list of Document objects
-    containing only 'source' in metadata and the original page_content.
+    containing only 'source' and 'page' in metadata and the original page_content.
+    (The chunker adds 'section' and store_index.py the medical 'category'.)
     """
     minimal_docs: List[Document] = []
     for doc in docs:
-        src = doc.metadata.get("source")
+        metadata = {"source": doc.metadata.get("source")}
+        if doc.metadata.get("page") is not None:
+            metadata["page"] = doc.metadata["page"]
         minimal_docs.append(
             Document(
                 page_content=doc.page_content,
-                metadata={"source": src}
+                metadata=metadata
             )
         )
     return minimal_docs
@@ -44,6 +47,6 @@ def text_split(extracted_data):
 
 
 #Download the Embeddings from HuggingFace 
-def download_hugging_face_embeddings():
-    embeddings=HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2')  #this model return 384 dimensions
+def download_hugging_face_embeddings(model_name='sentence-transformers/all-MiniLM-L6-v2'):
+    embeddings=HuggingFaceEmbeddings(model_name=model_name)  #the default model returns 384 dimensions
     return embeddings
\ No newline at end of file
@@ -0,0 +1,201 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from src.chunker import content_hash
+from src.helper import download_hugging_face_embeddings
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "64"))
+INGEST_UPSERT_BATCH_SIZE = int(os.environ.get("INGEST_UPSERT_BATCH_SIZE", "100"))
+INGEST_MAX_INFLIGHT_UPSERTS = int(os.environ.get("INGEST_MAX_INFLIGHT_UPSERTS", "8"))
+# Ids per delete call when pruning vectors a re-index no longer produces
+INGEST_DELETE_BATCH_SIZE = int(os.environ.get("INGEST_DELETE_BATCH_SIZE", "1000"))
+
+# Per-process embedding model, loaded by the pool initializer
+_worker_embeddings = None
+
+
+def chunk_id(doc):
+    """
+    Stable vector id: the chunk's content hash at its place in its source
+    (source, page, start_index). Re-indexing the same corpus overwrites the
+    same ids instead of adding a second copy of every chunk.
+    """
+    meta = doc.metadata
+    key = "|".join([
+        str(meta.get("source", "")), str(meta.get("page", "")), str(meta.get("start_index", "")),
+        content_hash(doc.page_content),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _init_worker(embedder_factory, torch_threads):
+    global _worker_embeddings
+    # N processes x default torch threads would oversubscribe the cores
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_embeddings = embedder_factory()
+
+
+def _embed_batch(texts):
+    started = time.perf_counter()
+    vectors = np.asarray(_worker_embeddings.embed_documents(texts), dtype=np.float32)
+    return vectors, time.perf_counter() - started
+
+
+class PineconeSink:
+    """Upserts records into a Pinecone index (record layout of PineconeVectorStore)"""
+
+    def __init__(self, index, namespace=None):
+        self.index = index
+        self.namespace = namespace
+
+    def _namespace(self):
+        return {"namespace": self.namespace} if self.namespace else {}
+
+    def upsert(self, records):
+        self.index.upsert(vectors=records, **self._namespace())
+
+    def ids(self):
+        """Every vector id in the index (namespace), page by page"""
+        for page in self.index.list(**self._namespace()):
+            yield from page
+
+    def delete(self, ids):
+        self.index.delete(ids=ids, **self._namespace())
+
+
+class IngestionEngine:
+    """
+    Parallel embed + upload for full re-indexes.
+
+    Chunks are embedded in batches by a pool of worker processes (one
+    model per process). Finished batches are uploaded by a thread pool
+    while later batches are still embedding; at most
+    `max_inflight_upserts` uploads are pending, so a slow sink applies
+    back-pressure instead of buffering the whole corpus.
+
+    Vector ids come from chunk_id(), so a re-index replaces the previous
+    one in place. Once every upload has succeeded, ids the sink holds that
+    this run did not produce (removed or changed chunks) are deleted, if
+    the sink can list them.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS, batch_size=INGEST_BATCH_SIZE,
+                 upsert_batch_size=INGEST_UPSERT_BATCH_SIZE, max_inflight_upserts=INGEST_MAX_INFLIGHT_UPSERTS,
+                 embedder_factory=download_hugging_face_embeddings):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.max_inflight_upserts = max(1, max_inflight_upserts)
+        self.embedder_factory = embedder_factory
+
+    def _upload(self, sink, records, slots):
+        started = time.perf_counter()
+        try:
+            for start in range(0, len(records), self.upsert_batch_size):
+                sink.upsert(records[start:start + self.upsert_batch_size])
+            return time.perf_counter() - started
+        finally:
+            slots.release()
+
+    def _prune(self, sink, keep_ids):
+        stale = [vector_id for vector_id in sink.ids() if vector_id not in keep_ids]
+        for start in range(0, len(stale), INGEST_DELETE_BATCH_SIZE):
+            sink.delete(stale[start:start + INGEST_DELETE_BATCH_SIZE])
+        return len(stale)
+
+    def run(self, documents, sink, keep_vectors=True, prune=True):
+        """
+        Embed and upload every document. Returns a report dict with
+        throughput numbers, stale vectors deleted (`prune`, sinks with
+        ids() / delete() only) and, if `keep_vectors`, the vectors in input order.
+        """
+        batches = [
+            (start, documents[start:start + self.batch_size])
+            for start in range(0, len(documents), self.batch_size)
+        ]
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        embed_seconds = upload_seconds = 0.0
+        slots = threading.BoundedSemaphore(self.max_inflight_upserts)
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        started = time.perf_counter()
+        # spawn: never fork a process that may already hold torch / client threads
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.embedder_factory, torch_threads),
+        ) as embed_pool, ThreadPoolExecutor(
+            max_workers=self.max_inflight_upserts, thread_name_prefix="upsert"
+        ) as upload_pool:
+            pending, uploads, next_batch = {}, [], 0
+            while next_batch < len(batches) or pending:
+                # Two batches per worker keep every process busy without queueing the corpus
+                while next_batch < len(batches) and len(pending) < self.workers * 2:
+                    start, batch = batches[next_batch]
+                    pending[embed_pool.submit(_embed_batch, [doc.page_content for doc in batch])] = next_batch
+                    next_batch += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, batch = batches[pending.pop(future)]
+                    batch_vectors, seconds = future.result()
+                    embed_seconds += seconds
+
+                    if keep_vectors:
+                        if not vectors.size:
+                            vectors = np.zeros((len(documents), batch_vectors.shape[1]), dtype=np.float32)
+                        vectors[start:start + len(batch)] = batch_vectors
+
+                    records = [
+                        {
+                            "id": chunk_id(doc),
+                            "values": vector.tolist(),
+                            "metadata": {**doc.metadata, "text": doc.page_content},
+                        }
+                        for doc, vector in zip(batch, batch_vectors)
+                    ]
+                    slots.acquire()  # back-pressure: wait for an upload slot
+                    uploads.append(upload_pool.submit(self._upload, sink, records, slots))
+
+            for upload in uploads:
+                upload_seconds += upload.result()
+
+        # Only after a complete upload: a failed run must not delete the previous index
+        deleted = 0
+        if prune and hasattr(sink, "ids"):
+            deleted = self._prune(sink, {chunk_id(doc) for doc in documents})
+
+        wall = time.perf_counter() - started
+        return {
+            "chunks": len(documents),
+            "batches": len(batches),
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "wall_seconds": round(wall, 3),
+            "chunks_per_sec": round(len(documents) / wall, 1) if wall else 0,
+            "embed_seconds": round(embed_seconds, 3),
+            "upload_seconds": round(upload_seconds, 3),
+            "deleted": deleted,
+            "vectors": vectors if keep_vectors else None,
+        }
+
+
+def print_ingest_report(report):
+    print(
+        f"Ingested {report['chunks']} chunks in {report['wall_seconds']}s "
+        f"({report['chunks_per_sec']} chunks/sec) - {report['workers']} embedding workers, "
+        f"batch {report['batch_size']}; worker embed time {report['embed_seconds']}s, "
+        f"upload time {report['upload_seconds']}s; {report['deleted']} stale vectors deleted"
+    )
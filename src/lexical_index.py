@@ -0,0 +1,195 @@
+import gzip
+import json
+import math
+import os
+import re
+from array import array
+
+# Default on-disk location, written by store_index.py
+LEXICAL_INDEX_PATH = os.environ.get("LEXICAL_INDEX_PATH", "data/bm25_index.json.gz")
+
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been being but by can could did do does doing for from had has have having
+how i if in into is it its me my no not of on or our should so than that the their them then there
+these they this to was we were what when where which while who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords, with a light plural strip"""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+# Words that make a query a question or a sentence rather than a keyword list
+QUERY_WORDS = frozenset("""
+am are can could did do does explain has have how is may might must shall should tell was were what
+when where which who whom whose why will would
+""".split())
+
+
+def is_keyword_query(text, max_terms=4):
+    """
+    True for keyword-style queries ("fever headache", "paracetamol dosage"):
+    at most `max_terms` words, no trailing "?", no question word or auxiliary verb
+    """
+    text = (text or "").strip()
+    words = _TOKEN_RE.findall(text.lower())
+    if not words or len(words) > max_terms or text.endswith("?"):
+        return False
+    return not QUERY_WORDS.intersection(words)
+
+
+def _delta_encode(values):
+    previous, out = 0, []
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
+
+
+def _delta_decode(values):
+    total, out = 0, []
+    for value in values:
+        total += value
+        out.append(total)
+    return out
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index.
+
+    Postings are kept as compact typed arrays (doc ids + term frequencies);
+    on disk they are delta-encoded and gzip-compressed.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts = []
+        self.metadatas = []
+        self.doc_lengths = array("I")
+        self.postings = {}  # term -> (array('I') doc ids, array('H') term freqs)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, text, metadata=None, index_text=None):
+        """
+        Add one document.
+
+        `index_text` is what gets tokenized (defaults to `text`), so callers
+        can index e.g. question + keywords while storing only the question.
+        """
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(index_text if index_text is not None else text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            ids, tfs = self.postings.setdefault(token, (array("I"), array("H")))
+            ids.append(doc_id)
+            tfs.append(min(tf, 65535))
+        self.texts.append(text)
+        self.metadatas.append(metadata or {})
+        self.doc_lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        return doc_id
+
+    @classmethod
+    def from_documents(cls, documents, **kwargs):
+        """Build from langchain Documents (page_content + metadata)"""
+        index = cls(**kwargs)
+        for doc in documents:
+            index.add(doc.page_content, dict(doc.metadata or {}))
+        return index
+
+    def idf(self, term):
+        postings = self.postings.get(term)
+        df = len(postings[0]) if postings else 0
+        return math.log(1 + (len(self.doc_lengths) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=3, candidates=None):
+        """
+        Top-k (doc_id, score) pairs for a query.
+
+        `candidates` optionally restricts scoring to a set of doc ids.
+        """
+        if not self.doc_lengths:
+            return []
+        scores = {}
+        avg = (self._total_length / len(self.doc_lengths)) or 1.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            ids, tfs = postings
+            for doc_id, tf in zip(ids, tfs):
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+    def save(self, path=LEXICAL_INDEX_PATH):
+        payload = {
+            "version": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": list(self.doc_lengths),
+            "postings": {
+                term: [_delta_encode(ids), list(tfs)]
+                for term, (ids, tfs) in self.postings.items()
+            },
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=LEXICAL_INDEX_PATH):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index version: {payload.get('version')}")
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.texts = payload["texts"]
+        index.metadatas = payload["metadatas"]
+        index.doc_lengths = array("I", payload["doc_lengths"])
+        index.postings = {
+            term: (array("I", _delta_decode(ids)), array("H", tfs))
+            for term, (ids, tfs) in payload["postings"].items()
+        }
+        index._total_length = sum(index.doc_lengths)
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several ranked lists of keys into one (RRF).
+
+    Returns keys ordered by fused score, highest first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return [key for key, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
@@ -0,0 +1,215 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # "json" or "text"
+# Step-by-step pipeline tracing is DEBUG output - off unless explicitly enabled
+PIPELINE_TRACE = os.environ.get("PIPELINE_TRACE", "0").lower() in ("1", "true", "yes")
+
+ROOT_LOGGER = "chatbot"
+
+# Correlation ID of the request being handled on this thread / task
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+_listener = None
+# Background writers for local record files (see start_background_writer)
+_writers = []
+
+
+def new_request_id(request_id=None):
+    """Set (or generate) the correlation ID for the current request"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    _request_id.set(request_id)
+    return request_id
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the correlation ID on the calling thread, before the queue hand-off"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps structured fields and renders tracebacks to text"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for the log pipeline"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable variant for local development"""
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        extra = " ".join(f"{k}={v}" for k, v in fields.items())
+        request_id = getattr(record, "request_id", None) or "-"
+        line = f"{record.levelname:<7} [{request_id}] {record.name}: {record.getMessage()}"
+        if extra:
+            line += f" | {extra}"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger that takes structured fields as keyword arguments:
+
+        log.info("cache.hit", confidence=0.92, category="cardiology")
+    """
+
+    _RESERVED = ("exc_info", "stack_info", "stacklevel", "extra")
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in self._RESERVED}
+        extra = kwargs.setdefault("extra", {})
+        extra["fields"] = fields
+        return msg, kwargs
+
+
+def setup_logging():
+    """
+    Route all `chatbot.*` loggers through a queue.
+
+    Request threads only enqueue records; formatting and stdout writes
+    happen on the QueueListener's background thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    pipeline_logger = logging.getLogger(f"{ROOT_LOGGER}.pipeline")
+    pipeline_logger.setLevel(logging.DEBUG if PIPELINE_TRACE else LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+    # The listener thread does not survive fork(); pre-forked workers need their own
+    os.register_at_fork(after_in_child=_restart_listener)
+
+
+def _stop_listener():
+    for writer in _writers:
+        writer.stop()
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener():
+    """Give a forked child a fresh queue (records still queued belong to the parent) and listener"""
+    global _listener
+    for writer in _writers:
+        writer.start()
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger(ROOT_LOGGER).handlers:
+        if isinstance(handler, _QueueHandler):
+            handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+class BackgroundWriter:
+    """
+    Hands pre-rendered lines to `handler` on a QueueListener thread, the
+    same way log output is written: callers only enqueue. Restarted in
+    forked children along with the log listener.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.start()
+
+    def start(self):
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, self)
+        self._listener.start()
+
+    def stop(self):
+        """Write out what is queued and stop the thread"""
+        self._listener.stop()
+
+    def write(self, line):
+        self._queue.put(logging.makeLogRecord({"msg": line}))
+
+    def flush(self, timeout=5.0):
+        """Block until every line queued so far is written"""
+        done = threading.Event()
+        self._queue.put(logging.makeLogRecord({"flushed": done}))
+        return done.wait(timeout)
+
+    def handle(self, record):
+        # Runs on the listener thread
+        flushed = getattr(record, "flushed", None)
+        if flushed is not None:
+            flushed.set()
+        else:
+            self.handler.handle(record)
+
+
+def start_background_writer(handler):
+    """BackgroundWriter for `handler` (a logging.Handler writing record.getMessage()), stopped at exit"""
+    setup_logging()
+    writer = BackgroundWriter(handler)
+    _writers.append(writer)
+    return writer
+
+
+def get_logger(name):
+    """Return a structured logger under the `chatbot` namespace"""
+    setup_logging()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
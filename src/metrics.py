@@ -0,0 +1,349 @@
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Histogram buckets (seconds) - covers cache hits (ms) up to slow LLM/TTS calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Pre-forked workers (gunicorn.conf.py) each keep their own registry. With a
+# directory set, every process writes its metrics to <dir>/metrics_<pid>.json
+# every METRICS_SYNC_INTERVAL seconds and /metrics serves the merge of all of
+# them, whichever worker the scrape lands on. Empty: this process only.
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+METRICS_SYNC_INTERVAL = float(os.environ.get("METRICS_SYNC_INTERVAL", "5"))
+
+# Active request trace for the current thread / task
+_current_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def _format_labels(labels):
+    """Render a label tuple in Prometheus exposition format"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class Trace:
+    """
+    Collects per-stage spans for one request.
+
+    The answer `source` is only known once the pipeline finishes, so spans
+    are buffered here and recorded with the final source label on flush.
+    """
+
+    def __init__(self, registry, handler):
+        self.registry = registry
+        self.handler = handler
+        self.source = None
+        self.spans = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((stage, time.perf_counter() - start))
+
+    def flush(self):
+        source = self.source or "none"
+        for stage, seconds in self.spans:
+            self.registry.observe(
+                "chatbot_stage_duration_seconds", seconds,
+                handler=self.handler, stage=stage, source=source
+            )
+        self.registry.observe(
+            "chatbot_request_duration_seconds", time.perf_counter() - self.started,
+            handler=self.handler, source=source
+        )
+        self.registry.inc("chatbot_requests_total", handler=self.handler, source=source)
+
+
+class MetricsRegistry:
+    """Thread-safe in-process metrics with Prometheus text output"""
+
+    HELP = {
+        "chatbot_stage_duration_seconds": "Duration of each pipeline stage",
+        "chatbot_request_duration_seconds": "End-to-end request duration",
+        "chatbot_requests_total": "Requests handled, by answer source",
+        "chatbot_retriever_cache_total": "Vector retrieval cache lookups, by result",
+        "chatbot_retrieval_scope_total": "Vector searches by scope (category, fallback to all, all)",
+        "chatbot_shared_cache_total": "Shared answer cache lookups and errors, by result",
+        "chatbot_admission_in_flight": "Requests currently running in a limited stage",
+        "chatbot_admission_queue_depth": "Requests waiting for a slot in a limited stage",
+        "chatbot_admission_shed_total": "Requests shed by admission control, by stage and reason",
+        "chatbot_llm_hedged_total": "LLM calls abandoned for a fallback answer to meet the request deadline",
+        "chatbot_breaker_state": "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open)",
+        "chatbot_breaker_rejected_total": "Calls failed fast by an open circuit breaker, by dependency",
+        "chatbot_single_flight_total": "Coalesced calls, by group and role (leader, follower, timeout)",
+        "chatbot_answer_cache_total": "Answer cache lookups, by result, (matched or nearest) category and question language",
+        "chatbot_answer_cache_miss_score": "Best fuzzy score (0-100) of answer cache misses",
+        "chatbot_tts_audio_bytes_total": "TTS audio bytes as synthesized and as delivered after transcoding, by format",
+    }
+
+    # Histograms that are not durations
+    BUCKETS = {
+        "chatbot_answer_cache_miss_score": (50, 60, 70, 75, 80, 85, 90, 95, 100),
+    }
+
+    # Gauges are summed across worker processes, except these (worst worker wins)
+    GAUGE_MAX = {"chatbot_breaker_state"}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._multiproc_dir = None
+        self._sync_interval = METRICS_SYNC_INTERVAL
+        self._sync_stop = None
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.BUCKETS.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def trace(self, handler):
+        """
+        Start a request trace, or join the one already active.
+
+        Nested calls (e.g. get_smart_response inside /voice-chat) add their
+        spans to the outer trace so the whole request shares one source label.
+        """
+        current = _current_trace.get()
+        if current is not None:
+            yield current
+            return
+
+        trace = Trace(self, handler)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.flush()
+
+    def traced(self, handler):
+        """Decorator that runs a Flask view inside a request trace"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                with self.trace(handler):
+                    return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    @contextmanager
+    def span(self, stage):
+        """Time a stage inside the active trace (recorded standalone if none)"""
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace.span(stage):
+                yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                "chatbot_stage_duration_seconds", time.perf_counter() - start,
+                handler="none", stage=stage, source="none"
+            )
+
+    @staticmethod
+    def set_source(source):
+        """Label the active trace with the answer source"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.source = source
+
+    def _collect(self):
+        with self._lock:
+            histograms = {k: (v.buckets, list(v.counts), v.total, v.count) for k, v in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return counters, gauges, histograms
+
+    def enable_multiprocess(self, directory, interval=METRICS_SYNC_INTERVAL):
+        """
+        Share this process's metrics through `directory` (see
+        METRICS_MULTIPROC_DIR). A forked child starts from empty metrics -
+        the parent's stay in the parent's file - and its own sync thread.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._multiproc_dir = directory
+        self._sync_interval = interval
+        self._start_sync()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._histograms, self._counters, self._gauges = {}, {}, {}
+        self._start_sync()
+
+    def _start_sync(self):
+        self._sync_stop = threading.Event()
+        threading.Thread(target=self._sync_loop, args=(self._sync_stop,), name="metrics-sync", daemon=True).start()
+
+    def _sync_loop(self, stop):
+        while not stop.wait(self._sync_interval):
+            self.write_snapshot()
+
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self._multiproc_dir, f"metrics_{pid or os.getpid()}.json")
+
+    def write_snapshot(self):
+        """Write this process's metrics to its file in the shared directory (no-op without one)"""
+        if not self._multiproc_dir:
+            return
+        counters, gauges, histograms = self._collect()
+        snapshot = {
+            "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+            "gauges": [[name, labels, value] for (name, labels), value in gauges.items()],
+            "histograms": [[name, labels, *values] for (name, labels), values in histograms.items()],
+        }
+        _write_json(self._snapshot_path(), snapshot)
+
+    def mark_process_dead(self, pid):
+        """
+        Called by the master when a worker exits: its counters and
+        histograms keep counting towards the totals, its gauges are dropped
+        """
+        if not self._multiproc_dir:
+            return
+        path = self._snapshot_path(pid)
+        snapshot = _read_json(path)
+        if snapshot and snapshot.get("gauges"):
+            _write_json(path, {**snapshot, "gauges": []})
+
+    def _collect_multiprocess(self):
+        """Sum of every process's snapshot, this one's taken now"""
+        self.write_snapshot()
+        counters, gauges, histograms = {}, {}, {}
+        for path in glob.glob(os.path.join(self._multiproc_dir, "metrics_*.json")):
+            snapshot = _read_json(path)
+            if not snapshot:
+                continue
+            for name, labels, value in snapshot["counters"]:
+                key = (name, _labels(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, _labels(labels))
+                if key not in gauges:
+                    gauges[key] = value
+                elif name in self.GAUGE_MAX:
+                    gauges[key] = max(gauges[key], value)
+                else:
+                    gauges[key] += value
+            for name, labels, buckets, counts, total, count in snapshot["histograms"]:
+                key = (name, _labels(labels))
+                merged = histograms.get(key)
+                if merged is not None:
+                    counts = [a + b for a, b in zip(merged[1], counts)]
+                    total, count = merged[2] + total, merged[3] + count
+                histograms[key] = (tuple(buckets), counts, total, count)
+        return counters, gauges, histograms
+
+    def render_prometheus(self):
+        """
+        Render all metrics in Prometheus text exposition format (v0.0.4):
+        every worker's when multi-process sharing is on, else this process's
+        """
+        if self._multiproc_dir:
+            counters, gauges, histograms = self._collect_multiprocess()
+        else:
+            counters, gauges, histograms = self._collect()
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            for bound, bucket_count in zip(buckets, counts):
+                bucket_labels = labels + (("le", repr(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    return tuple(tuple(pair) for pair in pairs)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    # Atomic: a scrape in another worker never reads a half-written file
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+if METRICS_MULTIPROC_DIR:
+    metrics.enable_multiprocess(METRICS_MULTIPROC_DIR)
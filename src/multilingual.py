@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import unicodedata
+
+from src.logger import get_logger
+
+log = get_logger("multilingual")
+
+try:
+    import numpy as np
+    from src.helper import download_hugging_face_embeddings
+except ImportError:
+    np = download_hugging_face_embeddings = None
+
+# Multilingual sentence model for cross-lingual cache lookups. Empty disables them.
+CACHE_XLINGUAL_MODEL = os.environ.get(
+    'CACHE_XLINGUAL_MODEL', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+)
+# Minimum cosine similarity for a cross-lingual cache hit
+CACHE_XLINGUAL_SIMILARITY = float(os.environ.get('CACHE_XLINGUAL_SIMILARITY', '0.8'))
+
+# Whisper reports language names, TTS and cache variants use codes
+SUPPORTED_LANGUAGES = {
+    'hindi': 'hi',
+    'bengali': 'bn',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'marathi': 'mr',
+    'gujarati': 'gu',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'punjabi': 'pa',
+    'urdu': 'ur',
+    'odia': 'or',
+    'assamese': 'as',
+    'nepali': 'ne',
+    'english': 'en',
+    # Additional languages
+    'sanskrit': 'sa',
+    'sindhi': 'sd',
+    'konkani': 'gom',
+    'manipuri': 'mni',
+    'kashmiri': 'ks',
+    'dogri': 'doi',
+    'bodo': 'brx',
+    'santhali': 'sat',
+    'maithili': 'mai'
+}
+
+# Unicode script -> most likely language, for typed (WhatsApp) messages.
+# Devanagari is also Marathi / Nepali; Hindi is by far our most common.
+SCRIPT_LANGUAGES = (
+    (0x0600, 0x06FF, 'ur'),
+    (0x0900, 0x097F, 'hi'),
+    (0x0980, 0x09FF, 'bn'),
+    (0x0A00, 0x0A7F, 'pa'),
+    (0x0A80, 0x0AFF, 'gu'),
+    (0x0B00, 0x0B7F, 'or'),
+    (0x0B80, 0x0BFF, 'ta'),
+    (0x0C00, 0x0C7F, 'te'),
+    (0x0C80, 0x0CFF, 'kn'),
+    (0x0D00, 0x0D7F, 'ml'),
+)
+
+
+def language_code(language):
+    """'Hindi' / 'hindi' / 'hi' -> 'hi'; None for nothing"""
+    if not language:
+        return None
+    language = language.strip().lower()
+    return SUPPORTED_LANGUAGES.get(language, language)
+
+
+def guess_language(text):
+    """Language of typed text from its script; None for Latin script (English or romanized)"""
+    counts = {}
+    letters = 0
+    for ch in text or "":
+        if not unicodedata.category(ch).startswith('L'):
+            continue
+        letters += 1
+        point = ord(ch)
+        for start, end, code in SCRIPT_LANGUAGES:
+            if start <= point <= end:
+                counts[code] = counts.get(code, 0) + 1
+                break
+    if not counts:
+        return None
+    code, count = max(counts.items(), key=lambda item: item[1])
+    return code if count * 2 >= letters else None
+
+
+class CrossLingualIndex:
+    """
+    Embedding lookup that matches a question against the cache in any language.
+
+    Fuzzy matching only works within one script, so a Tamil voice note never
+    matches an English entry. Every cached question (English plus its
+    translated variants) is embedded with a multilingual model; a query is
+    compared against the English questions and the variants in its own
+    language.
+
+    load() brings in the model and builds the index; app.py calls it at
+    import, so under gunicorn's preload it happens once in the master and
+    is shared copy-on-write. After that the cache manager's reload hook
+    rebuilds the index in the watcher thread and swaps it in with one
+    assignment, so lookups never wait on embedding the cache. Optional:
+    until load() succeeds (numpy / the model missing) it never matches.
+    """
+
+    def __init__(self, manager, model_name=CACHE_XLINGUAL_MODEL, similarity=CACHE_XLINGUAL_SIMILARITY):
+        self.manager = manager
+        self.model_name = model_name
+        self.similarity = similarity
+        self._embeddings = None
+        self._lock = threading.Lock()
+        # (cache state it was built from, vectors, [(entry index, language)])
+        self._index = (None, None, [])
+
+    @property
+    def available(self):
+        return self._embeddings is not None
+
+    def load(self, embeddings=None):
+        """
+        Load the model (or use `embeddings`, an already loaded one) and index
+        the current cache. False if unavailable (logged).
+        """
+        if self._embeddings is not None:
+            return True
+        if np is None or not (embeddings or self.model_name):
+            return False
+        try:
+            started = time.perf_counter()
+            self._embeddings = embeddings or download_hugging_face_embeddings(self.model_name)
+            log.info("xlingual.model_loaded", model=self.model_name, seconds=round(time.perf_counter() - started, 3))
+            self.rebuild(self.manager._state)
+        except Exception as e:
+            self._embeddings = None
+            log.warning("xlingual.disabled", model=self.model_name, error=str(e))
+            return False
+        return True
+
+    def _embed(self, texts):
+        vectors = np.asarray(self._embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def rebuild(self, state):
+        """Index `state` off to the side, then publish it (cache reload hook; no-op before load())"""
+        if self._embeddings is None:
+            return
+        # Serializes rebuilds only - lookups keep reading the published index
+        with self._lock:
+            started = time.perf_counter()
+            texts, labels = [], []
+            for i, item in enumerate(state.entries):
+                texts.append(item['question'])
+                labels.append((i, 'en'))
+                for language, variant in (item.get('translations') or {}).items():
+                    if variant.get('question'):
+                        texts.append(variant['question'])
+                        labels.append((i, language))
+            vectors = self._embed(texts) if texts else None
+            self._index = (state, vectors, labels)
+        log.info("xlingual.built", vectors=len(texts), seconds=round(time.perf_counter() - started, 3))
+
+    def match(self, question, language):
+        """(cache state, entry index, similarity) of the closest entry, or None below the threshold"""
+        if not self.available or not question:
+            return None
+        state, vectors, labels = self._index
+        if vectors is None:
+            return None
+        try:
+            scores = vectors @ self._embed([question])[0]
+        except Exception as e:
+            log.warning("xlingual.embed_error", model=self.model_name, error=str(e))
+            return None
+
+        best_index, best_score = None, -1.0
+        for (index, variant_language), score in zip(labels, scores):
+            if variant_language in ('en', language) and score > best_score:
+                best_index, best_score = index, float(score)
+        if best_index is None or best_score < self.similarity:
+            return None
+        return state, best_index, best_score
@@ -3,7 +3,7 @@ system_prompt = (
     "Use the following pieces of retrieved context to answer "
     "the question. If you don't know the answer, say that you "
     "don't know. Use three sentences maximum and keep the "
-    "answer concise."
+    "answer concise. Answer in the same language as the question."
     "\n\n"
     "{context}"
 )
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import time
+
+from src.logger import get_logger, start_background_writer
+
+log = get_logger("question_log")
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, rotation is per process
+    fcntl = None
+
+# JSON Lines record of answered questions, read by mine_cache.py. Empty disables it.
+QUESTION_LOG_PATH = os.environ.get("QUESTION_LOG_PATH", "data/question_log.jsonl")
+# Past this size the file is rotated to <path>.1 (one generation kept)
+QUESTION_LOG_MAX_BYTES = int(os.environ.get("QUESTION_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class JsonLinesHandler(logging.Handler):
+    """
+    Appends each record's line to `path`, rotating it to <path>.1 past
+    `max_bytes`. Runs on a background writer thread.
+
+    Every worker on the host appends to the same file, so the size check,
+    rotation and append happen under an exclusive lock on <path>.lock:
+    one worker can never rename away a generation another is writing.
+    The file is reopened per write and never held open between writes.
+    """
+
+    def __init__(self, path, max_bytes=QUESTION_LOG_MAX_BYTES):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock_path = path + ".lock"
+        self._warned = False
+
+    def emit(self, record):
+        try:
+            # Opened per write: a flock on a descriptor inherited across fork would be shared
+            with open(self.lock_path, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(record.getMessage())
+        except OSError as e:
+            if not self._warned:
+                self._warned = True
+                log.warning("question_log.write_error", path=self.path, error=str(e))
+
+
+class QuestionLog:
+    """
+    Append-only question log shared by every worker on the host.
+
+    record() only renders the line and queues it; the file I/O (see
+    JsonLinesHandler) happens on a background writer thread, like log
+    output. Write errors are logged once and otherwise ignored - this
+    must never fail or slow down a request.
+    """
+
+    def __init__(self, path=QUESTION_LOG_PATH, max_bytes=QUESTION_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer = start_background_writer(JsonLinesHandler(path, max_bytes))
+
+    def record(self, question, **fields):
+        self._writer.write(
+            json.dumps({"ts": round(time.time(), 3), "question": question, **fields}, ensure_ascii=False) + "\n"
+        )
+
+    def flush(self, timeout=5.0):
+        """Wait until the queued records are on disk"""
+        return self._writer.flush(timeout)
+
+
+def read_questions(paths):
+    """
+    Questions from log files: question logs (.jsonl with "question"),
+    Node chat-history exports (.jsonl / .json with sender "user" and "text"),
+    or plain text with one question per line. Yields (question, record).
+    """
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                records = json.load(f)
+                records = records.get("messages", []) if isinstance(records, dict) else records
+            elif path.endswith(".jsonl"):
+                records = (json.loads(line) for line in f if line.strip())
+            else:
+                records = ({"question": line.strip()} for line in f if line.strip())
+
+            for record in records:
+                if isinstance(record, str):
+                    record = {"question": record}
+                question = record.get("question")
+                if question is None and record.get("sender") == "user":
+                    question = record.get("text")
+                if question and question.strip():
+                    yield question.strip(), record
+
+
+def create_question_log(path=QUESTION_LOG_PATH):
+    if not path:
+        return None
+    try:
+        return QuestionLog(path)
+    except OSError as e:
+        log.warning("question_log.disabled", error=str(e))
+        return None
+
+
+# Initialize global question log (None when disabled)
+question_log = create_question_log()
@@ -0,0 +1,333 @@
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from src.circuit_breaker import CircuitOpen
+from src.lexical_index import reciprocal_rank_fusion
+from src.metrics import metrics
+
+# Stamp rewritten by store_index.py after every re-index; caches drop their entries when it changes
+INDEX_VERSION_PATH = os.environ.get("INDEX_VERSION_PATH", "data/index_version")
+
+
+def write_index_version(path=INDEX_VERSION_PATH):
+    """Record a new index version (call after the vector store has been rebuilt)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    version = f"{time.time():.6f}"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_index_version(path=INDEX_VERSION_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def normalize_query(text):
+    """NFKC + casefold, punctuation to spaces; letters, marks and digits of any script are kept"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join("".join(ch if unicodedata.category(ch)[0] in "LMN" else " " for ch in text).split())
+
+
+class LexicalRetriever(BaseRetriever):
+    """BM25 retriever over a local BM25Index - CPU only, no embedding, no network"""
+
+    index: Any
+    k: int = 3
+    min_score: float = 0.0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [
+            Document(
+                page_content=self.index.texts[doc_id],
+                metadata={**self.index.metadatas[doc_id], "bm25_score": round(score, 4)},
+            )
+            for doc_id, score in self.index.search(query, k=self.k)
+            if score >= self.min_score
+        ]
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval fused with reciprocal rank fusion (BM25 alone while the vector store's breaker is open)"""
+
+    vector: BaseRetriever
+    lexical: LexicalRetriever
+    k: int = 3
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        callbacks = run_manager.get_child()
+        try:
+            vector_docs = self.vector.invoke(query, config={"callbacks": callbacks})
+        except CircuitOpen:
+            vector_docs = []
+        return self._fuse(vector_docs, self.lexical.invoke(query, config={"callbacks": callbacks}))
+
+    def retrieve_many(self, queries, max_workers=8):
+        """Batch counterpart of invoke (see CachingRetriever.retrieve_many)"""
+        if hasattr(self.vector, "retrieve_many"):
+            vector_results = self.vector.retrieve_many(queries, max_workers=max_workers)
+        else:
+            vector_results = [self.vector.invoke(query) for query in queries]
+        results = []
+        for query, vector_docs in zip(queries, vector_results):
+            if isinstance(vector_docs, CircuitOpen):
+                vector_docs = []
+            if isinstance(vector_docs, Exception):
+                results.append(vector_docs)
+            else:
+                results.append(self._fuse(vector_docs, self.lexical.invoke(query)))
+        return results
+
+    def _fuse(self, vector_docs, lexical_docs):
+        by_content = {}
+        for doc in lexical_docs + vector_docs:
+            by_content.setdefault(doc.page_content, doc)
+
+        fused = reciprocal_rank_fusion([
+            [doc.page_content for doc in vector_docs],
+            [doc.page_content for doc in lexical_docs],
+        ])
+        return [by_content[content] for content in fused[:self.k]]
+
+
+class CachingRetriever(BaseRetriever):
+    """
+    Vector-store retriever that memoizes top-k results.
+
+    Lookups go: normalized query text (no embedding at all), then a
+    random-hyperplane hash of the query embedding whose bucket entries are
+    confirmed by cosine similarity (near-duplicate phrasings), then the
+    vector store - queried with the embedding already computed. Results
+    carry their similarity in metadata["score"].
+    Entries are LRU-bounded, expire after `ttl_seconds`, and are dropped
+    when the index version stamp changes. Only the vector-store query runs
+    under `breaker`, so cache hits still work while it is open.
+
+    With a `classifier` (src/categories.py), queries it can place in a
+    medical category search only that category's chunks (metadata filter),
+    falling back to the whole index when fewer than `category_min_docs`
+    come back. Cache entries are kept per category.
+    """
+
+    vectorstore: Any
+    embeddings: Any
+    k: int = 3
+    max_entries: int = 1024
+    ttl_seconds: float = 600.0
+    similarity: float = 0.95
+    hash_bits: int = 16
+    version_path: str = INDEX_VERSION_PATH
+    version_check_seconds: float = 5.0
+    breaker: Any = None
+    classifier: Any = None
+    category_min_docs: int = 2
+
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)  # query -> (expires, vector, docs)
+    _buckets: dict = PrivateAttr(default_factory=dict)  # hash -> set of queries
+    _planes: Any = PrivateAttr(default=None)
+    _version: Any = PrivateAttr(default=None)
+    _version_checked_at: float = PrivateAttr(default=float("-inf"))
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _check_version(self, now):
+        if now - self._version_checked_at < self.version_check_seconds:
+            return
+        self._version_checked_at = now
+        version = read_index_version(self.version_path)
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def _hash(self, vector):
+        if self._planes is None:
+            rng = np.random.default_rng(0)
+            self._planes = rng.standard_normal((self.hash_bits, len(vector))).astype(np.float32)
+        bits = (self._planes @ vector) > 0
+        return int(np.packbits(bits).tobytes().hex(), 16)
+
+    def _get_fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self, key):
+        _, vector, _ = self._entries.pop(key)
+        bucket_key = self._hash(vector)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[bucket_key]
+
+    def _category(self, query):
+        """Category to scope the vector search to, or None for the whole index"""
+        return self.classifier.classify(query) if self.classifier is not None else None
+
+    @staticmethod
+    def _key(query, category):
+        """Cache key: (category it was searched in or None, normalized query)"""
+        return category, normalize_query(query) or query
+
+    def _lookup_near(self, vector, now, category=None):
+        with self._lock:
+            candidates = list(self._buckets.get(self._hash(vector), ()))
+            for key in candidates:
+                # Only near-duplicates searched in the same scope
+                if key[0] != category:
+                    continue
+                entry = self._get_fresh(key, now)
+                if entry is not None and float(entry[1] @ vector) >= self.similarity:
+                    return entry[2]
+        return None
+
+    def _store(self, key, vector, docs, now):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (now + self.ttl_seconds, vector, docs)
+            self._buckets.setdefault(self._hash(vector), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        now = time.monotonic()
+        self._check_version(now)
+        category = self._category(query)
+        key = self._key(query, category)
+
+        with self._lock:
+            entry = self._get_fresh(key, now)
+        if entry is not None:
+            metrics.inc("chatbot_retriever_cache_total", result="hit")
+            return list(entry[2])
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector /= (np.linalg.norm(vector) or 1.0)
+
+        docs = self._lookup_near(vector, now, category)
+        if docs is not None:
+            metrics.inc("chatbot_retriever_cache_total", result="near_hit")
+            self._store(key, vector, docs, now)
+            return list(docs)
+
+        metrics.inc("chatbot_retriever_cache_total", result="miss")
+        docs = self._search(vector, category)
+        self._store(key, vector, docs, now)
+        return list(docs)
+
+    def _search(self, vector, category=None):
+        matches = None
+        if category:
+            matches = self._query_store(vector, filter={"category": {"$eq": category}})
+            if len(matches) < self.category_min_docs:
+                # Too little in that category (or an index without categories yet)
+                metrics.inc("chatbot_retrieval_scope_total", scope="fallback")
+                matches = None
+            else:
+                metrics.inc("chatbot_retrieval_scope_total", scope="category")
+        if matches is None:
+            if not category:
+                metrics.inc("chatbot_retrieval_scope_total", scope="all")
+            matches = self._query_store(vector)
+        # Similarity score rides along for context assembly (adaptive k)
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, "score": float(score)})
+            for doc, score in matches
+        ]
+
+    def _query_store(self, vector, **kwargs):
+        with self.breaker.guard() if self.breaker is not None else nullcontext():
+            return self.vectorstore.similarity_search_by_vector_with_score(vector.tolist(), k=self.k, **kwargs)
+
+    def retrieve_many(self, queries, max_workers=8):
+        """
+        Top-k for many queries at once (batch jobs). Cache lookups first, then
+        a single embed_documents call for every miss (one batched forward
+        pass; same vectors as embed_query for our sentence-transformers
+        model), then the vector-store queries run concurrently.
+
+        Returns one document list per query, or the exception its
+        vector-store query raised.
+        """
+        now = time.monotonic()
+        self._check_version(now)
+        categories = [self._category(query) for query in queries]
+        keys = [self._key(query, category) for query, category in zip(queries, categories)]
+        results = [None] * len(queries)
+
+        misses = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._get_fresh(key, now)
+                if entry is None:
+                    misses.append(i)
+                else:
+                    metrics.inc("chatbot_retriever_cache_total", result="hit")
+                    results[i] = list(entry[2])
+        if not misses:
+            return results
+
+        vectors = np.asarray(self.embeddings.embed_documents([queries[i] for i in misses]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+
+        to_search = []
+        for i, vector in zip(misses, vectors):
+            docs = self._lookup_near(vector, now, categories[i])
+            if docs is None:
+                to_search.append((i, vector))
+                continue
+            metrics.inc("chatbot_retriever_cache_total", result="near_hit")
+            self._store(keys[i], vector, docs, now)
+            results[i] = list(docs)
+        if not to_search:
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(to_search)))) as pool:
+            searches = [(i, vector, pool.submit(self._search, vector, categories[i])) for i, vector in to_search]
+        for i, vector, future in searches:
+            metrics.inc("chatbot_retriever_cache_total", result="miss")
+            try:
+                docs = future.result()
+            except Exception as e:
+                results[i] = e
+                continue
+            self._store(keys[i], vector, docs, now)
+            results[i] = list(docs)
+        return results
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+
+from src.logger import get_logger
+from src.metrics import metrics
+
+log = get_logger("shared_cache")
+
+# sqlite (host-wide, default) | memory (per-process stand-in) | none
+SHARED_CACHE_BACKEND = os.environ.get("SHARED_CACHE_BACKEND", "sqlite").lower()
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", "data/shared_cache.sqlite3")
+SHARED_CACHE_TTL = float(os.environ.get("SHARED_CACHE_TTL", "86400"))
+
+# Expired rows are purged every this many writes
+_PURGE_EVERY = 500
+
+
+def question_key(question):
+    """Same normalization as CacheManager.preprocess_text"""
+    text = re.sub(r"\s+", " ", (question or "").lower()).strip()
+    return "".join(ch for ch in text if ch.isspace() or unicodedata.category(ch)[0] in "LMN")
+
+
+class SharedCacheBackend(ABC):
+    """Key -> JSON-able value store with per-entry TTL, shared by every worker"""
+
+    @abstractmethod
+    def get(self, key):
+        """Value stored under `key`, or None if missing / expired"""
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        """Store `value` under `key` for `ttl` seconds"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Drop `key` if present"""
+
+    @abstractmethod
+    def stats(self):
+        """Backend name and entry count for /status"""
+
+
+class MemoryBackend(SharedCacheBackend):
+    """In-process stand-in (tests, benchmarks, or a placeholder for a networked store)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            live = sum(1 for expires, _ in self._entries.values() if expires >= now)
+        return {"backend": "memory", "entries": live}
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """
+    Host-wide store in a SQLite file in WAL mode: readers never block on
+    the writer, and every worker process on the host sees the same rows.
+    Connections are per process and thread, so none crosses a fork.
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, busy_timeout_ms=2000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM answers WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO answers (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM answers WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def stats(self):
+        (entries,) = self._connect().execute(
+            "SELECT COUNT(*) FROM answers WHERE expires_at >= ?", (time.time(),)
+        ).fetchone()
+        return {"backend": "sqlite", "entries": entries, "path": self.path}
+
+
+class SharedAnswerCache:
+    """
+    Second cache tier behind the in-process CacheManager: normalized
+    question -> generated answer, visible to every worker on the host.
+    Backend failures are logged and treated as misses, never raised.
+    """
+
+    def __init__(self, backend, ttl=SHARED_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def get(self, question):
+        key = question_key(question)
+        if not key:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            metrics.inc("chatbot_shared_cache_total", result="error")
+            log.warning("shared_cache.get_error", error=str(e))
+            return None
+        metrics.inc("chatbot_shared_cache_total", result="hit" if value else "miss")
+        return value
+
+    def put(self, question, result):
+        key = question_key(question)
+        if not key:
+            return
+        try:
+            self.backend.set(key, {
+                "answer": result["answer"],
+                "source": result["source"],
+                "confidence": result["confidence"],
+                "created": time.time(),
+            }, self.ttl)
+        except Exception as e:
+            metrics.inc("chatbot_shared_cache_total", result="error")
+            log.warning("shared_cache.put_error", error=str(e))
+
+    def stats(self):
+        try:
+            return self.backend.stats()
+        except Exception as e:
+            return {"error": str(e)}
+
+
+def create_shared_cache(backend=SHARED_CACHE_BACKEND):
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return SharedAnswerCache(MemoryBackend())
+    if backend == "sqlite":
+        try:
+            return SharedAnswerCache(SQLiteBackend())
+        except Exception as e:
+            log.warning("shared_cache.disabled", error=str(e))
+            return None
+    raise ValueError(f"Unknown SHARED_CACHE_BACKEND: {backend}")
+
+
+# Initialize global shared cache (None when disabled)
+shared_cache = create_shared_cache()
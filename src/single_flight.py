@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+
+from src.deadline import stage_timeout
+from src.logger import get_logger
+from src.metrics import metrics
+
+log = get_logger("single_flight")
+
+# How long a duplicate waits on the in-flight call before doing the work itself
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", "30"))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the function; callers arriving while
+    it runs wait for it and get the same result, or the same exception.
+    Nothing is remembered once the call finishes - this is not a cache.
+    A duplicate that waits longer than `timeout` stops waiting and runs the
+    function itself, so one stuck call can't hold every duplicate hostage.
+
+    Threads (do) and coroutines (ado) are tracked separately; the async
+    side shares one task per key on the running loop.
+    """
+
+    def __init__(self, name, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _count(self, role):
+        metrics.inc("chatbot_single_flight_total", group=self.name, role=role)
+
+    def do(self, key, fn, *args, **kwargs):
+        if key is None:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            self._count("leader")
+            try:
+                call.result = fn(*args, **kwargs)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        self._count("follower")
+        if not call.done.wait(stage_timeout(self.timeout)):
+            self._count("timeout")
+            log.warning("single_flight.wait_timeout", group=self.name, timeout=self.timeout)
+            return fn(*args, **kwargs)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """`fn(*args, **kwargs)` returns an awaitable; run once per key on this loop"""
+        if key is None:
+            return await fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            self._count("leader")
+            task = self._tasks[key] = loop.create_task(fn(*args, **kwargs))
+            task.add_done_callback(lambda t: self._forget(key, t))
+            # Shielded: the leader's caller going away must not cancel it for the others
+            return await asyncio.shield(task)
+
+        self._count("follower")
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), stage_timeout(self.timeout))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # the shared call itself timed out
+            self._count("timeout")
+            log.warning("single_flight.wait_timeout", group=self.name, timeout=self.timeout)
+            return await fn(*args, **kwargs)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved by the awaiting callers; silence "never retrieved"
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
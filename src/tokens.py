@@ -0,0 +1,42 @@
+import os
+
+from src.logger import get_logger
+
+log = get_logger("tokens")
+
+# Encoding used by the chat model (gpt-3.5-turbo -> cl100k_base)
+TOKEN_ENCODING = os.environ.get("TOKEN_ENCODING", "cl100k_base")
+
+# Try to load a real tokenizer (ships with langchain-openai)
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    TOKENIZER = "tiktoken"
+except Exception:
+    _encoding = None
+    TOKENIZER = None
+    log.warning("tokens.approximate", hint="pip install tiktoken for exact token counts")
+
+# Rough English average when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    """Number of model tokens in text"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // _CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Longest prefix of text that fits in max_tokens"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return _encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * _CHARS_PER_TOKEN]
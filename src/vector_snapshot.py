@@ -0,0 +1,180 @@
+import gzip
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Default export location, written by store_index.py
+VECTOR_SNAPSHOT_DIR = os.environ.get("VECTOR_SNAPSHOT_DIR", "data/vector_snapshot")
+
+FORMAT_VERSION = 1
+
+# Bits set in every byte value, for Hamming distance over packed sign bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_int8(vectors, scales):
+    """Symmetric per-dimension int8 quantization"""
+    return np.clip(np.rint(vectors / scales * 127.0), -127, 127).astype(np.int8)
+
+
+def quantize_binary(vectors):
+    """One sign bit per dimension, packed 8 per byte"""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def write_snapshot(vectors, documents, path=VECTOR_SNAPSHOT_DIR):
+    """
+    Export embeddings + chunks as a memory-mappable snapshot directory:
+
+        vectors.f32.npy   normalized float32 (only read for rerank)
+        vectors.i8.npy    int8 codes, per-dimension scales in meta.json
+        vectors.bin.npy   packed sign bits
+        chunks.json.gz    page_content + metadata per row
+        meta.json         format version, count, dims, scales
+    """
+    vectors = _normalize(vectors)
+    if len(vectors) != len(documents):
+        raise ValueError(f"{len(vectors)} vectors for {len(documents)} documents")
+
+    scales = np.abs(vectors).max(axis=0)
+    scales[scales == 0] = 1.0
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "vectors.f32.npy"), vectors)
+    np.save(os.path.join(path, "vectors.i8.npy"), quantize_int8(vectors, scales))
+    np.save(os.path.join(path, "vectors.bin.npy"), quantize_binary(vectors))
+    with gzip.open(os.path.join(path, "chunks.json.gz"), "wt", encoding="utf-8") as f:
+        json.dump(
+            [{"text": doc.page_content, "metadata": dict(doc.metadata)} for doc in documents],
+            f, ensure_ascii=False, separators=(",", ":")
+        )
+    # meta.json last: a snapshot without it is incomplete
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "count": int(vectors.shape[0]),
+            "dims": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "scales": scales.tolist(),
+        }, f)
+
+
+class VectorSnapshot:
+    """
+    Two-stage local search over a snapshot: a cheap scan of the quantized
+    codes (Hamming over sign bits, or int8 dot product) picks candidates,
+    which are reranked with the exact float vectors.
+
+    The codes are memory-mapped, so resident memory is what the scan
+    touches: 48 B/vector for binary, 384 B for int8 (384 dims) against
+    1536 B for float32. Float rows are only paged in for candidates.
+
+    Exposes the vector-store calls CachingRetriever uses, so a snapshot
+    can stand in for Pinecone.
+    """
+
+    def __init__(self, path=VECTOR_SNAPSHOT_DIR, mode="binary", oversample=10):
+        if mode not in ("binary", "int8"):
+            raise ValueError(f"Unknown snapshot search mode: {mode}")
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector snapshot version: {meta.get('version')}")
+
+        self.path = path
+        self.mode = mode
+        self.oversample = oversample
+        self.scales = np.asarray(meta["scales"], dtype=np.float32)
+        self.floats = np.load(os.path.join(path, "vectors.f32.npy"), mmap_mode="r")
+        if mode == "binary":
+            self.codes = np.load(os.path.join(path, "vectors.bin.npy"), mmap_mode="r")
+        else:
+            self.codes = np.load(os.path.join(path, "vectors.i8.npy"), mmap_mode="r")
+        with gzip.open(os.path.join(path, "chunks.json.gz"), "rt", encoding="utf-8") as f:
+            self.chunks = json.load(f)
+        self._filter_rows = {}  # filter (as JSON) -> matching rows
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def _scan_scores(self, query, block_rows=65536):
+        """Stage-one similarity for every row (higher is closer), scanned in blocks"""
+        if self.mode == "binary":
+            code = quantize_binary(query)
+        else:
+            # Codes are v / scale: fold the scales into the float query so the
+            # dot product is against the dequantized rows (cosine, unweighted)
+            code = (query * self.scales).astype(np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), block_rows):
+            block = self.codes[start:start + block_rows]
+            if self.mode == "binary":
+                scores[start:start + len(block)] = -_POPCOUNT[np.bitwise_xor(block, code)].sum(axis=1, dtype=np.int32)
+            else:
+                scores[start:start + len(block)] = block.astype(np.float32) @ code
+        return scores
+
+    def _candidates(self, query, count, rows=None):
+        scores = self._scan_scores(query)
+        if rows is not None:
+            scores = scores[rows]
+        if count >= len(scores):
+            best = np.arange(len(scores))
+        else:
+            best = np.sort(np.argpartition(-scores, count - 1)[:count])
+        return best if rows is None else rows[best]
+
+    def matching_rows(self, filter):
+        """
+        Rows whose metadata passes a Pinecone-style filter: {"field": value}
+        or {"field": {"$eq": value}} / {"$in": [values]}, all fields must
+        match. Other operators raise ValueError rather than being ignored.
+        """
+        key = json.dumps(filter, sort_keys=True)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            conditions = []
+            for field, condition in filter.items():
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, value in condition.items():
+                    if op == "$eq":
+                        conditions.append((field, {value}))
+                    elif op == "$in":
+                        conditions.append((field, set(value)))
+                    else:
+                        raise ValueError(f"Unsupported snapshot filter operator: {op}")
+            rows = np.array([
+                row for row, chunk in enumerate(self.chunks)
+                if all(chunk["metadata"].get(field) in allowed for field, allowed in conditions)
+            ], dtype=np.int64)
+            self._filter_rows[key] = rows
+        return rows
+
+    def search(self, query_vector, k=3, candidates=None, filter=None):
+        """Top-k (row, cosine score) pairs, among the rows matching `filter` if given"""
+        allowed = self.matching_rows(filter) if filter else None
+        if not len(self.chunks) or (allowed is not None and not len(allowed)):
+            return []
+        query = _normalize(query_vector)
+        rows = self._candidates(query, candidates or k * self.oversample, allowed)
+        scores = np.asarray(self.floats[rows]) @ query
+        best = np.argsort(-scores)[:k]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, **kwargs):
+        return [
+            (Document(page_content=self.chunks[row]["text"], metadata=dict(self.chunks[row]["metadata"])), score)
+            for row, score in self.search(embedding, k=k, filter=filter)
+        ]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
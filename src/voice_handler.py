@@ -1,14 +1,37 @@
 import os
+import asyncio
 import base64
+import httpx
 import requests
 from dotenv import load_dotenv
 from gtts import gTTS
 from io import BytesIO
 
+from src.admission import admission
+from src.audio_codec import audio_transcoder
+from src.circuit_breaker import CircuitOpen, breakers, raise_for_upstream
+from src.deadline import stage_timeout
+from src.logger import get_logger
+from src.multilingual import SUPPORTED_LANGUAGES, language_code
+from src.single_flight import SingleFlight
+
 load_dotenv()
 
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
+# Per-call caps; each call also stops at the request deadline
+GROQ_TIMEOUT_SECONDS = float(os.environ.get("GROQ_TIMEOUT_SECONDS", "60"))
+GTTS_TIMEOUT_SECONDS = float(os.environ.get("GTTS_TIMEOUT_SECONDS", "30"))
+
+log = get_logger("voice")
+
+# Groq TTS (model, voice) pairs, tried in order
+GROQ_TTS_CANDIDATES = [
+    ("playai-tts", "Fritz-PlayAI"),
+    ("playai-tts", "Bryan-PlayAI"),
+    ("playai-tts", "Aria-PlayAI"),
+]
+
 
 class MultilingualVoiceHandler:
     def __init__(self):
@@ -16,35 +39,13 @@ class MultilingualVoiceHandler:
             raise ValueError("GROQ_API_KEY is not set in environment variables.")
 
         self.groq_api_key = GROQ_API_KEY
-        self.groq_url = "https://api.groq.com/openai/v1"
+        self.groq_url = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1")
+        self._async_client = None
+        # Identical TTS requests in flight share one synthesis
+        self._tts_flight = SingleFlight("tts")
         
         # Supported Indian Languages with their codes
-        self.supported_languages = {
-            'hindi': 'hi',
-            'bengali': 'bn',
-            'tamil': 'ta',
-            'telugu': 'te',
-            'marathi': 'mr',
-            'gujarati': 'gu',
-            'kannada': 'kn',
-            'malayalam': 'ml',
-            'punjabi': 'pa',
-            'urdu': 'ur',
-            'odia': 'or',
-            'assamese': 'as',
-            'nepali': 'ne',
-            'english': 'en',
-            # Additional languages
-            'sanskrit': 'sa',
-            'sindhi': 'sd',
-            'konkani': 'gom',
-            'manipuri': 'mni',
-            'kashmiri': 'ks',
-            'dogri': 'doi',
-            'bodo': 'brx',
-            'santhali': 'sat',
-            'maithili': 'mai'
-        }
+        self.supported_languages = dict(SUPPORTED_LANGUAGES)
 
    
     # 🔊 SPEECH → TEXT (STT) - Supports Multilingual Auto-Detection
@@ -60,86 +61,142 @@ class MultilingualVoiceHandler:
         Returns:
             A dict with keys: 'text', 'language', and optionally 'confidence'
             or None on failure
+        Raises:
+            CircuitOpen while Groq's breaker is open (there is no other STT to fall back to)
         """
         try:
             if not audio_data:
-                print("speech_to_text: no audio_data provided")
+                log.warning("stt.no_audio")
                 return None
 
-            audio_bytes = base64.b64decode(audio_data)
+            with breakers.groq.guard():
+                response = requests.post(
+                    f"{self.groq_url}/audio/transcriptions",
+                    headers=self._auth_headers(),
+                    files=self._stt_files(audio_data, language),
+                    timeout=stage_timeout(GROQ_TIMEOUT_SECONDS),
+                )
+                raise_for_upstream(response.status_code)
 
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-            }
+            if response.status_code == 200:
+                return self._parse_stt_result(response.json())
 
-            stt_model = os.environ.get("GROQ_STT_MODEL", "whisper-large-v3-turbo")
+            log.error("stt.error", status=response.status_code, body=response.text[:200])
 
-            files = {
-                "file": ("audio.wav", audio_bytes, "audio/wav"),
-                "model": (None, stt_model),
-                "response_format": (None, "verbose_json"),  # Get detailed response
-            }
-            
-            # Add language hint if provided
-            if language:
-                files["language"] = (None, language)
+            return None
 
-            response = requests.post(
-                f"{self.groq_url}/audio/transcriptions",
-                headers=headers,
-                files=files,
-                timeout=60,
-            )
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            log.error("stt.exception", error=str(e))
+            return None
 
-            if response.status_code == 200:
-                result = response.json()
-
-                text = None
-                detected_language = None
-                confidence = None
-
-                if isinstance(result, dict):
-                    text = result.get("text") or ""
-                    detected_language = result.get("language")  # Whisper detects language
-                    
-                    # Calculate confidence from segments
-                    segments = result.get("segments")
-                    if isinstance(segments, list) and segments:
-                        confs = [
-                            s.get("confidence")
-                            for s in segments
-                            if isinstance(s, dict) and s.get("confidence") is not None
-                        ]
-                        if confs:
-                            try:
-                                confidence = sum(confs) / len(confs)
-                            except Exception:
-                                confidence = None
-
-                if text is None and isinstance(result, str):
-                    text = result
-
-                return {
-                    "text": text or "",
-                    "language": detected_language,
-                    "confidence": confidence
-                }
 
-            try:
-                print("Error in speech_to_text:", response.status_code, response.text)
-            except Exception:
-                print("Error in speech_to_text: non-200 response")
+    async def aspeech_to_text(self, audio_data, language=None):
+        """Async counterpart of speech_to_text (same return value)"""
+        try:
+            if not audio_data:
+                log.warning("stt.no_audio")
+                return None
+
+            with breakers.groq.guard():
+                response = await self._get_async_client().post(
+                    f"{self.groq_url}/audio/transcriptions",
+                    headers=self._auth_headers(),
+                    files=self._stt_files(audio_data, language),
+                    timeout=stage_timeout(GROQ_TIMEOUT_SECONDS),
+                )
+                raise_for_upstream(response.status_code)
 
+            if response.status_code == 200:
+                return self._parse_stt_result(response.json())
+
+            log.error("stt.error", status=response.status_code, body=response.text[:200])
             return None
 
+        except CircuitOpen:
+            raise
         except Exception as e:
-            print(f"Error converting speech to text: {str(e)}")
+            log.error("stt.exception", error=str(e))
             return None
 
 
+    def _auth_headers(self):
+        return {
+            "Authorization": f"Bearer {self.groq_api_key}",
+        }
+
+
+    def _stt_files(self, audio_data, language=None):
+        """Multipart form for the Groq transcription endpoint"""
+        audio_bytes = base64.b64decode(audio_data)
+
+        stt_model = os.environ.get("GROQ_STT_MODEL", "whisper-large-v3-turbo")
+
+        files = {
+            "file": ("audio.wav", audio_bytes, "audio/wav"),
+            "model": (None, stt_model),
+            "response_format": (None, "verbose_json"),  # Get detailed response
+        }
+        
+        # Add language hint if provided
+        if language:
+            files["language"] = (None, language)
+
+        return files
+
+
+    @staticmethod
+    def _parse_stt_result(result):
+        text = None
+        detected_language = None
+        confidence = None
+
+        if isinstance(result, dict):
+            text = result.get("text") or ""
+            # Whisper detects language (reported by name, e.g. "hindi")
+            detected_language = language_code(result.get("language"))
+            
+            # Calculate confidence from segments
+            segments = result.get("segments")
+            if isinstance(segments, list) and segments:
+                confs = [
+                    s.get("confidence")
+                    for s in segments
+                    if isinstance(s, dict) and s.get("confidence") is not None
+                ]
+                if confs:
+                    try:
+                        confidence = sum(confs) / len(confs)
+                    except Exception:
+                        confidence = None
+
+        if text is None and isinstance(result, str):
+            text = result
+
+        return {
+            "text": text or "",
+            "language": detected_language,
+            "confidence": confidence
+        }
+
+
+    def _get_async_client(self):
+        """Shared httpx client, created lazily inside the running event loop"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=60)
+        return self._async_client
+
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
     # 🗣 TEXT → SPEECH (TTS) - Multilingual with gTTS
     # ------------------------------------------------
-    def text_to_speech(self, text, language='en', use_groq=False):
+    def text_to_speech(self, text, language='en', use_groq=False, audio_format=''):
         """
         Convert text to speech supporting 22+ Indian languages
         
@@ -147,26 +204,76 @@ class MultilingualVoiceHandler:
             text: Text to convert to speech
             language: Language code (e.g., 'hi', 'ta', 'en', 'bn')
             use_groq: If True, try Groq TTS first (English only), then fallback to gTTS
+            audio_format: Output format from audio_codec.FORMATS (e.g. 'opus');
+                empty returns what the engine produced
         Returns:
             Audio data as base64 encoded string or None on failure
+        Raises:
+            Overloaded if the TTS stage sheds the request
         """
-        try:
-            if not text:
-                print("text_to_speech: no text provided")
-                return None
+        if not text:
+            log.warning("tts.no_text")
+            return None
+        # Only the leading request of a duplicate burst takes a TTS slot
+        return self._tts_flight.do(
+            (text, language, use_groq, audio_format), self._admitted_tts, text, language, use_groq, audio_format
+        )
+
 
+    def _admitted_tts(self, text, language, use_groq, audio_format=''):
+        # Transcoding holds the slot too, which bounds concurrent ffmpeg processes
+        with admission.tts.admit():
+            return audio_transcoder.transcode(self._synthesize(text, language, use_groq), audio_format)
+
+
+    def _synthesize(self, text, language, use_groq):
+        try:
             # Option 1: Try Groq TTS first (if requested and English)
             if use_groq and language == 'en':
                 groq_audio = self._groq_tts(text)
                 if groq_audio:
                     return groq_audio
-                print("⚠️ Groq TTS failed, falling back to gTTS...")
+                log.warning("tts.groq_fallback_to_gtts")
 
             # Option 2: Use gTTS for multilingual support
             return self._gtts_tts(text, language)
 
         except Exception as e:
-            print(f"Error in text_to_speech: {str(e)}")
+            log.error("tts.exception", error=str(e))
+            return None
+
+
+    async def atext_to_speech(self, text, language='en', use_groq=False, audio_format=''):
+        """Async counterpart of text_to_speech (same return value)"""
+        if not text:
+            log.warning("tts.no_text")
+            return None
+        return await self._tts_flight.ado(
+            (text, language, use_groq, audio_format), self._aadmitted_tts, text, language, use_groq, audio_format
+        )
+
+
+    async def _aadmitted_tts(self, text, language, use_groq, audio_format=''):
+        async with admission.tts.aadmit():
+            audio = await self._asynthesize(text, language, use_groq)
+            if audio and audio_format:
+                audio = await asyncio.to_thread(audio_transcoder.transcode, audio, audio_format)
+            return audio
+
+
+    async def _asynthesize(self, text, language, use_groq):
+        try:
+            if use_groq and language == 'en':
+                groq_audio = await self._agroq_tts(text)
+                if groq_audio:
+                    return groq_audio
+                log.warning("tts.groq_fallback_to_gtts")
+
+            # gTTS only has a blocking API - run it on the default executor
+            return await asyncio.to_thread(self._gtts_tts, text, language)
+
+        except Exception as e:
+            log.error("tts.exception", error=str(e))
             return None
 
 
@@ -178,15 +285,9 @@ class MultilingualVoiceHandler:
                 "Content-Type": "application/json",
             }
 
-            candidate_models = [
-                ("playai-tts", "Fritz-PlayAI"),
-                ("playai-tts", "Bryan-PlayAI"),
-                ("playai-tts", "Aria-PlayAI"),
-            ]
-
             response_format = os.environ.get("GROQ_TTS_FORMAT", "wav")
 
-            for tts_model, tts_voice in candidate_models:
+            for tts_model, tts_voice in GROQ_TTS_CANDIDATES:
                 try:
                     data = {
                         "model": tts_model,
@@ -195,36 +296,77 @@ class MultilingualVoiceHandler:
                         "response_format": response_format,
                     }
 
-                    response = requests.post(
-                        f"{self.groq_url}/audio/speech",
-                        headers=headers,
-                        json=data,
-                        timeout=60,
-                    )
+                    with breakers.groq.guard():
+                        response = requests.post(
+                            f"{self.groq_url}/audio/speech",
+                            headers=headers,
+                            json=data,
+                            timeout=stage_timeout(GROQ_TIMEOUT_SECONDS),
+                        )
+                        raise_for_upstream(response.status_code)
 
                     if response.status_code == 200:
                         audio_base64 = base64.b64encode(response.content).decode("utf-8")
-                        print(f"✅ Groq TTS successful: model={tts_model}, voice={tts_voice}")
+                        log.debug("tts.groq_ok", model=tts_model, voice=tts_voice)
                         return audio_base64
                     else:
                         continue
 
+                except CircuitOpen:
+                    # Groq is down: skip the remaining candidates, gTTS takes over
+                    break
                 except Exception as e:
-                    print(f"⚠️ Groq TTS error for model '{tts_model}': {str(e)}")
+                    log.warning("tts.groq_error", model=tts_model, error=str(e))
                     continue
 
             return None
 
         except Exception as e:
-            print(f"Error in Groq TTS: {str(e)}")
+            log.error("tts.groq_exception", error=str(e))
             return None
 
 
+    async def _agroq_tts(self, text):
+        """Async Groq TTS"""
+        headers = {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json",
+        }
+        response_format = os.environ.get("GROQ_TTS_FORMAT", "wav")
+
+        for tts_model, tts_voice in GROQ_TTS_CANDIDATES:
+            try:
+                with breakers.groq.guard():
+                    response = await self._get_async_client().post(
+                        f"{self.groq_url}/audio/speech",
+                        headers=headers,
+                        json={
+                            "model": tts_model,
+                            "input": text,
+                            "voice": tts_voice,
+                            "response_format": response_format,
+                        },
+                        timeout=stage_timeout(GROQ_TIMEOUT_SECONDS),
+                    )
+                    raise_for_upstream(response.status_code)
+
+                if response.status_code == 200:
+                    log.debug("tts.groq_ok", model=tts_model, voice=tts_voice)
+                    return base64.b64encode(response.content).decode("utf-8")
+
+            except CircuitOpen:
+                break
+            except Exception as e:
+                log.warning("tts.groq_error", model=tts_model, error=str(e))
+
+        return None
+
+
     def _gtts_tts(self, text, language='en'):
         """Google TTS - Supports 22+ Indian languages"""
         try:
             # Create gTTS object
-            tts = gTTS(text=text, lang=language, slow=False)
+            tts = gTTS(text=text, lang=language, slow=False, timeout=stage_timeout(GTTS_TIMEOUT_SECONDS))
             
             # Save to BytesIO buffer
             audio_buffer = BytesIO()
@@ -233,11 +375,11 @@ class MultilingualVoiceHandler:
             
             # Convert to base64
             audio_base64 = base64.b64encode(audio_buffer.read()).decode("utf-8")
-            print(f"✅ gTTS successful: language={language}")
+            log.debug("tts.gtts_ok", language=language)
             return audio_base64
 
         except Exception as e:
-            print(f"Error in gTTS: {str(e)}")
+            log.error("tts.gtts_error", error=str(e))
             return None
 
 
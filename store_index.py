@@ -1,9 +1,14 @@
 from dotenv import load_dotenv
 import os
-from src.helper import load_pdf_file, filter_to_minimal_docs, text_split, download_hugging_face_embeddings
+from src.helper import load_pdf_file, filter_to_minimal_docs, text_split
 from pinecone import Pinecone
-from pinecone import ServerlessSpec 
-from langchain_pinecone import PineconeVectorStore
+from pinecone import ServerlessSpec
+from src.lexical_index import BM25Index, LEXICAL_INDEX_PATH
+from src.retrievers import write_index_version
+from src.chunker import chunk_documents, chunk_stats, print_chunk_report
+from src.vector_snapshot import write_snapshot, VECTOR_SNAPSHOT_DIR
+from src.ingestion import IngestionEngine, PineconeSink, print_ingest_report
+from src.categories import CategoryClassifier, categorize_chunks, write_index_categories, INDEX_CATEGORIES_PATH
 
 load_dotenv()
 
@@ -15,32 +20,59 @@ os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
 
-extracted_data=load_pdf_file(data='data/')
-filter_data = filter_to_minimal_docs(extracted_data)
-text_chunks=text_split(filter_data)
+# Guarded: the embedding worker processes re-import this module
+def main():
+    extracted_data=load_pdf_file(data='data/')
+    filter_data = filter_to_minimal_docs(extracted_data)
 
-embeddings = download_hugging_face_embeddings()
+    # Token-aware, boilerplate-stripped chunks; the character splitter only runs for the comparison report
+    baseline_chunks=text_split(filter_data)
+    text_chunks, boilerplate_removed, duplicate_chunks = chunk_documents(filter_data)
+    print_chunk_report(chunk_stats(baseline_chunks), chunk_stats(text_chunks), boilerplate_removed, duplicate_chunks)
 
-pinecone_api_key = PINECONE_API_KEY
-pc = Pinecone(api_key=pinecone_api_key)
+    # Medical category per chunk (same labels as the answer cache) for category-scoped retrieval
+    classifier = CategoryClassifier.from_cache_file('data/medical_cache.json')
+    category_counts = categorize_chunks(text_chunks, classifier)
+    print("Chunk categories: " + ", ".join(f"{cat}: {count}" for cat, count in category_counts.most_common()))
 
+    # Local BM25 index over the same chunks (CPU-only lexical retrieval in app.py)
+    lexical_index = BM25Index.from_documents(text_chunks)
+    lexical_index.save(LEXICAL_INDEX_PATH)
+    print(f"BM25 index: {len(lexical_index)} chunks, {len(lexical_index.postings)} terms -> {LEXICAL_INDEX_PATH}")
 
+    pinecone_api_key = PINECONE_API_KEY
+    pc = Pinecone(api_key=pinecone_api_key)
 
-index_name = "medicalchatbot"  # change if desired
 
-if not pc.has_index(index_name):
-    pc.create_index(
-        name=index_name,
-        dimension=384,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-    )
 
-index = pc.Index(index_name)
+    index_name = "medicalchatbot"  # change if desired
 
+    if not pc.has_index(index_name):
+        pc.create_index(
+            name=index_name,
+            dimension=384,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+        )
 
-docsearch = PineconeVectorStore.from_documents(
-    documents=text_chunks,
-    index_name=index_name,
-    embedding=embeddings, 
-)
\ No newline at end of file
+    index = pc.Index(index_name)
+
+
+    # Embed on every core while finished batches upload to Pinecone (record
+    # layout of PineconeVectorStore.from_documents: chunk text under "text").
+    # Ids are stable per chunk, so this replaces the previous ingest in place.
+    report = IngestionEngine().run(text_chunks, PineconeSink(index))
+    print_ingest_report(report)
+
+    # The same vectors go to the local quantized snapshot
+    write_snapshot(report["vectors"], text_chunks, VECTOR_SNAPSHOT_DIR)
+    print(f"Vector snapshot: {len(text_chunks)} vectors -> {VECTOR_SNAPSHOT_DIR}")
+
+    # Categories the app may filter on, then tell running apps their cached retrieval results are stale
+    write_index_categories(category_counts)
+    print(f"Index categories -> {INDEX_CATEGORIES_PATH}")
+    write_index_version()
+
+
+if __name__ == "__main__":
+    main()
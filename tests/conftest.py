@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+STANDINS = ("vector", "llm", "embeddings", "stt", "tts", "node", "media")
+
+
+@pytest.fixture(scope="session")
+def chatbot_app(tmp_path_factory):
+    """
+    app.py wired to the benchmark stand-ins (benchmarks/standins.py): no
+    network, no model downloads, no latency. Nothing is written under data/.
+    """
+    for module in ("flask", "starlette", "langchain", "langchain_openai", "langchain_pinecone", "numpy"):
+        pytest.importorskip(module)
+    import standins
+
+    scratch = tmp_path_factory.mktemp("app")
+    os.environ.update({
+        "QUESTION_LOG_PATH": "",
+        "CACHE_TELEMETRY_PATH": "",
+        "SHARED_CACHE_BACKEND": "memory",
+        "INDEX_VERSION_PATH": str(scratch / "index_version"),
+        "INDEX_CATEGORIES_PATH": str(scratch / "index_categories.json"),
+        "CACHE_WATCH_INTERVAL": "0",
+    })
+    config = standins.StandinConfig(**{name: standins.Injector() for name in STANDINS})
+    server = standins.install(config)
+    import app
+
+    yield app
+    server.stop()
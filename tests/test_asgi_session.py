@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.fixture
+def asgi_client(chatbot_app):
+    from starlette.testclient import TestClient
+
+    import asgi
+
+    with TestClient(asgi.app) as client:
+        yield client
+
+
+def test_asgi_get_keeps_the_conversation_in_the_session_cookie(asgi_client):
+    first = asgi_client.post("/get", json={"msg": "What is diabetes?"})
+    session_id = first.json()["session_id"]
+    assert "session" in first.cookies
+
+    # No session_id from the client: the cookie carries the conversation
+    second = asgi_client.post("/get", json={"msg": "And how is it treated?"})
+    assert second.json()["session_id"] == session_id
+
+    # As in Flask, the cookie wins over a client-supplied id
+    third = asgi_client.post("/get", json={"msg": "Thanks", "session_id": "other"})
+    assert third.json()["session_id"] == session_id
+
+
+def test_flask_and_asgi_share_the_session_cookie(chatbot_app, asgi_client):
+    flask_client = chatbot_app.app.test_client()
+    session_id = flask_client.post("/get", data={"msg": "What is diabetes?"}).get_json()["session_id"]
+    cookie = flask_client.get_cookie("session").value
+
+    asgi_client.cookies.set("session", cookie)
+    assert asgi_client.post("/get", json={"msg": "What is diabetes?"}).json()["session_id"] == session_id
+
+
+def test_client_session_id_is_used_without_a_cookie(asgi_client):
+    resp = asgi_client.post("/get", json={"msg": "What is diabetes?", "session_id": "abc123"})
+    assert resp.json()["session_id"] == "abc123"
+
+    asgi_client.cookies.set("session", "tampered")
+    resp = asgi_client.post("/get", json={"msg": "What is diabetes?", "session_id": "def456"})
+    assert resp.json()["session_id"] == "def456"
+
+
+def test_chat_history_uses_the_session_cookie(chatbot_app, asgi_client, monkeypatch):
+    requested = []
+
+    async def history(session_id=None, limit=100, token=None):
+        requested.append(session_id)
+        return []
+
+    monkeypatch.setattr(chatbot_app, "async_get_chat_history_from_node", history)
+    session_id = asgi_client.post("/get", json={"msg": "What is diabetes?"}).json()["session_id"]
+
+    assert asgi_client.get("/api/chat/history").json()["session_id"] == session_id
+    assert asgi_client.get("/api/chat/history", params={"session_id": "abc123"}).json()["session_id"] == "abc123"
+    assert requested == [session_id, "abc123"]
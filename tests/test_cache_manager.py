@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("rapidfuzz")
+
+from src.cache_manager import CacheManager  # noqa: E402
+
+ENTRIES = [
+    {
+        "id": 1,
+        "question": "What are the symptoms of diabetes?",
+        "answer": "Thirst, frequent urination and tiredness.",
+        "keywords": ["diabetes", "symptoms"],
+        "category": "endocrinology",
+        "translations": {
+            "hi": {"question": "मधुमेह के लक्षण क्या हैं?", "answer": "प्यास, बार-बार पेशाब और थकान।"},
+        },
+    },
+    {
+        "id": 2,
+        "question": "How do I bring down a fever?",
+        "answer": "Rest, fluids and paracetamol.",
+        "keywords": ["fever"],
+        "category": "general",
+    },
+]
+
+
+def write_cache(path, entries):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    path = tmp_path / "medical_cache.json"
+    write_cache(path, ENTRIES)
+    return CacheManager(str(path))
+
+
+class ConceptEmbeddings:
+    """Same vector for the same concept in any language"""
+    CONCEPTS = (("diabetes", "मधुमेह", "நீரிழிவு"), ("fever", "बुखार", "காய்ச்சல்"))
+
+    def embed_documents(self, texts):
+        return [[float(any(word in text.lower() for word in words)) for words in self.CONCEPTS] for text in texts]
+
+
+def test_same_language_variant_hit(manager):
+    result = manager.find_match("मधुमेह के लक्षण क्या हैं", language="hi")
+
+    assert result["matched"]
+    assert result["language"] == "hi"
+    assert result["answer"] == ENTRIES[0]["translations"]["hi"]["answer"]
+
+
+def test_english_match_answers_in_the_variant_language(manager):
+    result = manager.find_match("what are the symptoms of diabetes", language="hi")
+
+    assert result["matched"]
+    assert result["language"] == "hi"
+    assert result["question"] == ENTRIES[0]["translations"]["hi"]["question"]
+
+
+def test_no_variant_falls_back_to_english(manager):
+    result = manager.find_match("how do i bring down a fever", language="hi")
+
+    assert result["matched"]
+    assert result["language"] == "en"
+    assert result["answer"] == ENTRIES[1]["answer"]
+
+
+def test_variants_are_scoped_to_their_language(manager):
+    # The Hindi variant is not offered to a Tamil question
+    assert not manager.find_match("मधुमेह के लक्षण क्या हैं", language="ta")["matched"]
+
+
+def test_cross_lingual_hit_needs_load(manager):
+    question = "நீரிழிவு நோயின் அறிகுறிகள் என்ன"
+    assert not manager.find_match(question, language="ta")["matched"]
+
+    assert manager.cross_lingual.load(ConceptEmbeddings())
+    result = manager.find_match(question, language="ta")
+
+    assert result["matched"]
+    assert result["answer"] == ENTRIES[0]["answer"]
+
+
+def test_reload_rebuilds_cross_lingual_index(manager):
+    manager.cross_lingual.load(ConceptEmbeddings())
+    question = "காய்ச்சல் குறைப்பது எப்படி"
+    assert manager.find_match(question, language="ta")["answer"] == ENTRIES[1]["answer"]
+
+    entries = [dict(ENTRIES[1], answer="Fluids, rest and a doctor if it lasts.")]
+    write_cache(manager.cache_file_path, entries)
+    assert manager.reload(force=True)
+
+    # Rebuilt by the reload itself, not lazily by the next lookup
+    assert manager.cross_lingual._index[0] is manager._state
+    assert manager.find_match(question, language="ta")["answer"] == entries[0]["answer"]
+
+
+def test_best_fuzzy_reports_the_index_of_the_match():
+    class NoIndexList(list):
+        def index(self, *args):
+            raise AssertionError("rescanned the choices")
+
+    choices = NoIndexList(["how to treat a cold", "what is asthma", "symptoms of diabetes"])
+    index, score = CacheManager._best_fuzzy("diabetes symptoms", choices, "token_sort_ratio")
+
+    assert index == 2 and score > 90
+    assert CacheManager._best_fuzzy("anything", [], "ratio") == (None, 0)
@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("rapidfuzz")
+
+from src.cache_manager import CacheManager  # noqa: E402
+
+
+def entries(version, count=300):
+    return [
+        {"id": i, "question": f"question {i} about topic {i}", "answer": f"v{version}", "keywords": [], "category": "general"}
+        for i in range(count)
+    ]
+
+
+def write_cache(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def test_reload_while_lookups_are_in_flight(tmp_path):
+    path = str(tmp_path / "medical_cache.json")
+    write_cache(path, entries(0))
+    manager = CacheManager(path)
+    stop = threading.Event()
+    errors, answers = [], set()
+
+    def reader(n):
+        while not stop.is_set():
+            try:
+                result = manager.find_match(f"question {n} about topic {n}")
+                # Every answer comes whole from one version, never a half-built cache
+                assert result["matched"] and result["answer"].startswith("v")
+                answers.add(result["answer"])
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=reader, args=(n,)) for n in range(6)]
+    for thread in readers:
+        thread.start()
+    try:
+        for version in range(1, 11):
+            write_cache(path, entries(version, count=300 + version))
+            assert manager.reload(force=True)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not errors
+    assert manager.find_match("question 1 about topic 1")["answer"] == "v10"
+    assert len(manager.cache_data) == 310
+
+
+def test_invalid_file_keeps_the_current_state(tmp_path):
+    path = str(tmp_path / "medical_cache.json")
+    write_cache(path, entries(1, count=3))
+    manager = CacheManager(path)
+    state = manager._state
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert not manager.reload(force=True)
+
+    assert manager._state is state
+    assert manager.find_match("question 2 about topic 2")["answer"] == "v1"
+
+
+def test_reload_hooks_run_with_the_published_state(tmp_path):
+    path = str(tmp_path / "medical_cache.json")
+    write_cache(path, entries(1, count=3))
+    manager = CacheManager(path)
+    seen = []
+    manager.add_reload_hook(lambda state: seen.append(state))
+    manager.add_reload_hook(lambda state: 1 / 0)  # a failing hook is logged, not raised
+
+    write_cache(path, entries(2, count=4))
+    assert manager.reload(force=True)
+
+    assert seen == [manager._state]
@@ -0,0 +1,34 @@
+import json
+
+from src.cache_telemetry import CacheTelemetry
+from src.question_log import QuestionLog
+
+HIT = {"matched": True, "confidence": 0.93, "question": "What is diabetes?", "category": "endocrinology"}
+MISS = {
+    "matched": False, "confidence": 0.62, "question": None,
+    "nearest_question": "What is a fever?", "nearest_category": "general",
+}
+
+
+def test_stats_and_lookup_log(tmp_path):
+    path = str(tmp_path / "cache_telemetry.jsonl")
+    lookup_log = QuestionLog(path)
+    telemetry = CacheTelemetry(lookup_log)
+
+    telemetry.record("what is diabetes", HIT, 85)
+    telemetry.record("मधुमेह क्या है", HIT, 85, language="hi")
+    telemetry.record("fever after a vaccine?", MISS, 85)
+
+    stats = telemetry.stats()
+    assert stats["lookups"] == 3
+    assert stats["categories"]["endocrinology"]["hits"] == 2
+    assert stats["categories"]["general"]["misses"] == 1
+    assert stats["languages"]["hi"] == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+    assert stats["miss_scores"] == {"60": 1}
+
+    # Written by the background writer, not by record()
+    assert lookup_log.flush()
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["hit"] for r in records] == [True, True, False]
+    assert records[2]["cached_question"] == "What is a fever?"
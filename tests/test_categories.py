@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+pytest.importorskip("rapidfuzz")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from src.cache_manager import CacheManager  # noqa: E402
+from src.categories import CategoryClassifier  # noqa: E402
+from src.metrics import metrics  # noqa: E402
+from src.retrievers import CachingRetriever, normalize_query  # noqa: E402
+from src.vector_snapshot import VectorSnapshot, write_snapshot  # noqa: E402
+from standins import HashEmbeddings  # noqa: E402
+
+ENTRIES = [
+    {"id": 1, "question": "What is high blood pressure?", "answer": "...", "keywords": ["hypertension"], "category": "cardiology"},
+    {"id": 2, "question": "What is a migraine?", "answer": "...", "keywords": ["headache"], "category": "neurology"},
+]
+
+CHUNKS = (
+    [("cardiology", f"heart and blood pressure passage {i}") for i in range(6)]
+    + [("neurology", "migraine headache passage")]
+    + [("general", f"general health passage {i}") for i in range(6)]
+)
+
+
+class FixedClassifier:
+    def __init__(self, category):
+        self.category = category
+
+    def classify(self, text):
+        return self.category
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshot"))
+    embeddings = HashEmbeddings(cpu_ms=0)
+    documents = [Document(page_content=text, metadata={"category": category}) for category, text in CHUNKS]
+    write_snapshot(embeddings.embed_documents([doc.page_content for doc in documents]), documents, path)
+    return VectorSnapshot(path, mode="int8")
+
+
+def retriever(snapshot, tmp_path, category):
+    return CachingRetriever(
+        vectorstore=snapshot, embeddings=HashEmbeddings(cpu_ms=0), k=3,
+        classifier=FixedClassifier(category), category_min_docs=2, version_path=str(tmp_path / "index_version"),
+    )
+
+
+def scope_count(scope):
+    return metrics._counters.get(("chatbot_retrieval_scope_total", (("scope", scope),)), 0)
+
+
+def test_search_is_scoped_to_the_category(snapshot, tmp_path):
+    before = scope_count("category")
+    docs = retriever(snapshot, tmp_path, "cardiology").invoke("what raises blood pressure")
+
+    assert len(docs) == 3
+    assert {doc.metadata["category"] for doc in docs} == {"cardiology"}
+    assert scope_count("category") == before + 1
+
+
+def test_thin_category_falls_back_to_the_whole_index(snapshot, tmp_path):
+    before = scope_count("fallback")
+    docs = retriever(snapshot, tmp_path, "neurology").invoke("migraine headache")
+
+    # Only one neurology chunk: searched everything instead
+    assert len(docs) == 3
+    assert {doc.metadata["category"] for doc in docs} != {"neurology"}
+    assert scope_count("fallback") == before + 1
+
+
+def test_unclassified_queries_search_everything(snapshot, tmp_path):
+    before = scope_count("all")
+    assert len(retriever(snapshot, tmp_path, None).invoke("general health")) == 3
+    assert scope_count("all") == before + 1
+
+
+def test_cache_entries_are_kept_per_category(snapshot, tmp_path):
+    scoped = retriever(snapshot, tmp_path, "cardiology")
+    scoped.invoke("blood pressure passage")
+    scoped.classifier = FixedClassifier(None)
+    docs = scoped.invoke("blood pressure passage")
+
+    assert {doc.metadata["category"] for doc in docs} <= {"cardiology", "general"}
+    assert set(scoped._entries) == {("cardiology", "blood pressure passage"), (None, "blood pressure passage")}
+
+
+def test_cache_keys_keep_non_latin_text():
+    assert normalize_query("Fever बुखार!") == "fever बुखार"
+    assert normalize_query("fever बुखार") != normalize_query("fever ज्वर")
+    assert normalize_query("ＦＥＶＥＲ") == "fever"
+
+    # A ":" in the query can no longer pose as a category prefix
+    assert CachingRetriever._key("neurology: बुखार", None) == (None, "neurology बुखार")
+    assert CachingRetriever._key("बुखार", "general") == ("general", "बुखार")
+
+
+def test_retrieve_many_uses_each_querys_category(snapshot, tmp_path):
+    batch = retriever(snapshot, tmp_path, "cardiology")
+    results = batch.retrieve_many(["heart passage", "blood pressure"])
+    assert all({doc.metadata["category"] for doc in docs} == {"cardiology"} for docs in results)
+
+
+def test_classifier_follows_cache_reload(tmp_path):
+    path = tmp_path / "medical_cache.json"
+    path.write_text(json.dumps(ENTRIES), encoding="utf-8")
+    manager = CacheManager(str(path))
+    classifier = CategoryClassifier.from_cache_entries(manager.cache_data)
+    manager.add_reload_hook(lambda state: classifier.rebuild(state.entries))
+    assert classifier.classify("eczema itchy skin rash eczema") is None
+
+    entries = ENTRIES + [
+        {"id": 3, "question": "How do I treat eczema?", "answer": "...", "keywords": ["eczema", "skin rash"], "category": "dermatology"},
+    ]
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    assert manager.reload(force=True)
+
+    assert classifier.classify("eczema itchy skin rash eczema") == "dermatology"
+    assert "dermatology" in classifier.categories
@@ -0,0 +1,72 @@
+import functools
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from src.ingestion import IngestionEngine, chunk_id  # noqa: E402
+from standins import HashEmbeddings  # noqa: E402
+
+
+class MemorySink:
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, records):
+        for record in records:
+            self.vectors[record["id"]] = record
+
+    def ids(self):
+        return iter(list(self.vectors))
+
+    def delete(self, ids):
+        for vector_id in ids:
+            del self.vectors[vector_id]
+
+
+def chunks(count):
+    return [
+        Document(page_content=f"chunk number {i} about fever", metadata={"source": "data/a.pdf", "page": i // 4, "start_index": i % 4 * 100})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return IngestionEngine(workers=1, batch_size=8, embedder_factory=functools.partial(HashEmbeddings, cpu_ms=0))
+
+
+def test_chunk_ids_are_stable_and_positional():
+    doc = chunks(1)[0]
+    assert chunk_id(doc) == chunk_id(Document(page_content="Chunk  number 0 about FEVER", metadata=dict(doc.metadata)))
+    assert chunk_id(doc) != chunk_id(Document(page_content=doc.page_content, metadata={**doc.metadata, "page": 9}))
+
+
+def test_reindex_replaces_instead_of_duplicating(engine):
+    sink = MemorySink()
+    sink.vectors["old-random-id"] = {"id": "old-random-id"}
+
+    first = engine.run(chunks(20), sink, keep_vectors=False)
+    assert len(sink.vectors) == 20 and first["deleted"] == 1
+
+    second = engine.run(chunks(20), sink, keep_vectors=False)
+    assert len(sink.vectors) == 20 and second["deleted"] == 0
+
+    third = engine.run(chunks(15), sink, keep_vectors=False)
+    assert set(sink.vectors) == {chunk_id(doc) for doc in chunks(15)}
+    assert third["deleted"] == 5
+
+
+def test_failed_upload_prunes_nothing(engine):
+    class FailingSink(MemorySink):
+        def upsert(self, records):
+            raise RuntimeError("upstream down")
+
+    sink = FailingSink()
+    sink.vectors["kept"] = {"id": "kept"}
+    with pytest.raises(RuntimeError):
+        engine.run(chunks(10), sink, keep_vectors=False)
+    assert set(sink.vectors) == {"kept"}
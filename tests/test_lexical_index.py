@@ -0,0 +1,30 @@
+import pytest
+
+from src.lexical_index import is_keyword_query
+
+
+@pytest.mark.parametrize("query", ["fever headache", "paracetamol dosage", "diabetes", "chest pain left arm"])
+def test_keyword_style_queries(query):
+    assert is_keyword_query(query)
+
+
+@pytest.mark.parametrize("query", [
+    "What are the symptoms of diabetes?",
+    "Is paracetamol safe during pregnancy?",
+    "how to treat a cold",
+    "fever?",
+    "paracetamol dosage for a five year old child",
+    "",
+])
+def test_questions_are_not_keyword_queries(query):
+    assert not is_keyword_query(query)
+
+
+def test_pipeline_stays_dense_without_the_lexical_shortcut(chatbot_app, monkeypatch):
+    monkeypatch.setattr(chatbot_app, "lexical_retriever", object())
+    assert not chatbot_app.LEXICAL_SHORTCUT
+    assert not chatbot_app._is_keyword_query("fever headache")
+
+    monkeypatch.setattr(chatbot_app, "LEXICAL_SHORTCUT", True)
+    assert chatbot_app._is_keyword_query("fever headache")
+    assert not chatbot_app._is_keyword_query("What are the symptoms of diabetes?")
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+
+from src.metrics import MetricsRegistry
+
+
+def worker_requests(registry, count, in_flight):
+    for _ in range(count):
+        registry.inc("chatbot_requests_total", handler="get", source="cache")
+        registry.observe("chatbot_request_duration_seconds", 0.02, handler="get", source="cache")
+    registry.set_gauge("chatbot_admission_in_flight", in_flight, stage="llm")
+    registry.set_gauge("chatbot_breaker_state", 2, dependency="pinecone")
+    registry.write_snapshot()
+
+
+def test_metrics_are_merged_across_forked_workers(tmp_path):
+    registry = MetricsRegistry()
+    registry.enable_multiprocess(str(tmp_path), interval=60)
+    registry.inc("chatbot_requests_total", handler="get", source="cache")
+
+    fork = multiprocessing.get_context("fork")
+    workers = [fork.Process(target=worker_requests, args=(registry, n, n)) for n in (2, 3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    registry.set_gauge("chatbot_breaker_state", 0, dependency="pinecone")
+
+    # Children started empty: 1 (this process) + 2 + 3, not the parent's count twice
+    text = registry.render_prometheus()
+    assert 'chatbot_requests_total{handler="get",source="cache"} 6' in text
+    assert 'chatbot_request_duration_seconds_count{handler="get",source="cache"} 5' in text
+    assert 'chatbot_admission_in_flight{stage="llm"} 5' in text
+    assert 'chatbot_breaker_state{dependency="pinecone"} 2' in text
+
+    # An exited worker keeps counting towards the totals, without its gauges
+    registry.mark_process_dead(workers[1].pid)
+    text = registry.render_prometheus()
+    assert 'chatbot_requests_total{handler="get",source="cache"} 6' in text
+    assert 'chatbot_admission_in_flight{stage="llm"} 2' in text
+    assert sorted(os.listdir(tmp_path)) == sorted(f"metrics_{pid}.json" for pid in (os.getpid(), *(w.pid for w in workers)))
+
+
+def test_single_process_registry_renders_its_own_metrics():
+    registry = MetricsRegistry()
+    registry.inc("chatbot_requests_total", handler="get", source="cache")
+    assert 'chatbot_requests_total{handler="get",source="cache"} 1' in registry.render_prometheus()
@@ -0,0 +1,108 @@
+import pytest
+
+from src.circuit_breaker import OPEN, CircuitBreaker
+
+# Not in data/medical_cache.json, so /get has to retrieve. One per test:
+# answers and retrievals are cached for the rest of the session.
+NOVEL_QUESTIONS = {
+    "flask": "Can stress cause stomach ulcers and gastritis?",
+    "asgi": "How long does a common cold usually last?",
+    "bm25": "When should I see a doctor for back pain?",
+}
+
+
+@pytest.fixture
+def pinecone_open(chatbot_app, monkeypatch):
+    """A fresh Pinecone breaker on the vector retriever, tripped open"""
+    breaker = CircuitBreaker("pinecone", min_calls=1)
+    breaker.record(False)
+    assert breaker.state == OPEN
+    monkeypatch.setattr(chatbot_app.retriever, "breaker", breaker)
+    return breaker
+
+
+def test_get_with_pinecone_breaker_open(chatbot_app, pinecone_open):
+    client = chatbot_app.app.test_client()
+    resp = client.post("/get", data={"msg": NOVEL_QUESTIONS["flask"]})
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["answer"]
+    assert pinecone_open.rejected >= 1
+
+
+def test_asgi_get_with_pinecone_breaker_open(chatbot_app, pinecone_open):
+    from starlette.testclient import TestClient
+
+    import asgi
+
+    with TestClient(asgi.app) as client:
+        resp = client.post("/get", json={"msg": NOVEL_QUESTIONS["asgi"]})
+
+    assert resp.status_code == 200
+    assert resp.json()["answer"]
+    assert pinecone_open.rejected >= 1
+
+
+def test_breaker_open_falls_back_to_bm25_context(chatbot_app, pinecone_open, monkeypatch):
+    """The LLM still gets context: BM25 chunks stand in for the vector search"""
+    seen = []
+    monkeypatch.setattr(chatbot_app, "_generate_hedged", lambda message, context: seen.append(context) or "ok")
+    monkeypatch.setattr(chatbot_app, "_retrieve_lexical", lambda message, min_score=0.0: ["chunk"])
+    monkeypatch.setattr(chatbot_app, "_assemble_context", lambda docs: list(docs))
+
+    result = chatbot_app._smart_response_pipeline(NOVEL_QUESTIONS["bm25"])
+
+    assert result["source"] == "rag-online"
+    assert seen == [["chunk"]]
+
+
+def test_llm_call_ends_with_the_request_deadline(chatbot_app, monkeypatch):
+    """A hedged-past call must not hold its admission slot for the full LLM_TIMEOUT_SECONDS"""
+    import contextvars
+
+    from src.deadline import start_deadline
+
+    timeouts = []
+
+    class RecordingModel(type(chatbot_app.chatModel)):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            timeouts.append(kwargs.get("timeout"))
+            return super()._generate(messages, stop, run_manager)
+
+    monkeypatch.setattr(chatbot_app, "chatModel", RecordingModel())
+
+    def in_request():
+        start_deadline("chat", seconds=3)
+        return chatbot_app._generate("What is asthma?", [])
+
+    assert contextvars.copy_context().run(in_request)
+    assert 0 < timeouts[0] <= 3
+    assert chatbot_app.admission.llm.in_flight == 0
+
+
+def test_deadline_clamped_node_timeouts_do_not_count_against_node(chatbot_app, monkeypatch):
+    import contextvars
+
+    import requests
+
+    from src.deadline import start_deadline
+
+    node = CircuitBreaker("node", min_calls=1)
+    monkeypatch.setattr(chatbot_app.breakers, "node", node)
+
+    def timed_out(*args, **kwargs):
+        raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(chatbot_app.requests, "post", timed_out)
+
+    def near_deadline():
+        start_deadline("chat", seconds=0.5)
+        return chatbot_app.save_message_to_node("user", "hello")
+
+    assert contextvars.copy_context().run(near_deadline) is None
+    assert node.status()["window_failures"] == 0 and node.state != OPEN
+
+    # A timeout with the full 10s is Node's fault
+    assert chatbot_app.save_message_to_node("user", "hello") is None
+    assert node.state == OPEN
@@ -0,0 +1,42 @@
+import json
+import os
+import threading
+
+from src.question_log import QuestionLog, read_questions
+
+
+def test_records_are_written_by_the_background_writer(tmp_path):
+    path = str(tmp_path / "question_log.jsonl")
+    question_log = QuestionLog(path)
+    writer_threads = set()
+    handler = question_log._writer.handler
+    emit = handler.emit
+    handler.emit = lambda record: writer_threads.add(threading.current_thread()) or emit(record)
+
+    threads = [
+        threading.Thread(target=lambda n=n: [question_log.record(f"question {n}-{i}", source="cache") for i in range(50)])
+        for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert question_log.flush()
+
+    questions = sorted(question for question, _ in read_questions([path]))
+    assert questions == sorted(f"question {n}-{i}" for n in range(4) for i in range(50))
+    assert threading.current_thread() not in writer_threads and len(writer_threads) == 1
+
+
+def test_rotation_keeps_whole_lines(tmp_path):
+    path = str(tmp_path / "question_log.jsonl")
+    question_log = QuestionLog(path, max_bytes=300)
+    for i in range(20):
+        question_log.record(f"what causes fever {i}?", confidence=0.5)
+    assert question_log.flush()
+
+    assert os.path.exists(path + ".1")
+    for generation in (path, path + ".1"):
+        assert os.path.getsize(generation) <= 300 + 100
+        with open(generation, encoding="utf-8") as f:
+            assert all(json.loads(line)["question"].startswith("what causes fever") for line in f)
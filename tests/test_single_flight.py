@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def run_concurrently(flight, fn, callers=8):
+    """`callers` threads call flight.do("key", fn) while fn is held open; returns results / exceptions"""
+    release = threading.Event()
+    entered = threading.Event()
+
+    def held():
+        entered.set()
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return flight.do("key", held)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(callers) as pool:
+        leader = pool.submit(call)
+        assert entered.wait(5)
+        followers = [pool.submit(call) for _ in range(callers - 1)]
+        # Followers are parked on the leader's call before it finishes
+        deadline = time.monotonic() + 5
+        while flight._calls.get("key") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        return [leader.result()] + [f.result() for f in followers]
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight("test")
+    calls = []
+    results = run_concurrently(flight, lambda: calls.append(1) or {"answer": len(calls)})
+
+    assert calls == [1]
+    assert all(result == {"answer": 1} for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_leader_failure_reaches_every_follower_and_is_not_remembered():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    results = run_concurrently(flight, fail)
+    assert calls == [1]
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # Nothing cached: the next call runs again
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_follower_stops_waiting_on_a_stuck_leader():
+    flight = SingleFlight("test", timeout=0.1)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", lambda: release.wait(5)))
+    leader.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.01)
+
+    assert flight.do("key", lambda: "own result") == "own result"
+    release.set()
+    leader.join()
+
+
+def test_async_followers_share_one_task_and_its_failure():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work(fail):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        if fail:
+            raise ValueError("bad")
+        return "ok"
+
+    async def main():
+        ok = await asyncio.gather(*(flight.ado("a", work, False) for _ in range(5)))
+        failed = await asyncio.gather(*(flight.ado("b", work, True) for _ in range(5)), return_exceptions=True)
+        return ok, failed
+
+    ok, failed = asyncio.run(main())
+    assert ok == ["ok"] * 5
+    assert all(isinstance(result, ValueError) for result in failed)
+    assert calls == [1, 1]
+    assert flight.in_flight() == 0
+
+
+def test_no_key_is_never_coalesced():
+    flight = SingleFlight("test")
+    with pytest.raises(KeyError):
+        flight.do(None, lambda: {}["missing"])
+    assert flight.do(None, lambda: 1) == 1
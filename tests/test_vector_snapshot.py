@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from snapshot_recall import exact_top_k, make_queries, synthetic_vectors  # noqa: E402
+from src.vector_snapshot import VectorSnapshot, write_snapshot  # noqa: E402
+
+K = 3
+
+
+@pytest.fixture(scope="module")
+def snapshot_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("snapshot")
+    vectors = synthetic_vectors(20000, 384, 400)
+    documents = [
+        Document(page_content=str(i), metadata={"category": "cardiology" if i % 4 == 0 else "general"})
+        for i in range(len(vectors))
+    ]
+    write_snapshot(vectors, documents, str(path))
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def queries_and_truth(snapshot_dir):
+    floats = np.load(f"{snapshot_dir}/vectors.f32.npy")
+    queries = make_queries(floats, 100)
+    return floats, queries, exact_top_k(floats, queries, K)
+
+
+def recall(snapshot, queries, truth, candidates, **kwargs):
+    hits = 0
+    for query, expected in zip(queries, truth):
+        hits += len({row for row, _ in snapshot.search(query, k=K, candidates=candidates, **kwargs)} & expected)
+    return hits / (K * len(queries))
+
+
+@pytest.mark.parametrize("candidates, minimum", [(K, 0.9), (10, 0.97)])
+def test_int8_recall_against_exact_search(snapshot_dir, queries_and_truth, candidates, minimum):
+    _, queries, truth = queries_and_truth
+    assert recall(VectorSnapshot(snapshot_dir, mode="int8"), queries, truth, candidates) >= minimum
+
+
+def test_binary_recall_against_exact_search(snapshot_dir, queries_and_truth):
+    _, queries, truth = queries_and_truth
+    assert recall(VectorSnapshot(snapshot_dir, mode="binary"), queries, truth, 30) >= 0.8
+
+
+def test_filter_keeps_results_in_scope(snapshot_dir, queries_and_truth):
+    floats, queries, _ = queries_and_truth
+    snapshot = VectorSnapshot(snapshot_dir, mode="int8")
+    allowed = np.arange(0, len(floats), 4)
+    truth = [set(allowed[list(rows)].tolist()) for rows in exact_top_k(floats[allowed], queries, K)]
+
+    for query in queries[:20]:
+        docs = snapshot.similarity_search_by_vector_with_score(query, k=K, filter={"category": {"$eq": "cardiology"}})
+        assert len(docs) == K
+        assert all(doc.metadata["category"] == "cardiology" for doc, _ in docs)
+    assert recall(snapshot, queries, truth, 10, filter={"category": "cardiology"}) >= 0.97
+
+
+def test_filter_with_no_match_or_unknown_operator(snapshot_dir):
+    snapshot = VectorSnapshot(snapshot_dir, mode="int8")
+    query = np.ones(384, dtype=np.float32)
+    assert snapshot.search(query, filter={"category": {"$in": ["neurology"]}}) == []
+    with pytest.raises(ValueError):
+        snapshot.search(query, filter={"category": {"$ne": "general"}})